@@ -0,0 +1,206 @@
+"""
+Ollama API stub for benchmarks and CI
+
+Replays a recorded /api/generate response, streaming or not, with a
+configurable first-token latency and token rate, so client overhead and
+throughput can be measured without a GPU-backed Ollama. /api/embed returns
+hashed character-trigram vectors, so similar texts get similar embeddings.
+
+    python benchmarks/fake_ollama.py --port 11500 --token-rate 200 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import math
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "generate_response.json"
+
+# Rough token boundaries: a word with its leading whitespace, or a single symbol
+TOKEN_PATTERN = re.compile(r"\s*\w+|\s*[^\w\s]|\s+")
+
+EMBEDDING_DIM = 256
+
+TIMING_FIELDS = (
+    "total_duration", "load_duration", "prompt_eval_count",
+    "prompt_eval_duration", "eval_count", "eval_duration",
+)
+
+
+def fake_embedding(text):
+    """Unit-length bag of hashed character trigrams"""
+    vector = [0.0] * EMBEDDING_DIM
+    for i in range(len(text) - 2):
+        digest = hashlib.md5(text[i:i + 3].encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % EMBEDDING_DIM] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def load_fixture(path=DEFAULT_FIXTURE):
+    """Load a recorded /api/generate response (the non-streaming JSON body)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.read())
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            model = self.config["model"]
+            self._send_json({"models": [{"name": f"{model}:latest", "model": f"{model}:latest",
+                                         "digest": self.config["digest"]}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        payload = self._read_json()
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+        if self.path == "/api/generate":
+            self._generate(payload)
+        elif self.path == "/api/embed":
+            inputs = payload.get("input", "")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": payload.get("model"), "embeddings": [fake_embedding(t) for t in inputs]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _final_fields(self, tokens):
+        fixture = self.config["fixture"]
+        final = {key: fixture[key] for key in TIMING_FIELDS if key in fixture}
+        final["eval_count"] = len(tokens)
+        if self.config["token_rate"]:
+            final["eval_duration"] = int(len(tokens) / self.config["token_rate"] * 1e9)
+        final["prompt_eval_duration"] = int(self.config["latency"] * 1e9)
+        final["total_duration"] = final["eval_duration"] + final["prompt_eval_duration"]
+        final["done"] = True
+        final["done_reason"] = "stop"
+        return final
+
+    def _generate(self, payload):
+        tokens = self.config["tokens"]
+        delay = 1.0 / self.config["token_rate"] if self.config["token_rate"] else 0.0
+        model = payload.get("model", self.config["model"])
+
+        time.sleep(self.config["latency"])
+
+        if not payload.get("stream", True):
+            time.sleep(delay * len(tokens))
+            response = {"model": model, "response": "".join(tokens)}
+            response.update(self._final_fields(tokens))
+            self._send_json(response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._write_chunk({"model": model, "response": token, "done": False})
+                if delay:
+                    time.sleep(delay)
+            final = {"model": model, "response": ""}
+            final.update(self._final_fields(tokens))
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early (e.g. aborted the stream)
+            pass
+
+    def _write_chunk(self, message):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, fixture=DEFAULT_FIXTURE, token_rate=200.0, latency=0.05,
+                 model="qwen2.5-coder"):
+        """
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind, 0 for any free port
+            fixture (str): Recorded /api/generate JSON response to replay
+            token_rate (float): Tokens per second to stream, 0 for no delay
+            latency (float): Seconds before the first token (simulated prefill)
+            model (str): Model name reported by /api/tags
+        """
+        super().__init__((host, port), FakeOllamaHandler)
+        recorded = load_fixture(fixture)
+        self.config = {
+            "fixture": recorded,
+            "tokens": TOKEN_PATTERN.findall(recorded.get("response", "")),
+            "token_rate": token_rate,
+            "latency": latency,
+            "model": model,
+            "digest": "sha256:fake",
+        }
+        self.stats = {"requests": 0}
+        self.stats_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections on exit is expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a daemon thread and return self"""
+        threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server that replays recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port)")
+    parser.add_argument("--fixture", default=str(DEFAULT_FIXTURE), help="Recorded /api/generate response")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Streamed tokens per second (0 = no delay)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.fixture, args.token_rate, args.latency)
+    # The benchmark harness reads this line to find the port
+    print(f"Listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
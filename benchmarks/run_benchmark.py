@@ -0,0 +1,203 @@
+"""
+Client-side benchmark against the fake Ollama server
+
+Starts benchmarks/fake_ollama.py in a separate process (so its CPU time is not
+counted), drives CodeExplainer / CodeGenerator / the CLIs under concurrency and
+reports latency percentiles, throughput and client CPU/memory.
+
+    python benchmarks/run_benchmark.py --target explain --target generate -n 200 -c 8
+    python benchmarks/run_benchmark.py --target cli-explain -n 20 --max-p99-ms 2000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from code_explain.code_explainer import CodeExplainer
+from code_generate.code_generator import CodeGenerator
+from common.metrics import MetricsRecorder, percentile
+from common.model_registry import ModelRegistry
+from common.ollama_client import OllamaClient
+from common.request_log import RequestLog
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TARGETS = ["explain", "generate", "cli-explain", "cli-generate"]
+DEFAULT_CODE_FILE = ROOT / "benchmarks" / "fake_ollama.py"
+GENERATE_PROMPT = "Write a function that returns the n-th Fibonacci number."
+
+
+def start_fake_server(token_rate, latency):
+    """Start the fake server as a subprocess; returns (process, base URL)"""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fake_ollama.py"),
+         "--token-rate", str(token_rate), "--latency", str(latency)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = process.stdout.readline().strip()
+    if not line.startswith("Listening on "):
+        process.kill()
+        raise RuntimeError(f"fake server failed to start: {line!r}")
+    return process, line[len("Listening on "):]
+
+
+def _usage(who):
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+
+def _explain_call(explainer, code):
+    start = time.perf_counter()
+    ttft = None
+    for _ in explainer.stream_explanation(code, "Python", chunked=False):
+        if ttft is None:
+            ttft = time.perf_counter() - start
+    return time.perf_counter() - start, ttft
+
+
+def _generate_call(generator):
+    start = time.perf_counter()
+    generator.generate_code(GENERATE_PROMPT, "python")
+    return time.perf_counter() - start, None
+
+
+def _cli_call(args, workdir, env):
+    start = time.perf_counter()
+    subprocess.run(args, cwd=workdir, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start, None
+
+
+def run_target(target, url, requests_count, concurrency, code_file, workdir):
+    """Run one target and return its result record"""
+    client = OllamaClient(url, pool_maxsize=max(concurrency, 1))
+    # Metrics and request logs of benchmark runs stay in workdir, out of the user's ~/.cache/engineer
+    metrics = MetricsRecorder(os.path.join(workdir, "metrics.jsonl"))
+    request_log = RequestLog(os.path.join(workdir, "requests"))
+    # No on-disk model list and no autotuned options, so results do not depend on local state
+    registry = ModelRegistry(client, cache_path=None)
+    isolated = {"metrics": metrics, "request_log": request_log, "registry": registry, "tuned_path": None}
+    env = dict(os.environ, HOME=workdir, USERPROFILE=workdir)
+    code = Path(code_file).read_text(encoding="utf-8")
+
+    if target == "explain":
+        explainer = CodeExplainer(ollama_base_url=url, client=client, **isolated)
+        call = lambda: _explain_call(explainer, code)
+        usage_of = resource.RUSAGE_SELF if resource else None
+    elif target == "generate":
+        generator = CodeGenerator(ollama_base_url=url, client=client, **isolated)
+        call = lambda: _generate_call(generator)
+        usage_of = resource.RUSAGE_SELF if resource else None
+    elif target == "cli-explain":
+        args = [sys.executable, str(ROOT / "code_explain" / "main.py"), "--url", url, "--no-cache", str(code_file)]
+        call = lambda: _cli_call(args, workdir, env)
+        usage_of = resource.RUSAGE_CHILDREN if resource else None
+    else:
+        prompt_file = os.path.join(workdir, "requirements.txt")
+        Path(prompt_file).write_text(GENERATE_PROMPT, encoding="utf-8")
+        args = [sys.executable, str(ROOT / "code_generate" / "main.py"), "--url", url, "--no-cache",
+                "-f", prompt_file, "-l", "python"]
+        call = lambda: _cli_call(args, workdir, env)
+        usage_of = resource.RUSAGE_CHILDREN if resource else None
+
+    cpu_before, _ = _usage(usage_of) if resource else (None, None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(lambda _: call(), range(requests_count)))
+    wall = time.perf_counter() - start
+    cpu_after, max_rss = _usage(usage_of) if resource else (None, None)
+    client.close()
+    request_log.close()
+
+    latencies = [latency for latency, _ in samples]
+    ttfts = [ttft for _, ttft in samples if ttft is not None]
+    result = {
+        "target": target,
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "wall_s": wall,
+        "requests_per_s": requests_count / wall if wall else None,
+        "latency_ms": {f"p{p}": percentile(latencies, p) * 1000 for p in (50, 90, 99)},
+        "client_cpu_s": (cpu_after - cpu_before) if cpu_before is not None else None,
+        "max_rss_kb": max_rss,
+    }
+    if ttfts:
+        result["ttft_ms"] = {f"p{p}": percentile(ttfts, p) * 1000 for p in (50, 90, 99)}
+    return result
+
+
+def format_result(result):
+    lines = [f"{result['target']}: {result['requests']} requests, concurrency {result['concurrency']}"]
+    lines.append(f"  throughput   {result['requests_per_s']:.1f} req/s ({result['wall_s']:.2f}s)")
+    for key in ("latency_ms", "ttft_ms"):
+        if key in result:
+            values = "  ".join(f"{name} {value:.1f}" for name, value in result[key].items())
+            lines.append(f"  {key:<12} {values}")
+    if result["client_cpu_s"] is not None:
+        lines.append(f"  client cpu   {result['client_cpu_s']:.2f}s  max rss {result['max_rss_kb']} KB")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Ollama clients against a fake server")
+    parser.add_argument("--target", "-t", action="append", choices=TARGETS,
+                        help="What to benchmark (repeatable, default: explain and generate)")
+    parser.add_argument("--requests", "-n", type=int, default=50, help="Requests per target (default: 50)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="Concurrent requests (default: 4)")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="Fake server tokens/s (0 = no delay)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server first-token latency in seconds")
+    parser.add_argument("--code-file", default=str(DEFAULT_CODE_FILE), help="Code sent to the explain targets")
+    parser.add_argument("--url", help="Use an already running server instead of starting the fake one")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="Exit with status 1 if any target's p99 latency exceeds this")
+    args = parser.parse_args()
+
+    targets = args.target or ["explain", "generate"]
+    code_file = os.path.abspath(args.code_file)
+    process = None
+    if args.url:
+        url = args.url
+    else:
+        process, url = start_fake_server(args.token_rate, args.latency)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            # CLI targets run with this as their working directory
+            os.chdir(workdir)
+            for target in targets:
+                results.append(run_target(target, url, args.requests, args.concurrency, code_file, workdir))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("\n\n".join(format_result(result) for result in results))
+
+    if args.max_p99_ms is not None:
+        slow = [r["target"] for r in results if r["latency_ms"]["p99"] > args.max_p99_ms]
+        if slow:
+            print(f"p99 latency budget of {args.max_p99_ms} ms exceeded by: {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+CLI cold-start benchmark based on ``python -X importtime``
+
+Imports each CLI entry module in a fresh interpreter several times and
+reports the median cumulative import time, the slowest imports, and any
+module that should only be imported once a request is actually sent.
+Exits with status 1 when a budget is exceeded, so it can gate CI.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --max-import-ms 60 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_MODULES = ["code_explain.main", "code_generate.main", "service.main", "common.autotune"]
+
+# Heavy dependencies that must stay out of startup: they are imported lazily when first needed
+DEFERRED_MODULES = ["requests", "urllib3", "httpx", "numpy", "diskcache", "tqdm"]
+
+DEFAULT_MAX_IMPORT_MS = 100.0
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output
+
+    Returns:
+        list: (module, self_us, cumulative_us) for every import, in the order they finished
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure(module, runs):
+    """Import a module in ``runs`` fresh interpreters; returns (median ms, entries of the last run)"""
+    env = {**os.environ, "PYTHONPATH": str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    # The first run writes .pyc files, so it is not counted
+    times = []
+    entries = []
+    for run in range(runs + 1):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"importing {module} failed:\n{completed.stderr.strip()}")
+        entries = parse_importtime(completed.stderr)
+        if run:
+            times.append(next(cumulative for name, _, cumulative in reversed(entries) if name == module) / 1000)
+    return statistics.median(times), entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI import time with -X importtime")
+    parser.add_argument("--module", action="append", choices=ENTRY_MODULES,
+                        help="Entry module to measure (repeatable, default: all)")
+    parser.add_argument("--runs", "-n", type=int, default=5, help="Measured imports per module (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module (default: 10)")
+    parser.add_argument("--max-import-ms", type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help=f"Exit with status 1 if a median import time exceeds this (default: {DEFAULT_MAX_IMPORT_MS})")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.module or ENTRY_MODULES:
+        median_ms, entries = measure(module, max(1, args.runs))
+        imported = {name for name, _, _ in entries}
+        slowest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:args.top]
+        results.append({
+            "module": module,
+            "median_ms": median_ms,
+            "modules_imported": len(imported),
+            "eager_heavy_imports": [name for name in DEFERRED_MODULES if name in imported],
+            "slowest_self_ms": {name: self_us / 1000 for name, self_us, _ in slowest},
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print(f"{result['module']}: {result['median_ms']:.1f} ms median, {result['modules_imported']} modules")
+            for name, self_ms in result["slowest_self_ms"].items():
+                print(f"  {self_ms:7.1f} ms  {name}")
+            if result["eager_heavy_imports"]:
+                print(f"  imported at startup: {', '.join(result['eager_heavy_imports'])}")
+
+    failed = False
+    slow = [r["module"] for r in results if r["median_ms"] > args.max_import_ms]
+    if slow:
+        print(f"import time budget of {args.max_import_ms} ms exceeded by: {', '.join(slow)}")
+        failed = True
+    eager = [r["module"] for r in results if r["eager_heavy_imports"]]
+    if eager:
+        print(f"heavy dependencies imported at startup by: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
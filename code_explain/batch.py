@@ -0,0 +1,186 @@
+import glob
+import logging
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from code_explain.incremental import explain_file_incremental
+from code_explain.languages import LANGUAGE_MAP, detect_language
+
+logger = logging.getLogger(__name__)
+
+# Directories that hold third-party or generated code
+VENDORED_DIRS = {
+    '.git', '.hg', '.svn', '.venv', 'venv', 'env', '__pycache__', 'node_modules',
+    'vendor', 'third_party', 'site-packages', 'dist', 'build', '.tox', '.nox',
+    '.mypy_cache', '.pytest_cache',
+}
+
+GLOB_CHARS = set('*?[')
+
+
+def is_glob(target):
+    return any(ch in target for ch in GLOB_CHARS)
+
+
+def is_binary(file_path, blocksize=8192):
+    """Treat a file as binary if its first block contains a NUL byte"""
+    try:
+        with open(file_path, 'rb') as f:
+            return b'\0' in f.read(blocksize)
+    except OSError:
+        return True
+
+
+def _is_vendored(rel_path):
+    parts = rel_path.replace('\\', '/').split('/')[:-1]
+    return any(part in VENDORED_DIRS for part in parts)
+
+
+def _git_ignored(root, paths):
+    """Return the subset of paths that git reports as ignored; empty if git is unavailable"""
+    if not paths:
+        return set()
+    try:
+        result = subprocess.run(
+            ['git', '-C', root, 'check-ignore', '--stdin'],
+            input='\n'.join(paths),
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.info(f"Skipping .gitignore filtering: {e}")
+        return set()
+    # 0: some ignored, 1: none ignored, 128: not a git repository
+    if result.returncode not in (0, 1):
+        return set()
+    return {line for line in result.stdout.splitlines() if line}
+
+
+def collect_files(target):
+    """
+    Collect explainable source files from a directory, glob pattern or single file
+
+    Binary files, files in vendored directories, files ignored by .gitignore
+    and files with an unknown extension are skipped.
+
+    Args:
+        target (str): Directory, glob pattern (``**`` is recursive) or file path
+
+    Returns:
+        tuple: (root directory, sorted list of paths relative to root)
+    """
+    if os.path.isdir(target):
+        root = target
+        candidates = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in VENDORED_DIRS)
+            for filename in filenames:
+                candidates.append(os.path.relpath(os.path.join(dirpath, filename), root))
+    elif is_glob(target):
+        root = os.getcwd()
+        candidates = [
+            os.path.relpath(path, root)
+            for path in glob.glob(target, recursive=True)
+            if os.path.isfile(path)
+        ]
+    else:
+        root = os.path.dirname(target) or '.'
+        candidates = [os.path.basename(target)]
+
+    candidates = [
+        path for path in candidates
+        if os.path.splitext(path)[1].lower() in LANGUAGE_MAP and not _is_vendored(path)
+    ]
+    ignored = _git_ignored(root, candidates)
+    files = [
+        path for path in candidates
+        if path not in ignored and not is_binary(os.path.join(root, path))
+    ]
+    return root, sorted(files)
+
+
+def _output_path(output_dir, rel_path):
+    return os.path.join(output_dir, rel_path + '.md')
+
+
+def explain_files(explainer, root, files, max_workers=4, output_dir=None, report_path=None, timeout=120,
+                  chunked=None, incremental=False):
+    """
+    Explain many files concurrently with a bounded worker pool
+
+    Each explanation is written to ``<output_dir>/<relative path>.md`` as soon as
+    it finishes. When report_path is given, all explanations are also combined
+    into a single markdown report in path order.
+
+    Args:
+        explainer (CodeExplainer): Explainer used by every worker
+        root (str): Directory the relative paths are based on
+        files (list): Source file paths relative to root
+        max_workers (int): Maximum number of concurrent model requests
+        output_dir (str, optional): Directory for per-file explanations
+        report_path (str, optional): Path of the combined report
+        timeout (int): Request timeout in seconds for each file
+        chunked (bool, optional): Force (True) or disable (False) chunked explanation; None decides by size
+        incremental (bool): Reuse per-symbol summaries from the manifests in output_dir
+
+    Returns:
+        dict: Relative path -> explanation
+    """
+    from tqdm import tqdm
+
+    if incremental and not output_dir:
+        raise ValueError("incremental mode needs an output_dir to keep manifests in")
+
+    def explain_one(rel_path):
+        with open(os.path.join(root, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+            code = f.read()
+        if incremental:
+            explanation, changed, total = explain_file_incremental(
+                explainer, code, detect_language(rel_path), _output_path(output_dir, rel_path), timeout, chunked
+            )
+            logger.info(f"{rel_path}: re-explained {changed}/{total} units")
+            return explanation
+        explanation = explainer.explain_code(code, detect_language(rel_path), timeout=timeout, chunked=chunked)
+        if output_dir:
+            out_path = _output_path(output_dir, rel_path)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(explanation)
+        return explanation
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(explain_one, rel_path): rel_path for rel_path in files}
+        with tqdm(total=len(futures), desc="Explaining", unit="file") as progress:
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    results[rel_path] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to explain {rel_path}: {e}")
+                    results[rel_path] = f"코드 설명 중 오류가 발생했습니다: {str(e)}"
+                progress.set_postfix_str(rel_path[-40:])
+                progress.update(1)
+
+    if report_path:
+        write_report(report_path, results)
+    return results
+
+
+def format_report(results):
+    """Combine per-file explanations into one markdown document"""
+    sections = []
+    for rel_path in sorted(results):
+        language = detect_language(rel_path) or ''
+        sections.append(f"# {rel_path}\n\n_language: {language}_\n\n{results[rel_path].strip()}\n")
+    return "\n---\n\n".join(sections)
+
+
+def write_report(report_path, results):
+    report_dir = os.path.dirname(report_path)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(format_report(results))
@@ -0,0 +1,229 @@
+import ast
+import re
+from collections import namedtuple
+
+# A contiguous block of source lines (1-based, inclusive)
+CodeUnit = namedtuple('CodeUnit', ['name', 'kind', 'start', 'end', 'source'])
+
+BRACE_LANGUAGES = {
+    'JavaScript', 'TypeScript', 'Java', 'C', 'C++', 'C#', 'Go', 'Rust',
+    'PHP', 'Swift', 'Kotlin',
+}
+
+_NAME_PATTERNS = [
+    ('class', re.compile(r'\b(?:class|interface|struct|enum|trait|impl|object|module)\s+([A-Za-z_$][\w$]*)')),
+    ('function', re.compile(r'\b(?:function\*?|def|fn|func|fun)\s+(?:\([^)]*\)\s*)?([A-Za-z_$][\w$]*)')),
+    ('function', re.compile(r'\b(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:function|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)')),
+    # Methods, optionally with generic parameters and a TypeScript/Kotlin return type
+    ('function', re.compile(r'([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*\([^;]*\)\s*(?::\s*[^{;=]+)?(?:throws\s+[\w.,\s]+)?\{?\s*\}?\s*$')),
+]
+
+_STRING_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|//.*$|#.*$')
+
+
+def _lines(code, start, end):
+    return "\n".join(code.splitlines()[start - 1:end])
+
+
+def _python_units(code, max_lines):
+    tree = ast.parse(code)
+    units = []
+    pending = []  # top-level statements that are not definitions
+
+    def flush_pending():
+        if pending:
+            start, end = pending[0], pending[-1]
+            units.append(CodeUnit('<module>', 'module', start[0], end[1], _lines(code, start[0], end[1])))
+            pending.clear()
+
+    for node in tree.body:
+        start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+        end = node.end_lineno
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            flush_pending()
+            kind = 'class' if isinstance(node, ast.ClassDef) else 'function'
+            if kind == 'class' and end - start + 1 > max_lines:
+                units.extend(_split_python_class(code, node, start))
+            else:
+                units.append(CodeUnit(node.name, kind, start, end, _lines(code, start, end)))
+        else:
+            pending.append((start, end))
+    flush_pending()
+    return units
+
+
+def _split_python_class(code, node, start):
+    """Split a large class into one unit per method, keeping class-level statements together"""
+    units = []
+    run_start = start  # class header, docstring and attributes before the first method
+    for child in node.body:
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            child_start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+            if run_start is not None and child_start - 1 >= run_start:
+                units.append(CodeUnit(node.name, 'class', run_start, child_start - 1,
+                                      _lines(code, run_start, child_start - 1)))
+            run_start = None
+            units.append(CodeUnit(f"{node.name}.{child.name}", 'method', child_start, child.end_lineno,
+                                  _lines(code, child_start, child.end_lineno)))
+        elif run_start is None:
+            run_start = child.lineno
+    if run_start is not None:
+        units.append(CodeUnit(node.name, 'class', run_start, node.end_lineno,
+                              _lines(code, run_start, node.end_lineno)))
+    return units
+
+
+def _guess_name(line):
+    for kind, pattern in _NAME_PATTERNS:
+        match = pattern.search(line)
+        if match and match.group(1) not in ('if', 'for', 'while', 'switch', 'catch', 'return'):
+            return match.group(1), kind
+    return '<block>', 'block'
+
+
+def _brace_units(code, max_lines=None, first=1, last=None):
+    """
+    Split C-like code into brace-delimited blocks at the outermost depth
+
+    Only lines first..last are scanned. Blocks longer than max_lines (a class
+    holding most of a Java or TypeScript file, say) are split further into
+    their members by _split_brace_block.
+    """
+    lines = code.splitlines()
+    last = len(lines) if last is None else last
+    units = []
+    depth = 0
+    block_start = None
+    loose_start = None
+    last_end = first - 1
+
+    def add_loose(end):
+        if loose_start is not None and end >= loose_start:
+            units.append(CodeUnit('<module>', 'module', loose_start, end, _lines(code, loose_start, end)))
+
+    def add_block(start, end, name, kind):
+        unit = CodeUnit(name, kind, start, end, _lines(code, start, end))
+        if max_lines and end - start + 1 > max_lines:
+            units.extend(_split_brace_block(code, unit, max_lines))
+        else:
+            units.append(unit)
+
+    for number in range(first, last + 1):
+        line = lines[number - 1]
+        stripped = _STRING_OR_COMMENT.sub('', line)
+        if depth == 0 and block_start is None:
+            if '{' in stripped:
+                # Pull preceding decorator/comment lines into the block
+                start = number
+                while start - 1 > last_end and lines[start - 2].strip().startswith(('@', '//', '/*', '*', '#[')):
+                    start -= 1
+                add_loose(start - 1)
+                loose_start = None
+                block_start = start
+                opening = number
+            elif line.strip():
+                if loose_start is None:
+                    loose_start = number
+        depth += stripped.count('{') - stripped.count('}')
+        depth = max(depth, 0)
+        if block_start is not None and depth == 0:
+            # Name the block from its header: the lines up to the one that opens it
+            header = [text.strip() for text in lines[block_start - 1:opening]]
+            name, kind = _guess_name(" ".join(header[-3:]))
+            add_block(block_start, number, name, kind)
+            block_start = None
+            last_end = number
+
+    if block_start is not None:
+        add_block(block_start, last, '<block>', 'block')
+    else:
+        add_loose(last)
+    return units
+
+
+def _split_brace_block(code, unit, max_lines):
+    """Split a large brace block into its header, one unit per member block, and its member-level statements"""
+    lines = code.splitlines()
+    opening = next((number for number in range(unit.start, unit.end + 1)
+                    if '{' in _STRING_OR_COMMENT.sub('', lines[number - 1])), unit.start)
+    # Body lines between the opening line and the closing brace
+    members = _brace_units(code, max_lines, opening + 1, unit.end - 1)
+    if not members:
+        return [unit]
+
+    units = [CodeUnit(unit.name, unit.kind, unit.start, opening, _lines(code, unit.start, opening))]
+    for member in members:
+        if member.kind == 'module':
+            # Fields and other statements between members belong to the enclosing block
+            member = CodeUnit(unit.name, unit.kind, member.start, member.end, member.source)
+        else:
+            kind = 'method' if member.kind == 'function' and unit.kind == 'class' else member.kind
+            member = CodeUnit(f"{unit.name}.{member.name}", kind, member.start, member.end, member.source)
+        units.append(member)
+    # The closing brace goes with the last member
+    closing = units[-1]
+    units[-1] = CodeUnit(closing.name, closing.kind, closing.start, unit.end, _lines(code, closing.start, unit.end))
+    return units
+
+
+def _indent_units(code):
+    """Split code into blocks that start at a non-indented line"""
+    lines = code.splitlines()
+    units = []
+    start = None
+    for number, line in enumerate(lines, start=1):
+        if line.strip() and not line[0].isspace() and not line.strip().startswith(('end', '}', ')')):
+            if start is not None:
+                end = number - 1
+                while end > start and not lines[end - 1].strip():
+                    end -= 1
+                name, kind = _guess_name(lines[start - 1])
+                units.append(CodeUnit(name, kind, start, end, _lines(code, start, end)))
+            start = number
+    if start is not None:
+        name, kind = _guess_name(lines[start - 1])
+        units.append(CodeUnit(name, kind, start, len(lines), _lines(code, start, len(lines))))
+    return units
+
+
+def pack_units(units, max_lines):
+    """Merge adjacent small units so each request carries up to max_lines lines"""
+    packed = []
+    for unit in units:
+        if packed:
+            last = packed[-1]
+            if (unit.end - last.start + 1) <= max_lines and (last.end - last.start + 1) < max_lines // 2:
+                names = last.name if last.name == unit.name else f"{last.name}, {unit.name}"
+                packed[-1] = CodeUnit(names, 'group', last.start, unit.end, last.source + "\n" + unit.source)
+                continue
+        packed.append(unit)
+    return packed
+
+
+def split_units(code, language=None, max_lines=150, pack=True):
+    """
+    Split source code into function/class units for per-unit explanation
+
+    Python is split with ``ast``; brace languages with a brace-depth heuristic;
+    anything else on non-indented lines. Unless pack is False, small
+    neighbouring units are packed together up to max_lines.
+
+    Args:
+        code (str): Source code
+        language (str, optional): Language name as returned by detect_language
+        max_lines (int): Target maximum number of lines per unit
+        pack (bool): Merge small neighbouring units
+
+    Returns:
+        list: CodeUnit tuples in source order
+    """
+    units = None
+    if language == 'Python':
+        try:
+            units = _python_units(code, max_lines)
+        except SyntaxError:
+            units = None
+    if units is None:
+        units = _brace_units(code, max_lines) if language in BRACE_LANGUAGES or '{' in code else _indent_units(code)
+    units = [u for u in units if u.source.strip()]
+    return pack_units(units, max_lines) if pack else units
@@ -1,159 +1,476 @@
-import requests
 import time
-import json
 import logging
-import os
-
-# logging configuration
-logging.basicConfig(
-    level=logging.WARNING,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from code_explain.chunker import split_units
+from common.chat_session import ChatSession
+from common.metrics import get_recorder
+from common.model_registry import get_registry
+from common.ollama_client import OllamaError, OllamaTimeoutError, get_client
+from common.options import apply_profile, get_profile
+from common.prompt_budget import code_block, fit_context, join_prompt, strip_code
+from common.request_log import get_request_log
+from common.response_cache import make_key
+from config import (
+    CHUNK_MAX_LINES,
+    CHUNK_THRESHOLD_LINES,
+    DEFAULT_MODEL,
+    EXPLAIN_WORKERS,
+    OLLAMA_BASE_URL,
+    OPTIONS_TUNED_FILE,
+    PROMPT_STRIP_COMMENTS,
+    SESSION_NUM_CTX,
 )
+
 logger = logging.getLogger(__name__)
 
+# Five-section report structure shared by the single-shot and chunked prompts
+REPORT_SECTIONS = """
+    ## 1. Purpose
+    - What is the main goal or function of this code?
+
+    ## 2. Key Components
+    - List important functions, classes, or modules and describe their roles.
+
+    ## 3. Logic Flow
+    - Describe the control flow or main steps of the program.
+
+    ## 4. Notable Features
+    - Mention any clever, unique, or advanced techniques used.
+
+    ## 5. Suggestions for Improvement
+    - Recommend any enhancements, such as:
+        - Code readability improvements
+        - Performance optimizations
+        - More Pythonic / idiomatic practices
+        - Refactoring opportunities
+        - Better error handling or logging
+"""
+
+# Report structure for explaining a diff (--diff)
+DIFF_SECTIONS = """
+    ## 1. Summary
+    - What does this change do overall, and why is it likely being made?
+
+    ## 2. Changes by Region
+    - For each changed function, class or region: what behaves differently now.
+
+    ## 3. Review Notes
+    - Possible bugs, edge cases, behaviour changes for callers, and missing tests.
+"""
+
+CLOSING = "Please write in a **concise and helpful** style that would benefit someone maintaining or learning from this code."
+
 class CodeExplainer:
     """class for explaining code using an Ollama model"""
 
-    def __init__(self, model_name="qwen2.5-coder", ollama_base_url="http://localhost:11434"):
+    def __init__(self, model_name=DEFAULT_MODEL, ollama_base_url=OLLAMA_BASE_URL, client=None, cache=None,
+                 metrics=None, request_log=None, options=None, semantic_cache=None, registry=None,
+                 tuned_path=OPTIONS_TUNED_FILE, max_concurrency=None):
         self.model_name = model_name
         self.ollama_base_url = ollama_base_url
-        self.api_url = f"{ollama_base_url}/api/generate"
+        self.client = client or get_client(ollama_base_url)
+        self.api_url = self.client.url("/api/generate")
+        self.cache = cache
+        # Optional near-duplicate lookup (SemanticCache), consulted before calling the model
+        self.semantic_cache = semantic_cache
+        self.metrics = metrics if metrics is not None else get_recorder()
+        self.request_log = request_log if request_log is not None else get_request_log()
+        # Runtime options (num_ctx, num_thread, ...) and keep_alive sent with every request
+        self.profile = get_profile("explain", options, tuned_path)
+        # registry/tuned_path let callers such as the benchmark stay clear of the user's cached state
+        self.registry = registry or get_registry(ollama_base_url, self.client)
+        # Caps model requests in flight across every file and unit explained by this instance
+        self.max_concurrency = max_concurrency
+        self._request_slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
 
         logger.info(f"CodeExplainer initialized with model: {model_name}")
 
-        # Check model availability
-        try:
-            response = requests.get(f"{ollama_base_url}/api/tags")
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [model.get("name") for model in models]
-
-                if model_name not in model_names:
-                    logger.warning(f"Model {model_name} is not available locally. It will be downloaded on first use.")
-            else:
-                logger.warning(f"Failed to check model availability: {response.status_code}")
-        except Exception as e:
-            logger.warning(f"Error checking model availability: {str(e)}")
-
-    def explain_code(self, code, language=None, timeout=120):
-        """Analyze the code and generate an explanation"""
-        lang_info = f"The code is written in {language}. " if language else ""
-
-        prompt = f"""
+        # Check model availability in the background
+        self.registry.check_model(model_name)
+
+    @property
+    def model_digest(self):
+        """Digest of the local model weights, or None if unknown"""
+        return self.registry.digest(self.model_name)
+
+    @staticmethod
+    def _build_context_section(context):
+        """Format summaries of modules the code depends on, or "" when there are none"""
+        if not context:
+            return ""
+        summaries = "\n".join(f"- `{name}`: {summary}" for name, summary in context)
+        return f"""The code imports these modules from the same project, which were already explained.
+Use these summaries to understand what the imported names do; do not explain the modules themselves.
+
+{summaries}"""
+
+    def _prepare_code(self, code, language=None):
+        return strip_code(code, language) if PROMPT_STRIP_COMMENTS else code
+
+    def _build_prompt(self, code, language=None, context=None):
+        """Build the explanation prompt for the given code, with optional dependency summaries"""
+        header = f"""
             You are a professional code reviewer and software engineer.
 
-            Please analyze and explain the following {language or "code"} with **clarity and conciseness**. 
-            Structure your response in clean markdown with headings and bullet points. 
+            Please analyze and explain the following {language or "code"} with **clarity and conciseness**.
+            Structure your response in clean markdown with headings and bullet points.
             Avoid repeating information across sections.
+        """
+        return join_prompt(header, REPORT_SECTIONS, CLOSING, self._build_context_section(context),
+                           code_block(self._prepare_code(code, language), language))
 
-            ## 1. Purpose
-            - What is the main goal or function of this code?
+    def _build_session_prompt(self):
+        """Build the static system prompt for interactive sessions"""
+        header = """
+            You are a professional code reviewer and software engineer.
 
-            ## 2. Key Components
-            - List important functions, classes, or modules and describe their roles.
+            When the user sends code, analyze and explain it with **clarity and conciseness**.
+            Structure your response in clean markdown with headings and bullet points.
+            Avoid repeating information across sections.
+        """
+        return join_prompt(header, REPORT_SECTIONS, CLOSING,
+                           "When the user asks a follow-up question, answer it directly using the code already discussed.")
 
-            ## 3. Logic Flow
-            - Describe the control flow or main steps of the program.
+    def start_session(self):
+        """
+        Start a multi-turn explanation session for interactive use
 
-            ## 4. Notable Features
-            - Mention any clever, unique, or advanced techniques used.
+        The instructions are sent once as a stable system prompt and the model is
+        kept warm between turns, so follow-up questions only pay prefill for the new text.
 
-            ## 5. Suggestions for Improvement
-                - Recommend any enhancements, such as:
-                - Code readability improvements
-                - Performance optimizations
-                - More Pythonic / idiomatic practices
-                - Refactoring opportunities
-                - Better error handling or logging
+        Returns:
+            ChatSession: Session whose send()/stream() take code or follow-up questions
+        """
+        return ChatSession(
+            self.client, self.model_name, self._build_session_prompt(),
+            metrics=self.metrics, operation="explain_chat",
+            options=self._session_options(),
+        )
+
+    def _session_options(self):
+        options = {k: v for k, v in self.profile.items() if k != "keep_alive"}
+        # The conversation grows turn by turn, so sessions get a fixed context instead of a per-prompt one
+        options.setdefault("num_ctx", SESSION_NUM_CTX)
+        return options
+
+    def _build_unit_prompt(self, unit, language=None):
+        """Build the map-step prompt that summarizes one function/class unit"""
+        header = f"""
+            You are a professional code reviewer and software engineer.
 
-            Please write in a **concise and helpful** style that would benefit someone maintaining or learning from this code.
+            The following {unit.kind} `{unit.name}` (lines {unit.start}-{unit.end}) is one part of a larger {language or "source"} file.
+            Summarize it in at most 6 concise bullet points covering its purpose, the components it defines or uses,
+            its main logic, any notable techniques, and concrete suggestions for improvement.
+            Do not repeat the code.
+        """
+        return join_prompt(header, code_block(self._prepare_code(unit.source, language), language))
+
+    def _build_reduce_prompt(self, summaries, language=None, context=None):
+        """Build the reduce-step prompt that merges unit summaries into one report"""
+        parts = "\n\n".join(
+            f"#### `{unit.name}` ({unit.kind}, lines {unit.start}-{unit.end})\n{summary.strip()}"
+            for unit, summary in summaries
+        )
+        header = f"""
+            You are a professional code reviewer and software engineer.
 
-            ```{language or ""}
-            {code}
-            ```
+            The following {language or "code"} file was too large to review at once, so each of its parts was summarized separately.
+            Using only these summaries, explain the whole file with **clarity and conciseness**.
+            Structure your response in clean markdown with headings and bullet points.
+            Avoid repeating information across sections.
         """
+        return join_prompt(header, REPORT_SECTIONS, CLOSING, self._build_context_section(context),
+                           "### Part summaries", parts)
 
-        try:
-            start_time = time.time()
+    def _build_diff_prompt(self, path, changes, language=None):
+        """Build the prompt that explains the changed regions of one file"""
+        header = f"""
+            You are a professional code reviewer and software engineer.
+
+            The following are the changes to the {language or "source"} file `{path}`, grouped by the function or class they are in.
+            Each excerpt is a diff of the new version with only a few lines of surrounding code:
+            lines starting with `+` were added, `-` were removed, and `@@ line N @@` gives the line number in the new file.
+            Explain the changes, not the unchanged code, with **clarity and conciseness**.
+            Structure your response in clean markdown with headings and bullet points.
+        """
+        excerpts = "\n\n".join(f"#### {title}\n{code_block(diff, 'diff')}" for title, diff in changes)
+        return join_prompt(header, DIFF_SECTIONS, CLOSING, excerpts)
+
+    def _build_request(self, prompt):
+        """
+        Build the /api/generate payload for a prompt, with num_ctx sized to fit it
+
+        Returns:
+            tuple: (payload, True if the prompt and the reply fit in the context)
+        """
+        payload = apply_profile({"model": self.model_name, "prompt": prompt}, self.profile)
+        prompt_tokens, num_ctx, fits = fit_context(payload)
+        logger.info(f"Prompt of ~{prompt_tokens} tokens, num_ctx {num_ctx}")
+        return payload, fits
+
+    def _record_metrics(self, operation, final, start_time, first_token_time=None, cached=False):
+        if self.metrics is None:
+            return
+        now = time.time()
+        ttft = first_token_time - start_time if first_token_time else None
+        self.metrics.record_call(operation, self.model_name, final, now - start_time, ttft, cached)
+
+    def _should_log(self):
+        return self.request_log is not None and self.request_log.sampled()
+
+    def _request_slot(self):
+        return self._request_slots if self._request_slots is not None else nullcontext()
+
+    def complete(self, prompt, timeout=120, operation="explain"):
+        """Run a non-streaming, cached completion; raises OllamaError on failure"""
+        payload, fits = self._build_request(prompt)
+        if not fits:
+            logger.warning(f"{operation} prompt does not fit in num_ctx {payload['options']['num_ctx']}; "
+                           f"the model will see it truncated")
+        start_time = time.time()
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(payload, self.model_digest)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_metrics(operation, None, start_time, cached=True)
+                return cached
+
+        with self._request_slot():
+            result = self.client.generate(payload, timeout=timeout)
+        self._record_metrics(operation, result, start_time)
+        response = result.get("response", "")
+        if self._should_log():
+            self.request_log.log(operation, self.model_name, prompt, response)
+        if cache_key and response:
+            self.cache.set(cache_key, response)
+        return response
+
+    def summarize_units(self, units, language=None, timeout=120, max_workers=EXPLAIN_WORKERS):
+        """
+        Summarize code units in parallel (the map step of a chunked explanation)
 
-            # 1. Save prompt to file
-            prompt_file = os.path.join(os.getcwd(), "temp_prompt.txt")
-            with open(prompt_file, "w", encoding="utf-8") as f:
-                f.write(prompt)
-            logger.info(f"Saved prompt to {prompt_file}")
+        Requests still go through the instance's max_concurrency limit, so
+        files explained side by side do not multiply the requests in flight.
 
-            # 2. Non-streaming
+        Returns:
+            list: (unit, summary) pairs in the order of units; failed units carry an error note
+        """
+        def summarize(unit):
             try:
-                logger.info("1. Non-streaming API 테스트")
-                test_response = requests.post(
-                    self.api_url,
-                    json={
-                        "model": self.model_name,
-                        "prompt": "Say hello world",
-                        "stream": False
-                    },
-                    timeout=10
-                )
-                logger.info(f"Status code: {test_response.status_code}")
-                logger.info(f"Raw response: {test_response.text[:500]}")
+                return self.complete(self._build_unit_prompt(unit, language), timeout, operation="explain_unit")
+            except OllamaError as e:
+                logger.error(f"Failed to summarize {unit.name} (lines {unit.start}-{unit.end}): {e}")
+                return None
+
+        if self.max_concurrency:
+            max_workers = min(max_workers, self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            summaries = list(executor.map(summarize, units))
+        return list(zip(units, summaries))
+
+    def merge_summaries(self, summaries, language=None, timeout=120):
+        """Merge (unit, summary) pairs into the five-section report (the reduce step); raises OllamaError"""
+        return self.complete(self._build_reduce_prompt(summaries, language), timeout, operation="explain_merge")
+
+    def needs_chunking(self, code, language=None, context=None):
+        """
+        Whether the code is explained in chunks rather than with one prompt
+
+        True for files longer than CHUNK_THRESHOLD_LINES and for files whose
+        prompt would not fit in the largest num_ctx.
+        """
+        if code.count("\n") + 1 > CHUNK_THRESHOLD_LINES:
+            return True
+        if not self._build_request(self._build_prompt(code, language, context))[1]:
+            logger.info("Prompt does not fit in the context window, explaining in chunks")
+            return True
+        return False
+
+    def stream_explanation(self, code, language=None, timeout=120, chunked=None, context=None, raise_errors=False):
+        """Analyze the code and yield explanation tokens as they arrive
+
+        Files longer than CHUNK_THRESHOLD_LINES, files whose prompt would not fit
+        in the largest num_ctx, or any file when chunked=True, are split into
+        function/class units that are summarized in parallel and then merged
+        into a single report.
+        context is a list of (module name, summary) pairs for the project modules
+        the code imports; they are added to the prompt instead of their source.
+        Errors are yielded as a single message, the same text explain_code returns,
+        unless raise_errors is set, in which case OllamaError is raised.
+        """
+        if chunked is None:
+            chunked = self.needs_chunking(code, language, context)
+        units = split_units(code, language, max_lines=CHUNK_MAX_LINES) if chunked else []
+        prompt = self._build_prompt(code, language, context) if len(units) <= 1 else None
+
+        on_complete = None
+        # An exact cache hit is cheaper than an embedding request. Chunked files are
+        # not looked up: one embedding of a whole large file says little about its parts
+        if self.semantic_cache is not None and prompt is not None and not self._is_cached(prompt):
+            stored, on_complete = self._semantic_lookup(code, language)
+            if stored is not None:
+                yield stored
+                return
+
+        if prompt is None:
+            yield from self._stream_chunked(units, language, timeout, on_complete, context, raise_errors)
+        else:
+            yield from self._stream_prompt(prompt, timeout, on_complete=on_complete, raise_errors=raise_errors)
+
+    def _is_cached(self, prompt):
+        if self.cache is None:
+            return False
+        payload, _ = self._build_request(prompt)
+        return self.cache.get(make_key(payload, self.model_digest)) is not None
+
+    def _semantic_lookup(self, code, language=None):
+        """
+        Look for a stored explanation of near-identical code
+
+        Returns:
+            tuple: (stored explanation or None, callback that stores a new explanation or None)
+        """
+        namespace = f"{self.model_name}|{(language or '').lower()}"
+        try:
+            vector = self.semantic_cache.embed(code)
+            stored, similarity = self.semantic_cache.lookup(vector, namespace)
+        except OllamaError as e:
+            logger.warning(f"Semantic cache unavailable: {e}")
+            return None, None
+        if stored is not None:
+            logger.info(f"Serving explanation of near-duplicate code (similarity {similarity:.3f})")
+            self._record_metrics("explain", None, time.time(), cached=True)
+            return stored, None
+
+        def store(response):
+            try:
+                self.semantic_cache.add(vector, response, namespace)
+            except OSError as e:
+                logger.warning(f"Could not store explanation in the semantic cache: {e}")
+
+        return None, store
+
+    def _stream_chunked(self, units, language=None, timeout=120, on_complete=None, context=None, raise_errors=False):
+        logger.info(f"Explaining {len(units)} units in chunked mode")
+        start_time = time.time()
+        summaries = self.summarize_units(units, language, timeout)
+        logger.info(f"Summarized {len(units)} units in {time.time() - start_time:.2f} seconds")
+
+        if all(summary is None for _, summary in summaries):
+            if raise_errors:
+                raise OllamaError("every code unit failed to summarize")
+            yield "코드 설명 중 오류가 발생했습니다: 모든 코드 단위의 요약에 실패했습니다."
+            return
+
+        summaries = [(unit, summary if summary is not None else "- (summary unavailable)")
+                     for unit, summary in summaries]
+        yield from self._stream_prompt(self._build_reduce_prompt(summaries, language, context), timeout,
+                                       operation="explain_merge", on_complete=on_complete, raise_errors=raise_errors)
+
+    def _stream_prompt(self, prompt, timeout=120, operation="explain", on_complete=None, raise_errors=False):
+        """
+        Stream a completion for a prompt, serving and filling the cache
+
+        on_complete, if given, is called with the full response once it has
+        been received successfully (or served from the cache). Request errors
+        are yielded as a message, or raised as OllamaError when raise_errors is set.
+        """
+        payload, fits = self._build_request(prompt)
+        if not fits:
+            logger.warning(f"{operation} prompt does not fit in num_ctx {payload['options']['num_ctx']}; "
+                           f"the model will see it truncated")
+        start_time = time.time()
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(payload, self.model_digest)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving explanation from cache")
+                self._record_metrics(operation, None, start_time, cached=True)
+                yield cached
+                if on_complete is not None:
+                    on_complete(cached)
+                return
+
+        # The slot is held while tokens stream, since the request is in flight until then
+        with self._request_slot():
+            try:
+                logger.info("스트리밍 API 호출 시작")
+                first_token_time = None
+                logged = self._should_log()
+                # Tokens are only kept when they have to be cached, logged or handed to on_complete
+                chunks = [] if cache_key or logged or on_complete else None
+
+                for json_line in self.client.generate_stream(payload, timeout=timeout):
+                    chunk = json_line.get("response", "")
+                    if chunk:
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                            logger.info(f"First token after {first_token_time - start_time:.2f} seconds")
+                        if chunks is not None:
+                            chunks.append(chunk)
+                        yield chunk
+
+                    if json_line.get("done"):
+                        self._record_metrics(operation, json_line, start_time, first_token_time)
+                        if chunks is not None:
+                            response = "".join(chunks)
+                            if cache_key and response:
+                                self.cache.set(cache_key, response)
+                            if logged:
+                                self.request_log.log(operation, self.model_name, prompt, response,
+                                                     done_reason=json_line.get("done_reason"))
+                            if on_complete is not None and response:
+                                on_complete(response)
+                        break
+
+                elapsed_time = time.time() - start_time
+                logger.info(f"Code explanation generated in {elapsed_time:.2f} seconds")
+
+            except OllamaTimeoutError:
+                logger.error(f"Request timed out after {timeout} seconds")
+                if raise_errors:
+                    raise
+                yield "요청 시간이 초과되었습니다. 더 짧은 코드로 다시 시도해보세요."
+
+            except OllamaError as e:
+                logger.error(f"Request error: {str(e)}")
+                if raise_errors:
+                    raise
+                yield f"API 요청 중 오류가 발생했습니다: {str(e)}"
+
             except Exception as e:
-                logger.error(f"Non-streaming API 테스트 실패: {str(e)}")
-
-            # 3. Streaming API call
-            logger.info("2. 스트리밍 API 호출 시작")
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=timeout
-            )
-
-            logger.info(f"응답 상태 코드: {response.status_code}")
-
-            # 4. response
-            full_response = ""
-            response_chunks = []
-
-            for i, line in enumerate(response.iter_lines()):
-                if line:
-                    decoded_line = line.decode('utf-8')
-
-                    if i < 5:
-                        logger.info(f"Raw line {i}: {decoded_line}")
-
-                    response_chunks.append(decoded_line)
-
-                    try:
-                        json_line = json.loads(decoded_line)
-                        chunk = json_line.get("response", "")
-                        full_response += chunk
-                    except json.JSONDecodeError as je:
-                        logger.warning(f"JSON 파싱 오류: {je}, 라인: {decoded_line[:100]}")
-                    except Exception as e:
-                        logger.warning(f"응답 처리 중 오류: {str(e)}")
-
-            # 5. Save response to file
-            raw_response_file = os.path.join(os.getcwd(), "raw_response.txt")
-            with open(raw_response_file, "w", encoding="utf-8") as f:
-                f.write("\n".join(response_chunks))
-            logger.info(f"원시 응답을 {raw_response_file}에 저장했습니다")
-
-            elapsed_time = time.time() - start_time
-            logger.info(f"Code explanation generated in {elapsed_time:.2f} seconds")
-
-            return full_response if full_response else "응답이 비어 있습니다. 자세한 내용은 로그를 확인하세요."
-
-        except requests.exceptions.Timeout:
-            logger.error(f"Request timed out after {timeout} seconds")
-            return "요청 시간이 초과되었습니다. 더 짧은 코드로 다시 시도해보세요."
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request error: {str(e)}")
-            return f"API 요청 중 오류가 발생했습니다: {str(e)}"
-
-        except Exception as e:
-            logger.error(f"Error explaining code: {str(e)}")
-            return f"코드 설명 중 오류가 발생했습니다: {str(e)}"
+                logger.error(f"Error explaining code: {str(e)}")
+                if raise_errors:
+                    raise
+                yield f"코드 설명 중 오류가 발생했습니다: {str(e)}"
+
+    def explain_code(self, code, language=None, timeout=120, chunked=None, context=None, raise_errors=False):
+        """Analyze the code and generate an explanation; raises OllamaError instead of returning a message if raise_errors"""
+        full_response = "".join(self.stream_explanation(code, language, timeout, chunked, context, raise_errors))
+        if not full_response and raise_errors:
+            raise OllamaError("the model returned an empty explanation")
+        return full_response if full_response else "응답이 비어 있습니다. 자세한 내용은 로그를 확인하세요."
+
+    def explain_changes(self, path, changes, language=None, timeout=120):
+        """
+        Explain the changed regions of a file
+
+        Args:
+            path (str): File path shown to the model
+            changes (list): (title, diff excerpt) pairs, as built by code_explain.diff.build_file_changes
+            language (str, optional): Language of the file
+            timeout (int): Request timeout in seconds
+
+        Returns:
+            str: Explanation, or an error message
+        """
+        prompt = self._build_diff_prompt(path, changes, language)
+        full_response = "".join(self._stream_prompt(prompt, timeout, operation="explain_diff"))
+        return full_response if full_response else "응답이 비어 있습니다. 자세한 내용은 로그를 확인하세요."
@@ -0,0 +1,251 @@
+import logging
+import os
+import re
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from code_explain.batch import _output_path, write_report
+from code_explain.chunker import CodeUnit, split_units
+from code_explain.languages import detect_language
+from config import CHUNK_MAX_LINES, DIFF_CONTEXT_LINES, DIFF_FULL_UNIT_LINES
+
+logger = logging.getLogger(__name__)
+
+# new_start/new_count follow git: for a pure deletion new_start is the line before the removed lines
+Hunk = namedtuple('Hunk', ['old_start', 'old_count', 'new_start', 'new_count', 'removed'])
+FileDiff = namedtuple('FileDiff', ['path', 'status', 'hunks'])
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+def _git(root, *args):
+    try:
+        result = subprocess.run(['git', '-C', root, *args], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.SubprocessError) as e:
+        raise ValueError(f"git failed: {e}") from e
+    if result.returncode != 0:
+        message = result.stderr.strip().splitlines()
+        raise ValueError(message[0] if message else f"git {args[0]} failed")
+    return result.stdout
+
+
+def new_revision(rev_range):
+    """Revision holding the new side of a diff range, or None for the working tree"""
+    for separator in ('...', '..'):
+        if separator in rev_range:
+            return rev_range.split(separator, 1)[1] or 'HEAD'
+    # `git diff A` compares A with the working tree
+    return None
+
+
+def parse_diff(text):
+    """
+    Parse ``git diff -U0`` output
+
+    Returns:
+        list: FileDiff tuples; status is "added", "deleted", "renamed" or "modified".
+            A renamed file has its new path, and no hunks unless its content changed too
+    """
+    files = []
+    path, status, hunks, hunk = None, None, None, None
+    for line in text.splitlines():
+        if line.startswith('diff --git '):
+            if path is not None:
+                files.append(FileDiff(path, status, hunks))
+            path, status, hunks, hunk = None, 'modified', [], None
+        elif hunks is None:
+            continue
+        elif line.startswith('new file mode'):
+            status = 'added'
+        elif line.startswith('deleted file mode'):
+            status = 'deleted'
+        elif line.startswith('rename to '):
+            # A pure rename has no ---/+++ lines, so this is the only place its path appears
+            status, path = 'renamed', line[len('rename to '):]
+        elif line.startswith('--- ') and hunk is None:
+            if status == 'deleted':
+                path = line[4:].split('/', 1)[-1]
+        elif line.startswith('+++ ') and hunk is None:
+            if line[4:] != '/dev/null':
+                path = line[4:].split('/', 1)[-1]
+        elif line.startswith('@@'):
+            match = _HUNK_HEADER.match(line)
+            old_start, old_count, new_start, new_count = match.groups()
+            hunk = Hunk(int(old_start), int(old_count or 1), int(new_start), int(new_count or 1), [])
+            hunks.append(hunk)
+        elif line.startswith('-') and hunk is not None:
+            hunk.removed.append(line[1:])
+    if path is not None:
+        files.append(FileDiff(path, status, hunks))
+    return files
+
+
+def read_diff(root, rev_range):
+    """Run ``git diff`` for a revision range; paths are relative to root"""
+    text = _git(root, '-c', 'core.quotePath=false', 'diff', '--no-color', '--no-ext-diff', '--relative',
+                '--find-renames', '-U0', rev_range, '--')
+    return parse_diff(text)
+
+
+def read_file_at(root, rel_path, revision):
+    """Read a file from a revision, or from the working tree when revision is None"""
+    if revision is None:
+        with open(os.path.join(root, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    return _git(root, 'show', f'{revision}:./{rel_path}')
+
+
+def group_hunks(source, hunks, language=None):
+    """
+    Group hunks by the function or class that encloses them
+
+    Units come from split_units, so large Python classes are grouped per
+    method. Changes outside any unit go into one top-level group.
+
+    Returns:
+        list: (CodeUnit, hunks) pairs in source order
+    """
+    units = split_units(source, language, max_lines=CHUNK_MAX_LINES, pack=False)
+    groups = {}
+    for hunk in hunks:
+        first = max(1, hunk.new_start)
+        last = hunk.new_start + hunk.new_count - 1 if hunk.new_count else first
+        enclosing = [unit for unit in units if unit.start <= last and unit.end >= first] or [None]
+        for unit in enclosing:
+            groups.setdefault(unit, []).append(hunk)
+
+    ordered = []
+    for unit, unit_hunks in groups.items():
+        if unit is None:
+            first = max(1, min(h.new_start for h in unit_hunks))
+            last = max(h.new_start + max(h.new_count, 1) - 1 for h in unit_hunks)
+            unit = CodeUnit('<top level>', 'module', first, last, '')
+        ordered.append((unit, unit_hunks))
+    return sorted(ordered, key=lambda group: group[0].start)
+
+
+def render_group(lines, unit, hunks, context=DIFF_CONTEXT_LINES, full_unit_lines=DIFF_FULL_UNIT_LINES):
+    """
+    Render the changes in one unit as a diff with minimal surrounding code
+
+    Small units are shown whole; larger ones only around the changes, plus
+    their first line so the signature stays visible.
+
+    Args:
+        lines (list): New version of the file, one string per line
+        unit (CodeUnit): Enclosing function or class
+        hunks (list): Hunks touching the unit
+
+    Returns:
+        str: Unified-diff style text with "@@ line N @@" markers before each excerpt
+    """
+    added = set()
+    removed_before = {}
+    for hunk in hunks:
+        added.update(range(hunk.new_start, hunk.new_start + hunk.new_count))
+        if hunk.removed:
+            anchor = hunk.new_start if hunk.new_count else hunk.new_start + 1
+            removed_before.setdefault(anchor, []).extend(hunk.removed)
+
+    if unit.kind == 'module':
+        low, high, shown = 1, len(lines), set()
+    else:
+        low, high = unit.start, min(unit.end, len(lines))
+        shown = {low}
+    if unit.kind != 'module' and high - low + 1 <= full_unit_lines:
+        shown = set(range(low, high + 1))
+    else:
+        for number in added | set(removed_before):
+            shown.update(range(max(low, number - context), min(high, number + context) + 1))
+    # Lines removed at the very end of the unit are anchored just past it
+    shown.update(number for number in removed_before if low <= number <= high + 1)
+
+    out = []
+    previous = None
+    for number in sorted(shown):
+        if previous is None or number != previous + 1:
+            out.append(f"@@ line {number} @@")
+        out.extend(f"-{line}" for line in removed_before.get(number, []))
+        if low <= number <= high:
+            out.append(f"{'+' if number in added else ' '}{lines[number - 1]}")
+        previous = number
+    return "\n".join(out)
+
+
+def build_file_changes(source, hunks, language=None):
+    """Return (title, diff text) pairs, one per changed function/class"""
+    lines = source.splitlines()
+    changes = []
+    for unit, unit_hunks in group_hunks(source, hunks, language):
+        if unit.kind == 'module':
+            title = f"top level (around lines {unit.start}-{unit.end})"
+        else:
+            title = f"{unit.kind} `{unit.name}` (lines {unit.start}-{unit.end})"
+        changes.append((title, render_group(lines, unit, unit_hunks)))
+    return changes
+
+
+def explain_diff(explainer, root, rev_range, max_workers=4, output_dir=None, report_path=None, timeout=120):
+    """
+    Explain what changed in a git revision range
+
+    Each changed file gets one request holding only its changed regions,
+    grouped by enclosing function or class with a few lines of context, so a
+    small change in a large file costs a small prompt. Added files are
+    explained whole; deleted files and files in unsupported languages are
+    skipped.
+
+    Args:
+        explainer (CodeExplainer): Explainer used by every worker
+        root (str): Directory inside the git repository; paths are relative to it
+        rev_range (str): Revision range as accepted by git diff (e.g. "main..HEAD", "HEAD~3")
+        max_workers (int): Maximum number of concurrent model requests
+        output_dir (str, optional): Directory for per-file explanations
+        report_path (str, optional): Path of the combined report
+        timeout (int): Request timeout in seconds for each file
+
+    Returns:
+        dict: Relative path -> explanation
+
+    Raises:
+        ValueError: If git cannot produce the diff
+    """
+    from tqdm import tqdm
+
+    revision = new_revision(rev_range)
+    files = [file_diff for file_diff in read_diff(root, rev_range)
+             if file_diff.hunks and file_diff.status != 'deleted' and detect_language(file_diff.path)]
+
+    def explain_one(file_diff):
+        language = detect_language(file_diff.path)
+        source = read_file_at(root, file_diff.path, revision)
+        if file_diff.status == 'added':
+            explanation = explainer.explain_code(source, language, timeout=timeout)
+        else:
+            changes = build_file_changes(source, file_diff.hunks, language)
+            explanation = explainer.explain_changes(file_diff.path, changes, language, timeout=timeout)
+        if output_dir:
+            out_path = _output_path(output_dir, file_diff.path)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(explanation)
+        return explanation
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(explain_one, file_diff): file_diff.path for file_diff in files}
+        with tqdm(total=len(futures), desc="Explaining changes", unit="file") as progress:
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    results[rel_path] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to explain changes in {rel_path}: {e}")
+                    results[rel_path] = f"변경 내용 설명 중 오류가 발생했습니다: {str(e)}"
+                progress.set_postfix_str(rel_path[-40:])
+                progress.update(1)
+
+    if report_path:
+        write_report(report_path, results)
+    return results
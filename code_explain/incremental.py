@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from code_explain.chunker import split_units
+from common.ollama_client import OllamaError
+from config import CHUNK_MAX_LINES, WATCH_RESCAN_SECONDS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def _hash(text):
+    normalized = "\n".join(line.rstrip() for line in text.strip().splitlines())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def manifest_path(explanation_path):
+    """The manifest lives next to the explanation it describes"""
+    return explanation_path + '.manifest.json'
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def explain_file_incremental(explainer, code, language, explanation_path, timeout=120, chunked=None):
+    """
+    Explain a file, re-querying the model only for functions/classes that changed
+
+    The manifest next to explanation_path records a content hash and summary for
+    every unit. Files that are chunked (decided as in stream_explanation) reuse
+    the stored summaries of unchanged units; only new or modified units are
+    summarized before the summaries are merged again. Smaller files are
+    explained whole in one request whenever they change. If the whole file is
+    unchanged the stored explanation is returned as is.
+
+    Args:
+        explainer (CodeExplainer): Explainer used for model calls
+        code (str): Current source code
+        language (str, optional): Language name
+        explanation_path (str): Where the markdown explanation is written
+        timeout (int): Request timeout in seconds
+        chunked (bool, optional): Force (True) or disable (False) chunked explanation; None decides by size
+
+    Returns:
+        tuple: (explanation, number of units re-explained, total number of units)
+    """
+    path = manifest_path(explanation_path)
+    manifest = load_manifest(path)
+    if manifest and (manifest.get('model'), manifest.get('model_digest')) != (explainer.model_name, explainer.model_digest):
+        logger.info(f"Model changed since {path} was written; re-explaining everything")
+        manifest = None
+
+    file_hash = _hash(code)
+    if manifest and manifest.get('file_hash') == file_hash and os.path.exists(explanation_path):
+        with open(explanation_path, 'r', encoding='utf-8') as f:
+            return f.read(), 0, len(manifest.get('units', []))
+
+    known = {unit['hash']: unit['summary'] for unit in (manifest or {}).get('units', []) if unit.get('summary')}
+    units = split_units(code, language, max_lines=CHUNK_MAX_LINES, pack=False)
+    hashes = [_hash(unit.source) for unit in units]
+
+    if chunked is None:
+        chunked = explainer.needs_chunking(code, language)
+
+    try:
+        if not chunked or len(units) <= 1:
+            changed = units
+            explanation = explainer.explain_code(code, language, timeout, chunked=False, raise_errors=True)
+            # Unit hashes are still recorded so the counts stay meaningful; there are no summaries to reuse
+            summaries = [(unit, None) for unit in units]
+        else:
+            changed = [unit for unit, unit_hash in zip(units, hashes) if unit_hash not in known]
+            fresh = dict(explainer.summarize_units(changed, language, timeout))
+            failed = [unit.name for unit in changed if fresh.get(unit) is None]
+            if failed:
+                raise OllamaError(f"failed to summarize {', '.join(failed)}")
+            summaries = [
+                (unit, known[unit_hash] if unit_hash in known else fresh[unit])
+                for unit, unit_hash in zip(units, hashes)
+            ]
+            previous_hashes = [unit['hash'] for unit in (manifest or {}).get('units', [])]
+            if previous_hashes == hashes and os.path.exists(explanation_path):
+                # Only whitespace or comments between symbols changed; keep the report
+                with open(explanation_path, 'r', encoding='utf-8') as f:
+                    explanation = f.read()
+            else:
+                explanation = explainer.merge_summaries(summaries, language, timeout)
+    except OllamaError as e:
+        logger.error(f"Incremental explanation failed: {e}")
+        return f"API 요청 중 오류가 발생했습니다: {str(e)}", len(units), len(units)
+
+    out_dir = os.path.dirname(explanation_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(explanation_path, 'w', encoding='utf-8') as f:
+        f.write(explanation)
+    save_manifest(path, {
+        'version': MANIFEST_VERSION,
+        'model': explainer.model_name,
+        'model_digest': explainer.model_digest,
+        'language': language,
+        'file_hash': file_hash,
+        'units': [
+            {'name': unit.name, 'kind': unit.kind, 'start': unit.start, 'end': unit.end,
+             'hash': unit_hash, 'summary': summary}
+            for (unit, summary), unit_hash in zip(summaries, hashes)
+        ],
+    })
+    return explanation, len(changed), len(units)
+
+
+def _snapshot(paths):
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def watch(list_files, on_change, interval=0.5, debounce=1.0, rescan=WATCH_RESCAN_SECONDS):
+    """
+    Poll files for changes and call on_change with the changed paths
+
+    Saves are debounced: on_change runs once no file has changed for
+    ``debounce`` seconds, so editors that write in several steps trigger one refresh.
+
+    Args:
+        list_files (callable): Returns the current list of paths to watch. Listing
+            can be slow (ignore rules, binary checks), so it is re-evaluated only
+            every ``rescan`` seconds; polls in between stat the known paths
+        on_change (callable): Called with a sorted list of changed or new paths
+        interval (float): Polling interval in seconds
+        debounce (float): Quiet period in seconds before on_change runs
+        rescan (float): Seconds between refreshes of the file list, which pick up new files
+    """
+    paths = list_files()
+    listed_at = time.monotonic()
+    previous = _snapshot(paths)
+    pending = set()
+    last_change = 0.0
+    while True:
+        time.sleep(interval)
+        if time.monotonic() - listed_at >= rescan:
+            paths = list_files()
+            listed_at = time.monotonic()
+        current = _snapshot(paths)
+        changed = {path for path, state in current.items() if previous.get(path) != state}
+        previous = current
+        if changed:
+            pending |= changed
+            last_change = time.monotonic()
+        elif pending and time.monotonic() - last_change >= debounce:
+            on_change(sorted(pending))
+            pending.clear()
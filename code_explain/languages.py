@@ -0,0 +1,23 @@
+import os
+
+# 파일 확장자 -> 언어 이름
+LANGUAGE_MAP = {
+    '.py': 'Python',
+    '.js': 'JavaScript',
+    '.java': 'Java',
+    '.cpp': 'C++',
+    '.c': 'C',
+    '.go': 'Go',
+    '.rs': 'Rust',
+    '.ts': 'TypeScript',
+    '.php': 'PHP',
+    '.rb': 'Ruby',
+    '.cs': 'C#',
+    '.swift': 'Swift',
+    '.kt': 'Kotlin',
+}
+
+def detect_language(file_path):
+    """Return the language name for a file path, or None if the extension is unknown"""
+    extension = os.path.splitext(file_path)[1].lower()
+    return LANGUAGE_MAP.get(extension)
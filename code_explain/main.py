@@ -1,25 +1,202 @@
 import os
 import sys
 import argparse
+import logging
 from pathlib import Path
 
-# 프로젝트 루트 디렉토리를 파이썬 경로에 추가
-sys.path.append(str(Path(__file__).resolve().parent.parent))
+if __name__ == "__main__":
+    # 스크립트로 직접 실행할 때만 프로젝트 루트 디렉토리를 파이썬 경로에 추가 (설치된 engineer-explain은 필요 없음)
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from code_explain.batch import collect_files, explain_files, format_report, is_glob
 from code_explain.code_explainer import CodeExplainer
+from code_explain.diff import explain_diff
+from code_explain.incremental import watch
+from code_explain.languages import detect_language
+from code_explain.repository import explain_repository
+from common.ollama_client import OllamaError, get_client
+from common.options import parse_option_overrides
+from common.response_cache import ResponseCache
+from config import (
+    CACHE_DIR,
+    DEFAULT_MODEL,
+    EXPLAIN_WORKERS,
+    EXPLANATION_DIR,
+    OLLAMA_BASE_URL,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+    WATCH_DEBOUNCE_SECONDS,
+)
+
+def print_stream(tokens):
+    """Print tokens as soon as they arrive"""
+    received = False
+    for token in tokens:
+        received = True
+        print(token, end="", flush=True)
+    if not received:
+        print("응답이 비어 있습니다. 자세한 내용은 로그를 확인하세요.", end="")
+    print()
+
+def stream_session(session, message):
+    """Stream a session reply, turning request errors into a message"""
+    try:
+        yield from session.stream(message)
+    except OllamaError as e:
+        yield f"API 요청 중 오류가 발생했습니다: {str(e)}"
+
+def explain_many(explainer, args):
+    """Explain every source file under a directory or matching a glob pattern"""
+    root, files = collect_files(args.file)
+    if not files:
+        print(f"no source files found: {args.file}")
+        return 1
+
+    def run(paths):
+        if args.repo:
+            return explain_repository(
+                explainer, root, paths,
+                max_workers=max(1, args.jobs),
+                output_dir=args.output_dir,
+                report_path=args.report,
+                chunked=args.chunked,
+            )
+        return explain_files(
+            explainer, root, paths,
+            max_workers=max(1, args.jobs),
+            output_dir=args.output_dir,
+            report_path=args.report,
+            chunked=args.chunked,
+            incremental=args.incremental,
+        )
+
+    print(f"Explaining {len(files)} files with {args.jobs} workers...")
+    results = run(files)
+
+    if args.output_dir:
+        print(f"Saved explanations to '{args.output_dir}'.")
+    if args.report:
+        print(f"Saved report to '{args.report}'.")
+    if not args.output_dir and not args.report:
+        print(format_report(results))
+
+    if args.watch:
+        def list_files():
+            return [os.path.join(root, path) for path in collect_files(args.file)[1]]
+
+        def on_change(paths):
+            changed = [os.path.relpath(path, root) for path in paths]
+            print(f"\nChanged: {', '.join(changed)}")
+            run(changed)
+            print(f"Updated explanations in '{args.output_dir}'.")
+
+        print(f"Watching {args.file} for changes. Press Ctrl+C to stop.")
+        try:
+            watch(list_files, on_change, debounce=WATCH_DEBOUNCE_SECONDS)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+    return 0
+
+def explain_changes(explainer, args):
+    """Explain only what changed in a git revision range"""
+    root = args.file or "."
+    print(f"Explaining changes in {args.diff} with {args.jobs} workers...")
+    try:
+        results = explain_diff(explainer, root, args.diff, max_workers=max(1, args.jobs),
+                               output_dir=args.output_dir, report_path=args.report)
+    except ValueError as e:
+        print(f"git diff 실행 중 오류가 발생했습니다: {str(e)}")
+        return 1
+    if not results:
+        print("설명할 변경 사항이 없습니다.")
+        return 0
+
+    if args.output_dir:
+        print(f"Saved explanations to '{args.output_dir}'.")
+    if args.report:
+        print(f"Saved report to '{args.report}'.")
+    if not args.output_dir and not args.report:
+        print(format_report(results))
+    return 0
 
 def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description="코드 설명 도구")
-    parser.add_argument("file", nargs="?", help="설명할 코드가 담긴 파일 경로")
-    parser.add_argument("--model", "-m", default="qwen2.5-coder", help="사용할 모델 이름 (기본값: qwen2.5-coder)")
-    parser.add_argument("--url", default="http://localhost:11434", help="Ollama API URL (기본값: http://localhost:11434)")
+    parser.add_argument("file", nargs="?", help="설명할 코드가 담긴 파일, 디렉토리 또는 glob 패턴 (예: 'src/**/*.py')")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL, help=f"사용할 모델 이름 (기본값: {DEFAULT_MODEL})")
+    parser.add_argument("--url", default=OLLAMA_BASE_URL, help=f"Ollama API URL, 여러 호스트는 쉼표로 구분 (기본값: {OLLAMA_BASE_URL})")
+    parser.add_argument("--jobs", "-j", type=int, default=EXPLAIN_WORKERS, help=f"동시에 보내는 최대 모델 요청 수 (분할 설명의 단위별 요청 포함, 기본값: {EXPLAIN_WORKERS})")
+    parser.add_argument("--output-dir", "-o", help="디렉토리/glob 모드에서 파일별 설명(.md)을 저장할 디렉토리")
+    parser.add_argument("--report", help="디렉토리/glob 모드에서 모든 설명을 합친 보고서 경로")
+    parser.add_argument("--chunk", dest="chunked", action="store_const", const=True, default=None,
+                        help="파일 길이와 관계없이 함수/클래스 단위로 나누어 설명")
+    parser.add_argument("--no-chunk", dest="chunked", action="store_const", const=False,
+                        help="큰 파일도 나누지 않고 한 번에 설명")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"변경된 함수/클래스만 다시 설명 (출력 디렉토리의 manifest 사용, 기본 디렉토리: {EXPLANATION_DIR})")
+    parser.add_argument("--watch", action="store_true", help="파일 저장을 감시하며 변경된 부분만 다시 설명 (--incremental 포함)")
+    parser.add_argument("--repo", action="store_true",
+                        help="import 관계를 따라 의존 모듈부터 설명하고, 그 요약을 의존하는 파일의 프롬프트에 포함")
+    parser.add_argument("--diff", nargs="?", const="HEAD", metavar="REV_RANGE",
+                        help="git diff 범위의 변경 부분만 함수/클래스 단위로 설명 (예: main..HEAD, HEAD~3; 범위 없이 쓰면 "
+                             "커밋되지 않은 변경). file 인자는 저장소 안의 디렉토리로 사용")
+    parser.add_argument("--no-session", action="store_true",
+                        help="대화형 모드에서 이전 대화 컨텍스트를 재사용하지 않고 매번 독립적으로 요청")
+    parser.add_argument("--no-cache", action="store_true", help="응답 캐시를 사용하지 않고 항상 모델을 호출")
+    parser.add_argument("--clear-cache", action="store_true", help="실행 전에 응답 캐시를 비움")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"응답 캐시 디렉토리 (기본값: {CACHE_DIR})")
+    parser.add_argument("--semantic-cache", dest="semantic_cache", action="store_const", const=True,
+                        default=SEMANTIC_CACHE_ENABLED,
+                        help=f"공백·변수명·리터럴만 다른 코드는 저장된 설명을 재사용 (임베딩 모델: {SEMANTIC_CACHE_MODEL})")
+    parser.add_argument("--no-semantic-cache", dest="semantic_cache", action="store_const", const=False,
+                        help="유사 코드 캐시를 사용하지 않음")
+    parser.add_argument("--semantic-threshold", type=float, default=SEMANTIC_CACHE_THRESHOLD,
+                        help=f"유사 코드 캐시의 최소 코사인 유사도 (기본값: {SEMANTIC_CACHE_THRESHOLD})")
+    parser.add_argument("--option", "-O", action="append", metavar="KEY=VALUE",
+                        help="Ollama 런타임 옵션 지정, 반복 가능 (예: -O num_ctx=16384 -O keep_alive=30m)")
     
     args = parser.parse_args()
     
     model_name = args.model
     ollama_url = args.url
+    try:
+        options = parse_option_overrides(args.option)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    if args.clear_cache:
+        removed = (cache or ResponseCache(args.cache_dir)).clear()
+        print(f"Cleared {removed} cached responses.")
+        if not args.file and args.diff is None:
+            return 0
+
+    semantic_cache = None
+    if args.semantic_cache and not args.no_cache:
+        from common.semantic_cache import SemanticCache
 
-    explainer = CodeExplainer(model_name=model_name, ollama_base_url=ollama_url)
+        semantic_cache = SemanticCache(get_client(ollama_url), threshold=args.semantic_threshold)
+        if args.clear_cache:
+            semantic_cache.clear()
+
+    # --jobs bounds the model requests in flight, including the per-unit requests of chunked files
+    explainer = CodeExplainer(model_name=model_name, ollama_base_url=ollama_url, cache=cache, options=options,
+                              semantic_cache=semantic_cache, max_concurrency=max(1, args.jobs))
+
+    if args.repo and (args.incremental or args.watch):
+        parser.error("--repo cannot be combined with --incremental or --watch")
+    if args.diff is not None and (args.repo or args.incremental or args.watch):
+        parser.error("--diff cannot be combined with --repo, --incremental or --watch")
+    if args.diff is not None:
+        return explain_changes(explainer, args)
+    if args.watch:
+        args.incremental = True
+    if args.incremental and not args.output_dir:
+        args.output_dir = EXPLANATION_DIR
+
+    if args.file and (os.path.isdir(args.file) or is_glob(args.file) or args.incremental or args.repo):
+        return explain_many(explainer, args)
     
     if args.file:
         file_path = args.file
@@ -31,31 +208,13 @@ def main():
             with open(file_path, 'r', encoding='utf-8') as file:
                 code = file.read()
                 
-            extension = os.path.splitext(file_path)[1].lower()
-            language_map = {
-                '.py': 'Python',
-                '.js': 'JavaScript',
-                '.java': 'Java',
-                '.cpp': 'C++',
-                '.c': 'C',
-                '.go': 'Go',
-                '.rs': 'Rust',
-                '.ts': 'TypeScript',
-                '.php': 'PHP',
-                '.rb': 'Ruby',
-                '.cs': 'C#',
-                '.swift': 'Swift',
-                '.kt': 'Kotlin',
-            }
-            language = language_map.get(extension)
-            
-            explanation = explainer.explain_code(code, language)
+            language = detect_language(file_path)
             
             print("\n" + "="*50 + "\n")
             print(f"file: {file_path}")
             print(f"language: {language if language else 'auto-detected'}")
             print("\n" + "="*50 + "\n")
-            print(explanation)
+            print_stream(explainer.stream_explanation(code, language, chunked=args.chunked))
             print("\n" + "="*50)
             
         except Exception as e:
@@ -63,6 +222,9 @@ def main():
             return 1
     else:
         print("Starting the code explanation. Type 'exit' or 'quit' to exit.")
+
+    # Follow-up inputs reuse the conversation (and the warm KV cache) unless disabled
+    session = None if args.no_session else explainer.start_session()
         
     while True:
         print("\nEnter your code (end input with an empty line, or type 'exit' or 'quit' to exit):")
@@ -89,9 +251,11 @@ def main():
             continue
 
         print("\n analyzing code...\n")
-        explanation = explainer.explain_code(code)
         print("\n" + "="*50 + "\n")
-        print(explanation)
+        if session is not None:
+            print_stream(stream_session(session, code))
+        else:
+            print_stream(explainer.stream_explanation(code))
         print("\n" + "="*50)
 
     return 0
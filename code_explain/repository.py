@@ -0,0 +1,289 @@
+import ast
+import logging
+import os
+import posixpath
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from code_explain.batch import _output_path, write_report
+from code_explain.languages import detect_language
+from config import DEPENDENCY_SUMMARY_CHARS
+
+logger = logging.getLogger(__name__)
+
+# Python projects at least this large are expected to import their own modules
+SPARSE_GRAPH_MIN_FILES = 10
+
+JS_EXTENSIONS = ('.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx')
+
+# import x from './a'; import './a'; export { y } from './a'; require('./a'); import('./a')
+_JS_IMPORT = re.compile(
+    r"""(?:\bimport\s+(?:[\w*{}\s,$]+\s+from\s+)?|\bexport\s+[\w*{}\s,$]+\s+from\s+|\brequire\s*\(\s*|\bimport\s*\(\s*)"""
+    r"""['"]([^'"]+)['"]"""
+)
+
+_SECTION_HEADING = re.compile(r"^#+\s*(?:\d+\.\s*)?(.*)$")
+
+
+def _python_imports(source, rel_path):
+    """Yield (module, level) pairs for every import, plus 'pkg.name' candidates for from-imports"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        logger.info(f"Skipping imports of {rel_path}: {e}")
+        return
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name, 0
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            yield module, node.level
+            # "from pkg import name" may import the submodule pkg/name.py
+            for alias in node.names:
+                if alias.name != "*":
+                    yield f"{module}.{alias.name}" if module else alias.name, node.level
+
+
+def package_prefixes(root):
+    """Dotted names root can be imported under, longest first ("a.pkg", "pkg" for /x/a/pkg)"""
+    names = []
+    for part in reversed(os.path.abspath(root).replace(os.sep, "/").split("/")):
+        if not part.isidentifier():
+            break
+        names.insert(0, part)
+    return [".".join(names[i:]) for i in range(len(names))]
+
+
+def _resolve_python(module, level, rel_path, known, prefixes=()):
+    resolved = _resolve_python_path(module, level, rel_path, known)
+    if resolved or level:
+        return resolved
+    # When root is itself a package (or inside one), "pkg.mod" names root/mod.py
+    for prefix in prefixes:
+        if module == prefix:
+            return "__init__.py" if "__init__.py" in known else None
+        if module.startswith(prefix + "."):
+            resolved = _resolve_python_path(module[len(prefix) + 1:], 0, rel_path, known)
+            if resolved:
+                return resolved
+    return None
+
+
+def _resolve_python_path(module, level, rel_path, known):
+    if level:
+        base = posixpath.dirname(rel_path)
+        for _ in range(level - 1):
+            base = posixpath.dirname(base)
+        parts = [base] if base else []
+    else:
+        parts = []
+    path = posixpath.join(*parts, *module.split(".")) if module else posixpath.join(*parts) if parts else ""
+    if not path:
+        return None
+    for candidate in (path + ".py", posixpath.join(path, "__init__.py")):
+        if candidate in known:
+            return candidate
+    return None
+
+
+def _resolve_js(specifier, rel_path, known):
+    # Only relative specifiers point into the project; bare ones are packages
+    if not specifier.startswith("."):
+        return None
+    path = posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), specifier))
+    candidates = [path] + [path + ext for ext in JS_EXTENSIONS]
+    candidates += [posixpath.join(path, "index" + ext) for ext in JS_EXTENSIONS]
+    for candidate in candidates:
+        if candidate in known:
+            return candidate
+    return None
+
+
+def build_import_graph(root, files):
+    """
+    Find which project files each file imports
+
+    Python imports are read with ast (absolute imports are resolved against
+    root, or against root's own package name when root is a package;
+    relative ones against the file's package); JavaScript/TypeScript
+    imports come from ``import``/``export ... from``/``require()`` with
+    relative specifiers. Other languages have no dependencies.
+
+    Args:
+        root (str): Project root directory
+        files (list): Source paths relative to root
+
+    Returns:
+        dict: Relative path -> set of relative paths it imports
+    """
+    by_posix = {path.replace(os.sep, "/"): path for path in files}
+    known = set(by_posix)
+    graph = {path: set() for path in files}
+    prefixes = package_prefixes(root)
+    for posix_path, rel_path in by_posix.items():
+        extension = os.path.splitext(posix_path)[1].lower()
+        if extension != ".py" and extension not in JS_EXTENSIONS:
+            continue
+        try:
+            with open(os.path.join(root, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError as e:
+            logger.warning(f"Cannot read {rel_path}: {e}")
+            continue
+        if extension == ".py":
+            targets = (_resolve_python(module, level, posix_path, known, prefixes)
+                       for module, level in _python_imports(source, posix_path))
+        else:
+            targets = (_resolve_js(spec, posix_path, known) for spec in _JS_IMPORT.findall(source))
+        graph[rel_path] = {by_posix[t] for t in targets if t and t != posix_path}
+
+    python_files = [path for path in files if path.endswith(".py")]
+    python_edges = sum(len(graph[path]) for path in python_files)
+    if len(python_files) >= SPARSE_GRAPH_MIN_FILES and python_edges * 10 < len(python_files):
+        logger.warning(f"Only {python_edges} imports between {len(python_files)} Python files were resolved; "
+                       f"dependency ordering will have little effect. Run from the directory the imports "
+                       f"are relative to (usually the project root).")
+    return graph
+
+
+def strongly_connected_components(graph):
+    """Tarjan's algorithm, iteratively; returns a dict of node -> component id"""
+    index, lowlink, on_stack, stack = {}, {}, set(), []
+    component = {}
+    counter = 0
+    for start in sorted(graph):
+        if start in index:
+            continue
+        work = [(start, iter(sorted(graph[start])))]
+        index[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if neighbour not in index:
+                    index[neighbour] = lowlink[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack.add(neighbour)
+                    work.append((neighbour, iter(sorted(graph[neighbour]))))
+                    advanced = True
+                    break
+                if neighbour in on_stack:
+                    lowlink[node] = min(lowlink[node], index[neighbour])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component[member] = node
+                    if member == node:
+                        break
+    return component
+
+
+def summarize_explanation(explanation, max_chars=DEPENDENCY_SUMMARY_CHARS):
+    """Condense an explanation to its Purpose and Key Components sections, as one line"""
+    kept = []
+    keep = False
+    for line in explanation.splitlines():
+        heading = _SECTION_HEADING.match(line.strip())
+        if heading and line.lstrip().startswith("#"):
+            title = heading.group(1).lower()
+            keep = "purpose" in title or "component" in title
+            continue
+        if keep and line.strip():
+            kept.append(line.strip().lstrip("-* ").strip())
+    text = " ".join(kept) if kept else " ".join(explanation.split())
+    return text if len(text) <= max_chars else text[:max_chars - 3].rstrip() + "..."
+
+
+def explain_repository(explainer, root, files, max_workers=4, output_dir=None, report_path=None, timeout=120,
+                       chunked=None):
+    """
+    Explain a project's files in dependency order
+
+    A file is explained once every project module it imports has been, and its
+    prompt gets one-line summaries of those modules instead of their source.
+    Files whose dependencies are done run in parallel; import cycles are
+    explained without summaries of the other modules in the cycle.
+
+    Args:
+        explainer (CodeExplainer): Explainer used by every worker
+        root (str): Project root directory
+        files (list): Source file paths relative to root
+        max_workers (int): Maximum number of concurrent model requests
+        output_dir (str, optional): Directory for per-file explanations
+        report_path (str, optional): Path of the combined report
+        timeout (int): Request timeout in seconds for each file
+        chunked (bool, optional): Force (True) or disable (False) chunked explanation; None decides by size
+
+    Returns:
+        dict: Relative path -> explanation
+    """
+    from tqdm import tqdm
+
+    graph = build_import_graph(root, files)
+    component = strongly_connected_components(graph)
+    # Edges inside an import cycle cannot be ordered, so they are dropped
+    waiting_on = {path: {dep for dep in deps if component[dep] != component[path]} for path, deps in graph.items()}
+    dependents = {path: set() for path in graph}
+    for path, deps in waiting_on.items():
+        for dep in deps:
+            dependents[dep].add(path)
+    logger.info(f"Import graph: {len(graph)} files, {sum(len(d) for d in waiting_on.values())} ordered dependencies")
+
+    summaries = {}
+    results = {}
+
+    def explain_one(rel_path):
+        with open(os.path.join(root, rel_path), 'r', encoding='utf-8', errors='replace') as f:
+            code = f.read()
+        context = [(dep.replace(os.sep, "/"), summaries[dep]) for dep in sorted(graph[rel_path]) if dep in summaries]
+        # Errors raise so that a failure message never becomes a dependency summary
+        explanation = explainer.explain_code(code, detect_language(rel_path), timeout=timeout, chunked=chunked,
+                                             context=context, raise_errors=True)
+        if output_dir:
+            out_path = _output_path(output_dir, rel_path)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(explanation)
+        return explanation
+
+    remaining = {path: len(deps) for path, deps in waiting_on.items()}
+    ready = sorted(path for path, count in remaining.items() if count == 0)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(total=len(graph), desc="Explaining", unit="file") as progress:
+        running = {}
+        while ready or running:
+            while ready:
+                rel_path = ready.pop(0)
+                running[executor.submit(explain_one, rel_path)] = rel_path
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel_path = running.pop(future)
+                try:
+                    results[rel_path] = future.result()
+                    summaries[rel_path] = summarize_explanation(results[rel_path])
+                except Exception as e:
+                    logger.error(f"Failed to explain {rel_path}: {e}")
+                    results[rel_path] = f"코드 설명 중 오류가 발생했습니다: {str(e)}"
+                # Dependents go ahead without a summary of a failed module
+                for dependent in sorted(dependents[rel_path]):
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        ready.append(dependent)
+                progress.set_postfix_str(rel_path[-40:])
+                progress.update(1)
+
+    if report_path:
+        write_report(report_path, results)
+    return results
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from code_generate.code_extractor import extract_code
+from code_generate.languages import LANGUAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+REQUIREMENT_SUFFIXES = ('.txt', '.md')
+
+
+def _spec_id(spec):
+    if spec.get('id'):
+        return str(spec['id'])
+    material = json.dumps(
+        [spec.get('prompt'), spec.get('language'), spec.get('output'), spec.get('options')],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+
+def _default_output(name, language):
+    extension = LANGUAGE_EXTENSIONS.get((language or '').lower(), '.txt')
+    return os.path.splitext(name)[0] + extension
+
+
+def load_specs(source, default_language=None):
+    """
+    Load requirement specs from a JSONL file or a directory
+
+    Each JSONL line (or ``.json`` file in a directory) is an object with
+    ``prompt`` (or ``file``, a path to a requirements file), and optional
+    ``id``, ``language``, ``output``, ``options`` and ``template`` (a template
+    kind, ``"auto"`` or ``null``). Plain ``.txt``/``.md``
+    files in a directory are treated as requirements with default settings.
+
+    Args:
+        source (str): JSONL file or directory of specs
+        default_language (str, optional): Language for specs that do not set one
+
+    Returns:
+        list: Spec dicts with ``id``, ``prompt``, ``language``, ``output`` and ``options``
+    """
+    raw_specs = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if name.endswith('.json'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    spec = json.load(f)
+                spec.setdefault('id', os.path.splitext(name)[0])
+                raw_specs.append((spec, source))
+            elif name.endswith(REQUIREMENT_SUFFIXES):
+                raw_specs.append(({'id': name, 'file': name}, source))
+    else:
+        base_dir = os.path.dirname(source)
+        with open(source, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw_specs.append((json.loads(line), base_dir))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{source}:{number}: invalid JSON: {e}") from e
+
+    specs = []
+    for spec, base_dir in raw_specs:
+        spec = dict(spec)
+        if 'prompt' not in spec:
+            if 'file' not in spec:
+                raise ValueError(f"spec {spec.get('id', '?')} has neither 'prompt' nor 'file'")
+            with open(os.path.join(base_dir, spec['file']), 'r', encoding='utf-8') as f:
+                spec['prompt'] = f.read()
+        spec['language'] = spec.get('language') or default_language
+        spec['id'] = _spec_id(spec)
+        if not spec.get('output'):
+            spec['output'] = _default_output(spec.get('file') or spec['id'], spec['language'])
+        specs.append(spec)
+    return specs
+
+
+class Checkpoint:
+    """Append-only record of completed spec ids, so an interrupted run can resume"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.completed.add(json.loads(line)['id'])
+                    except (json.JSONDecodeError, KeyError):
+                        # A line cut short by an interruption
+                        continue
+
+    def mark_done(self, spec_id, output_path):
+        line = json.dumps({'id': spec_id, 'output': output_path}, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+            self.completed.add(spec_id)
+
+
+def _write_output(path, content):
+    out_dir = os.path.dirname(path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def generate_batch(generator, specs, output_dir='.', checkpoint_path=None, max_workers=4, timeout=60, best_of=1):
+    """
+    Generate code for many specs concurrently, resuming from a checkpoint
+
+    Each result is extracted from its code block and written as soon as it
+    finishes; its id is then appended to the checkpoint. Specs already listed
+    in the checkpoint are skipped. Empty results and results cut off at
+    num_predict count as failures and are neither written nor checkpointed.
+
+    Args:
+        generator (CodeGenerator): Generator shared by all workers
+        specs (list): Specs from load_specs
+        output_dir (str): Directory that relative output paths are resolved against
+        checkpoint_path (str, optional): Checkpoint file; no resume support when omitted
+        max_workers (int): Maximum number of concurrent model requests
+        timeout (int): Request timeout in seconds for each spec
+        best_of (int): Candidates generated per spec; the first whose code parses is kept
+
+    Returns:
+        dict: {"done": n, "skipped": n, "failed": [spec ids]}
+    """
+    from tqdm import tqdm
+
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+    pending = [spec for spec in specs if not checkpoint or spec['id'] not in checkpoint.completed]
+    summary = {'done': 0, 'skipped': len(specs) - len(pending), 'failed': []}
+
+    def run(spec):
+        outcome = {}
+        generated = generator.generate_best_of(
+            spec['prompt'], spec['language'], n=best_of, timeout=timeout,
+            options=spec.get('options'), raise_errors=True, task='batch',
+            template=spec.get('template', 'auto'), outcome=outcome,
+        )
+        # Failed specs are not checkpointed, so a resumed run generates them again
+        if outcome.get('done_reason') == 'length':
+            raise ValueError("output was cut off at the num_predict budget")
+        code = extract_code(generated, spec['language'])
+        if not code.strip():
+            raise ValueError("the model returned no code")
+        output_path = os.path.join(output_dir, spec['output'])
+        _write_output(output_path, code)
+        if checkpoint:
+            checkpoint.mark_done(spec['id'], output_path)
+        return output_path
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(run, spec): spec for spec in pending}
+        with tqdm(total=len(specs), initial=summary['skipped'], desc="Generating", unit="spec") as progress:
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    future.result()
+                    summary['done'] += 1
+                except Exception as e:
+                    logger.error(f"Failed to generate {spec['id']}: {e}")
+                    summary['failed'].append(spec['id'])
+                progress.update(1)
+    return summary
@@ -0,0 +1,197 @@
+import os
+import re
+
+from code_generate.languages import LANGUAGE_EXTENSIONS
+
+# A path-like token with an extension, e.g. "src/app.py" or "index.test.js"
+_FILENAME = r'[\w\-./]*[\w\-]\.[A-Za-z0-9]{1,10}'
+_INFO_FILENAME = re.compile(rf'(?:title|file|filename|name)=["\']?({_FILENAME})["\']?|(?:^|[\s:])({_FILENAME})(?=\s|$)')
+_TEXT_FILENAME = re.compile(rf'^[#>*\s`"]*(?:file(?:name)?\s*:?\s*)?[`*"]*({_FILENAME})[`*"]*\s*:?\s*$', re.IGNORECASE)
+_COMMENT_FILENAME = re.compile(rf'^\s*(?:#|//|--|/\*|<!--)\s*(?:file(?:name)?\s*:\s*)?({_FILENAME})\s*(?:\*/|-->)?\s*$',
+                               re.IGNORECASE)
+
+
+def extract_code(generated_code, language=None):
+    """
+    Extract the first fenced code block from a model response
+
+    Args:
+        generated_code (str): Full model response
+        language (str, optional): Target language, used to recognize a fence with only a tag and no code
+
+    Returns:
+        str: Code inside the first fenced block, or the whole response if there is none
+    """
+    code_content = generated_code
+    if "```" in generated_code:
+        code_blocks = generated_code.split("```")
+        # Two parts means the block was never closed (cut off by a stop sequence or budget)
+        if len(code_blocks) >= 2:
+            code_content = code_blocks[1]
+            info, newline, body = code_content.partition("\n")
+            if newline:
+                # The rest of the opening fence line is its info string (language, filename), never code
+                code_content = body
+            elif not info.strip() or info.strip().lower() == (language or "").lower():
+                code_content = ""
+    return code_content
+
+
+def safe_relative_path(hint):
+    """Return hint as a relative path inside the output directory, or None if it escapes it"""
+    path = os.path.normpath(hint.replace('\\', '/'))
+    if os.path.isabs(path) or path == '..' or path.startswith('..' + os.sep) or path.startswith('/'):
+        return None
+    return path
+
+
+class FenceParser:
+    """
+    Incremental parser for fenced code blocks in streamed model output
+
+    Tokens are fed as they arrive; only the current partial line is buffered.
+    Each block is opened through ``open_block(index, language, hint)`` when its
+    first line arrives (so a filename comment on that line can name the file),
+    written line by line, and closed as soon as its closing fence is seen.
+    Filename hints come from the fence info string (```python app.py``,
+    ```title="app.py"``), the text line just before the fence (``**app.py**``),
+    or a comment on the first line of the block (``# app.py``).
+    """
+
+    def __init__(self, open_block, on_block_closed=None):
+        """
+        Args:
+            open_block (callable): (index, language, hint) -> writable file object
+            on_block_closed (callable, optional): Called with (index, file object) after a block is closed
+        """
+        self.open_block = open_block
+        self.on_block_closed = on_block_closed
+        self.block_count = 0
+        self._buffer = ""
+        self._last_text_line = ""
+        self._in_block = False
+        self._block_language = None
+        self._block_hint = None
+        self._file = None
+
+    def feed(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            self._line(line + "\n")
+
+    def close(self):
+        """Flush the last partial line and close a block left open by a truncated response"""
+        if self._buffer:
+            self._line(self._buffer)
+            self._buffer = ""
+        if self._in_block:
+            self._end_block()
+
+    def _line(self, line):
+        stripped = line.strip()
+        if self._in_block:
+            if stripped.startswith("```") and not stripped.strip("`"):
+                self._end_block()
+            else:
+                self._write(line)
+        elif stripped.startswith("```"):
+            self._start_block(stripped.lstrip("`").strip())
+        elif stripped:
+            self._last_text_line = stripped
+
+    def _start_block(self, info):
+        self._in_block = True
+        parts = info.split()
+        self._block_language = None
+        if parts and not re.fullmatch(_FILENAME, parts[0]):
+            self._block_language = parts[0].split(":")[0] or None
+
+        hint = None
+        match = _INFO_FILENAME.search(info)
+        if match:
+            hint = match.group(1) or match.group(2)
+        if not hint and len(self._last_text_line) < 120:
+            match = _TEXT_FILENAME.match(self._last_text_line)
+            if match:
+                hint = match.group(1)
+        self._block_hint = hint
+        self._last_text_line = ""
+
+    def _write(self, line):
+        if self._file is None:
+            if self._block_hint is None:
+                match = _COMMENT_FILENAME.match(line)
+                if match:
+                    self._block_hint = match.group(1)
+            self._file = self.open_block(self.block_count, self._block_language, self._block_hint)
+        self._file.write(line)
+
+    def _end_block(self):
+        if self._file is None:
+            # Empty block: still create the file so numbering stays predictable
+            self._file = self.open_block(self.block_count, self._block_language, self._block_hint)
+        self._file.close()
+        if self.on_block_closed:
+            self.on_block_closed(self.block_count, self._file)
+        self._file = None
+        self._in_block = False
+        self.block_count += 1
+
+
+class BlockFileWriter:
+    """
+    Decides where each streamed code block is written
+
+    With an output file, the first block goes to that file and later blocks go
+    next to it, named by their filename hint or ``<stem>_<n><ext>``. With an
+    output directory, every block goes to ``<dir>/<hint>`` or ``<dir>/block_<n><ext>``.
+    Apart from the output file itself, a file that exists and was not written
+    by this run is never overwritten; the block gets the next free numbered name.
+    """
+
+    def __init__(self, output_path=None, output_dir=None, language=None):
+        self.output_path = output_path
+        self.output_dir = output_dir if output_dir is not None else os.path.dirname(output_path or "")
+        self.language = language
+        self.written = []
+
+    def _extension(self, block_language):
+        language = (block_language or self.language or "").lower()
+        return LANGUAGE_EXTENSIONS.get(language, os.path.splitext(self.output_path or "")[1] or ".txt")
+
+    def _numbered(self, number, extension):
+        if self.output_path:
+            stem = os.path.splitext(self.output_path)[0]
+            return f"{stem}_{number}{extension}"
+        return os.path.join(self.output_dir, f"block_{number}{extension}")
+
+    def _taken(self, path):
+        # Files from this run may be reopened (a repeated hint); anything else already on disk is kept
+        return os.path.exists(path) and path not in self.written
+
+    def path_for(self, index, block_language, hint):
+        if self.output_path and index == 0:
+            return self.output_path
+        relative = safe_relative_path(hint) if hint else None
+        if relative:
+            path = os.path.join(self.output_dir, relative)
+            if not self._taken(path):
+                return path
+        # A hint that had to be dropped still tells the file type
+        extension = (os.path.splitext(relative)[1] if relative else "") or self._extension(block_language)
+        number = index + 1
+        path = self._numbered(number, extension)
+        while self._taken(path) or path in self.written:
+            number += 1
+            path = self._numbered(number, extension)
+        return path
+
+    def open(self, index, block_language, hint):
+        path = self.path_for(index, block_language, hint)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path not in self.written:
+            self.written.append(path)
+        return open(path, "w", encoding="utf-8")
@@ -1,57 +1,74 @@
-import requests
 import time
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from code_generate.code_extractor import extract_code
+from code_generate.policies import BlockWatcher, policy_options, resolve_policy
+from code_generate.templates import get_template, list_templates, match_template
+from code_generate.validation import check_syntax, get_checker_pool, has_checker
+from common.chat_session import ChatSession
+from common.metrics import get_recorder
+from common.model_registry import get_registry
+from common.ollama_client import OllamaError, OllamaTimeoutError, get_client
+from common.options import apply_profile, get_profile
+from common.prompt_budget import compact_text, fit_context
+from common.request_log import get_request_log
+from common.response_cache import make_key
+from config import (
+    BEST_OF_TEMPERATURES,
+    DEFAULT_MODEL,
+    OLLAMA_BASE_URL,
+    OPTIONS_TUNED_FILE,
+    SESSION_NUM_CTX,
+    TEMPLATE_PREFILL,
+)
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class CodeGenerator:
-    def __init__(self, model_name="qwen2.5-coder", ollama_base_url="http://localhost:11434"):
+    def __init__(self, model_name=DEFAULT_MODEL, ollama_base_url=OLLAMA_BASE_URL, client=None, cache=None,
+                 metrics=None, request_log=None, options=None, registry=None, tuned_path=OPTIONS_TUNED_FILE):
         """
         Initialize the code generator class
         
         Args:
             model_name (str): Name of the Ollama model to use
             ollama_base_url (str): Ollama API server URL
+            client (OllamaClient, optional): Client to use instead of the shared pooled one
+            cache (ResponseCache, optional): Response cache; generated code is not cached when omitted
+            metrics (MetricsRecorder, optional): Sink for per-call token/timing metrics (default: shared recorder)
+            request_log (RequestLog, optional): Prompt/response debug log (default: shared log, if enabled)
+            options (dict, optional): Runtime options overriding the "generate" option profile
+            registry (ModelRegistry, optional): Model registry to use instead of the shared one for the URL
+            tuned_path (str, optional): Autotuned options file, None to ignore it
         """
         self.model_name = model_name
         self.ollama_base_url = ollama_base_url
-        self.api_url = f"{ollama_base_url}/api/generate"
+        self.client = client or get_client(ollama_base_url)
+        self.api_url = self.client.url("/api/generate")
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else get_recorder()
+        self.request_log = request_log if request_log is not None else get_request_log()
+        # Runtime options (num_ctx, num_thread, ...) and keep_alive sent with every request
+        self.profile = get_profile("generate", options, tuned_path)
+        self.registry = registry or get_registry(ollama_base_url, self.client)
         logger.info(f"CodeGenerator initialized with model: {model_name}")
         
         # Check if the model is available
         self._check_model_availability()
         
     def _check_model_availability(self):
-        """Check if the model is available locally, warn if it will be downloaded"""
-        try:
-            response = requests.get(f"{self.ollama_base_url}/api/tags")
-            models = response.json().get("models", [])
-            available_models = [model["name"] for model in models]
-            
-            if self.model_name not in available_models:
-                logger.warning(f"Model {self.model_name} is not available locally. It will be downloaded on first use.")
-            else:
-                logger.info(f"Model {self.model_name} is available locally.")
-        except Exception as e:
-            logger.error(f"Failed to check model availability: {e}")
-            logger.warning("Make sure Ollama server is running at: " + self.ollama_base_url)
+        """Check in the background if the model is available locally, warn if it will be downloaded"""
+        self.registry.check_model(self.model_name)
 
-    def generate_code(self, prompt, language=None, timeout=60):
-        """
-        Generate code based on the prompt
-        
-        Args:
-            prompt (str): Description of requirements for code generation
-            language (str, optional): Programming language for the generated code (e.g., "python", "javascript")
-            timeout (int): Request timeout in seconds
-            
-        Returns:
-            str: Generated code
-        """
-        if not prompt.strip():
-            return "No requirements provided for code generation."
-            
+    @property
+    def model_digest(self):
+        """Digest of the local model weights, or None if unknown"""
+        return self.registry.digest(self.model_name)
+
+    def _build_system_prompt(self, language=None):
+        """Build the code generation instructions for a language"""
         lang_instruction = f"in {language} programming language " if language else ""
         include_comments = True  # Default to including comments unless specified otherwise
         comment_instruction = (
@@ -79,30 +96,395 @@ class CodeGenerator:
     '''{language or ""}
     <your code here>'''
         """
+        return compact_text(system_prompt)
+
+    def start_session(self):
+        """
+        Start a multi-turn generation session for interactive use
+
+        The instructions become a stable system prompt and the model is kept warm
+        between turns, so each request only pays prefill for the new requirements.
+
+        Returns:
+            ChatSession: Session whose send()/stream() take build_session_message() output
+        """
+        return ChatSession(
+            self.client, self.model_name, self._build_system_prompt(),
+            metrics=self.metrics, operation="generate_chat",
+            options=self._session_options(),
+        )
+
+    def _session_options(self):
+        options = {k: v for k, v in self.profile.items() if k != "keep_alive"}
+        options.update(policy_options(resolve_policy(task="interactive")) or {})
+        # The conversation grows turn by turn, so sessions get a fixed context instead of a per-prompt one
+        options.setdefault("num_ctx", SESSION_NUM_CTX)
+        return options
+
+    @staticmethod
+    def build_session_message(prompt, language=None):
+        """Format one set of requirements as a session turn"""
+        lang_line = f"Language: {language}\n" if language else ""
+        return f"{lang_line}Requirements: {prompt}"
+
+    def _match_template(self, prompt, language=None, template="auto"):
+        """
+        Resolve the skeleton for a request
+
+        Returns:
+            tuple: (response to return without a model call for pure scaffolding, or None;
+                    skeleton to put in the prompt, or None)
+        """
+        if template is None or not language:
+            return None, None
+        if template == "auto":
+            kind, skeleton, pure = match_template(prompt, language)
+            if not TEMPLATE_PREFILL and not pure:
+                skeleton = None
+        else:
+            kind, skeleton = template, get_template(language, template)
+            pure = not prompt.strip()
+            if skeleton is None:
+                logger.warning(f"No '{template}' template for {language}; available: "
+                               f"{', '.join(kind for _, kind in list_templates(language)) or 'none'}")
+        if skeleton is None:
+            return None, None
+        if pure:
+            logger.info(f"Serving the {language} {kind} template without a model call")
+            return f"```{language}\n{skeleton}```\n", None
+        logger.info(f"Starting from the {language} {kind} template")
+        return None, skeleton
+
+    def _build_payload(self, prompt, language=None, options=None, policy=None, skeleton=None):
+        system_prompt = self._build_system_prompt(language)
 
         full_prompt = f"{system_prompt}\n\nRequirements: {prompt}"
-        
-        try:
-            start_time = time.time()
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model_name,
-                    "prompt": full_prompt,
-                    "stream": False
-                },
-                timeout=timeout
+        if skeleton:
+            full_prompt += (
+                "\n\nStart from this skeleton: keep its structure, rename the placeholders to fit the "
+                f"requirements and fill in the bodies.\n```{language or ''}\n{skeleton}```"
             )
-            response.raise_for_status()
-            result = response.json()
-            
-            elapsed_time = time.time() - start_time
-            logger.info(f"Code generation completed in {elapsed_time:.2f} seconds")
+        payload = {
+            "model": self.model_name,
+            "prompt": full_prompt
+        }
+        if policy is not None:
+            options = policy_options(policy, options)
+        if options:
+            payload["options"] = options
+        payload = apply_profile(payload, self.profile)
+        prompt_tokens, num_ctx, fits = fit_context(payload)
+        if not fits:
+            logger.warning(f"Prompt of ~{prompt_tokens} tokens plus the reply does not fit in num_ctx {num_ctx}; "
+                           f"the requirements will be truncated")
+        return payload
+
+    def _should_log(self):
+        return self.request_log is not None and self.request_log.sampled()
+
+    def _stream(self, payload, timeout, policy, outcome=None):
+        """
+        Stream a generation, serving and filling the cache; raises OllamaError on failure
+
+        The request is aborted (which also stops decoding on the server) as soon
+        as the policy's code blocks are complete. If outcome is a dict, its
+        "done_reason" is set once the stream ends ("cached" for a cache hit).
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_key(payload, self.model_digest)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving generated code from cache")
+                if self.metrics is not None:
+                    self.metrics.record_call("generate", self.model_name, None, 0.0, cached=True)
+                if outcome is not None:
+                    outcome["done_reason"] = "cached"
+                yield cached
+                return
+
+        watcher = BlockWatcher(policy) if policy is not None else None
+        if watcher is not None and not watcher.active:
+            watcher = None
+        logged = self._should_log()
+        # Only keep the full response when it is going to be cached or logged
+        chunks = [] if cache_key or logged else None
+        start_time = time.time()
+        first_token_time = None
+        token_count = 0
+        final = None
+        stream = self.client.generate_stream(payload, timeout=timeout)
+        try:
+            for message in stream:
+                chunk = message.get("response", "")
+                if chunk:
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    token_count += 1
+                    if chunks is not None:
+                        chunks.append(chunk)
+                    yield chunk
+                    if watcher is not None and watcher.feed(chunk):
+                        final = {"eval_count": token_count, "done_reason": "block_complete"}
+                        break
+                if message.get("done"):
+                    final = message
+                    break
+        finally:
+            # Dropping the connection early makes Ollama stop decoding
+            stream.close()
+        if final is None:
+            return
+
+        if outcome is not None:
+            outcome["done_reason"] = final.get("done_reason")
+        elapsed_time = time.time() - start_time
+        logger.info(f"Code generation completed in {elapsed_time:.2f} seconds ({final.get('done_reason')})")
+        if final.get("done_reason") == "length":
+            logger.warning(f"Output stopped at the num_predict budget ({payload.get('options', {}).get('num_predict')} tokens)")
+        if self.metrics is not None:
+            ttft = first_token_time - start_time if first_token_time else None
+            self.metrics.record_call("generate", self.model_name, final, elapsed_time, ttft)
+        if chunks is not None:
+            response = "".join(chunks)
+            # Output cut off at num_predict is not worth serving again
+            if cache_key and response and final.get("done_reason") != "length":
+                self.cache.set(cache_key, response)
+            if logged:
+                self.request_log.log("generate", self.model_name, payload["prompt"], response,
+                                     done_reason=final.get("done_reason"))
+
+    def generate_code(self, prompt, language=None, timeout=60, options=None, raise_errors=False, task="generate",
+                      template="auto", outcome=None):
+        """
+        Generate code based on the prompt
+        
+        Args:
+            prompt (str): Description of requirements for code generation
+            language (str, optional): Programming language for the generated code (e.g., "python", "javascript")
+            timeout (int): Request timeout in seconds
+            options (dict, optional): Ollama runtime options (e.g. {"temperature": 0.2})
+            raise_errors (bool): Raise OllamaError instead of returning an error message
+            task (str): Generation policy to apply (see resolve_policy), None for no policy
+            template (str): Skeleton to use: "auto" to pick one from the prompt, a kind such as "class", or None
+            outcome (dict, optional): Receives the "done_reason" of the generation (see _stream)
             
-            return result["response"]
-        except requests.exceptions.Timeout:
+        Returns:
+            str: Generated code
+        """
+        scaffold, skeleton = self._match_template(prompt, language, template)
+        if scaffold is not None:
+            return scaffold
+        if not prompt.strip():
+            return "No requirements provided for code generation."
+
+        policy = resolve_policy(language, task) if task else None
+        payload = self._build_payload(prompt, language, options, policy, skeleton)
+        try:
+            return "".join(self._stream(payload, timeout, policy, outcome))
+        except OllamaTimeoutError:
             logger.error(f"Request timed out after {timeout} seconds")
+            if raise_errors:
+                raise
+            return "The request timed out. Please try again with a simpler requirement."
+        except Exception as e:
+            logger.error(f"Error generating code: {str(e)}")
+            if raise_errors:
+                raise
+            return f"An error occurred during code generation: {str(e)}"
+
+    def generate_best_of(self, prompt, language=None, n=3, timeout=60, options=None, raise_errors=False,
+                         task="generate", template="auto", outcome=None):
+        """
+        Generate n candidates concurrently and return the first whose code parses
+
+        Candidates use different seeds and temperatures (BEST_OF_TEMPERATURES).
+        Each one is syntax-checked in a process pool as soon as it completes;
+        the first that passes is returned and the others are cancelled, which
+        closes their streams and stops decoding. Languages without a checker
+        return the first completed candidate. If no candidate parses, the
+        first completed one is returned.
+
+        Args:
+            prompt (str): Description of requirements for code generation
+            language (str, optional): Programming language for the generated code
+            n (int): Number of candidates
+            timeout (int): Request timeout in seconds for each candidate
+            options (dict, optional): Ollama options; an explicit temperature or seed applies to every candidate
+            raise_errors (bool): Raise OllamaError instead of returning an error message
+            task (str): Generation policy to apply (see resolve_policy), None for no policy
+            template (str): Skeleton to use: "auto" to pick one from the prompt, a kind such as "class", or None
+            outcome (dict, optional): Receives the "done_reason" of the chosen candidate
+
+        Returns:
+            str: Full response of the chosen candidate
+        """
+        if n <= 1:
+            return self.generate_code(prompt, language, timeout, options, raise_errors, task, template, outcome)
+        scaffold, skeleton = self._match_template(prompt, language, template)
+        if scaffold is not None:
+            return scaffold
+        if not prompt.strip():
+            return "No requirements provided for code generation."
+
+        policy = resolve_policy(language, task) if task else None
+        checker = get_checker_pool() if has_checker(language) else None
+        if checker is not None:
+            # Start the checker processes while the candidates are decoding
+            checker.submit(check_syntax, "", None)
+        cancelled = threading.Event()
+        done_reasons = {}
+
+        def chosen(index, response):
+            if outcome is not None:
+                outcome["done_reason"] = done_reasons.get(index)
+            return response
+
+        def candidate(index):
+            sampling = {"seed": index, "temperature": BEST_OF_TEMPERATURES[index % len(BEST_OF_TEMPERATURES)]}
+            payload = self._build_payload(prompt, language, {**sampling, **(options or {})}, policy, skeleton)
+            result = {}
+            tokens = self._stream(payload, timeout, policy, result)
+            chunks = []
+            try:
+                for chunk in tokens:
+                    if cancelled.is_set():
+                        return None
+                    chunks.append(chunk)
+            finally:
+                tokens.close()
+            done_reasons[index] = result.get("done_reason")
+            return "".join(chunks)
+
+        start_time = time.time()
+        executor = ThreadPoolExecutor(max_workers=n, thread_name_prefix="best-of")
+        generating = {executor.submit(candidate, index): index for index in range(n)}
+        checking = {}
+        first_response = None
+        first_index = None
+        last_error = None
+        try:
+            while generating or checking:
+                done, _ = wait(list(generating) + list(checking), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in generating:
+                        index = generating.pop(future)
+                        try:
+                            response = future.result()
+                        except Exception as e:
+                            logger.warning(f"Candidate {index} failed: {e}")
+                            last_error = e
+                            continue
+                        if not response:
+                            continue
+                        if checker is None:
+                            return chosen(index, response)
+                        if first_response is None:
+                            first_response, first_index = response, index
+                        checking[checker.submit(check_syntax, extract_code(response, language), language)] = (
+                            index, response)
+                    else:
+                        index, response = checking.pop(future)
+                        try:
+                            ok, error = future.result()
+                        except Exception as e:
+                            logger.warning(f"Syntax check of candidate {index} failed to run: {e}")
+                            ok, error = True, None
+                        if ok:
+                            logger.info(f"Candidate {index} parses ({time.time() - start_time:.2f} seconds)")
+                            return chosen(index, response)
+                        logger.info(f"Candidate {index} does not parse: {error}")
+        finally:
+            # Remaining candidates stop at their next token; do not wait for them
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if first_response is not None:
+            logger.warning(f"None of the {n} candidates parses; returning the first one")
+            return chosen(first_index, first_response)
+        if raise_errors:
+            raise last_error if last_error is not None else OllamaError("no candidate produced code")
+        if isinstance(last_error, OllamaTimeoutError):
             return "The request timed out. Please try again with a simpler requirement."
+        if last_error is None:
+            return "An error occurred during code generation: no candidate produced code."
+        return f"An error occurred during code generation: {str(last_error)}"
+
+    def stream_code(self, prompt, language=None, timeout=60, options=None, raise_errors=False, task="file",
+                    template="auto"):
+        """
+        Generate code based on the prompt, yielding tokens as they arrive
+
+        Args:
+            prompt (str): Description of requirements for code generation
+            language (str, optional): Programming language for the generated code
+            timeout (int): Request timeout in seconds
+            options (dict, optional): Ollama runtime options
+            raise_errors (bool): Raise OllamaError instead of yielding an error message
+            task (str): Generation policy to apply (see resolve_policy), None for no policy
+            template (str): Skeleton to use: "auto" to pick one from the prompt, a kind such as "class", or None
+
+        Yields:
+            str: Chunks of the model response
+        """
+        scaffold, skeleton = self._match_template(prompt, language, template)
+        if scaffold is not None:
+            yield scaffold
+            return
+        if not prompt.strip():
+            yield "No requirements provided for code generation."
+            return
+
+        policy = resolve_policy(language, task) if task else None
+        payload = self._build_payload(prompt, language, options, policy, skeleton)
+        try:
+            yield from self._stream(payload, timeout, policy)
+        except OllamaTimeoutError:
+            logger.error(f"Request timed out after {timeout} seconds")
+            if raise_errors:
+                raise
+            yield "\nThe request timed out. Please try again with a simpler requirement."
         except Exception as e:
             logger.error(f"Error generating code: {str(e)}")
-            return f"An error occurred during code generation: {str(e)}"
\ No newline at end of file
+            if raise_errors:
+                raise
+            yield f"\nAn error occurred during code generation: {str(e)}"
+
+    def fill_in_middle(self, prefix, suffix, timeout=60, options=None, num_predict=None):
+        """
+        Generate the code between a prefix and a suffix (fill-in-the-middle)
+
+        The suffix goes in Ollama's ``suffix`` field, so FIM-trained models
+        (qwen2.5-coder, codellama, ...) decode only the missing middle.
+
+        Args:
+            prefix (str): Code before the gap
+            suffix (str): Code after the gap
+            timeout (int): Request timeout in seconds
+            options (dict, optional): Ollama runtime options
+            num_predict (int, optional): Token budget for the middle, unless options set one
+
+        Returns:
+            tuple: (generated middle, done_reason such as "stop", "length" or "cached")
+
+        Raises:
+            OllamaError: If the request fails
+        """
+        options = dict(options or {})
+        if num_predict:
+            options.setdefault("num_predict", num_predict)
+        payload = {"model": self.model_name, "prompt": prefix, "suffix": suffix}
+        if options:
+            payload["options"] = options
+        payload = apply_profile(payload, self.profile)
+        prompt_tokens, num_ctx, fits = fit_context(payload)
+        if not fits:
+            logger.warning(f"Code around the edit (~{prompt_tokens} tokens) does not fit in num_ctx {num_ctx}; "
+                           f"lower EDIT_CONTEXT_LINES")
+        outcome = {}
+        try:
+            middle = "".join(self._stream(payload, timeout, None, outcome))
+        except OllamaTimeoutError:
+            logger.error(f"Request timed out after {timeout} seconds")
+            raise
+        return middle, outcome.get("done_reason")
@@ -0,0 +1,169 @@
+import ast
+import difflib
+import os
+import textwrap
+
+from code_explain.chunker import split_units
+from code_explain.languages import detect_language
+from code_generate.code_extractor import extract_code
+from common.prompt_budget import LINE_COMMENTS, estimate_tokens
+from config import EDIT_CONTEXT_LINES, EDIT_NUM_PREDICT_EXTRA, EDIT_NUM_PREDICT_FACTOR
+
+
+def parse_line_range(value):
+    """Parse "10-20" or "15" into a 1-based inclusive (start, end) pair"""
+    start, sep, end = value.partition("-")
+    try:
+        start = int(start)
+        end = int(end) if sep else start
+    except ValueError:
+        raise ValueError(f"expected a line range like 10-20, got {value!r}")
+    if start < 1 or end < start:
+        raise ValueError(f"invalid line range {value!r}")
+    return start, end
+
+
+def _python_symbols(source):
+    """Yield (qualified name, start, end) for every function and class, decorators included"""
+    def walk(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                yield name, start, child.end_lineno
+                yield from walk(child, name + ".")
+
+    yield from walk(ast.parse(source), "")
+
+
+def find_symbol(source, symbol, language=None):
+    """
+    Find the lines of a function or class
+
+    Python symbols may be qualified ("Parser.parse"); an unqualified name
+    matches the first definition with that name at any depth. Other languages
+    only see top-level definitions.
+
+    Returns:
+        tuple: 1-based inclusive (start, end)
+
+    Raises:
+        ValueError: If the symbol is not defined in the source
+    """
+    if language == "Python":
+        try:
+            symbols = list(_python_symbols(source))
+        except SyntaxError as e:
+            raise ValueError(f"cannot parse the file: {e}")
+        for name, start, end in symbols:
+            if name == symbol:
+                return start, end
+        for name, start, end in symbols:
+            if name.rsplit(".", 1)[-1] == symbol:
+                return start, end
+    else:
+        for unit in split_units(source, language, pack=False):
+            if unit.name == symbol:
+                return unit.start, unit.end
+    raise ValueError(f"'{symbol}' is not defined in the file")
+
+
+def _instruction_comment(instruction, original, indent, comment):
+    """Comment placed right before the region so the model knows what to write there"""
+    lines = [f"{indent}{comment} Rewrite the code at this point: {line}" if number == 0 else f"{indent}{comment} {line}"
+             for number, line in enumerate(instruction.strip().splitlines())] if instruction.strip() else []
+    if original.strip():
+        lines.append(f"{indent}{comment} Code being replaced:")
+        lines.extend(f"{indent}{comment}     {line}" for line in textwrap.dedent(original).splitlines())
+    return "".join(line + "\n" for line in lines)
+
+
+def build_fim_parts(source, start, end, instruction="", language=None, context_lines=EDIT_CONTEXT_LINES):
+    """
+    Split a file around the lines being rewritten
+
+    Args:
+        source (str): Full file contents
+        start (int): First line of the region (1-based)
+        end (int): Last line of the region (inclusive)
+        instruction (str): What to change, added as a comment before the region
+        language (str, optional): Language name as returned by detect_language
+        context_lines (int, optional): Lines of context kept on each side, None for the whole file
+
+    Returns:
+        tuple: (prefix, suffix, original region) to send as prompt and suffix
+    """
+    lines = source.splitlines(keepends=True)
+    if end > len(lines):
+        raise ValueError(f"line {end} is past the end of the file ({len(lines)} lines)")
+    before, region, after = lines[:start - 1], lines[start - 1:end], lines[end:]
+    if context_lines is not None:
+        before, after = before[max(0, len(before) - context_lines):], after[:context_lines]
+
+    original = "".join(region)
+    first = next((line for line in region if line.strip()), "")
+    indent = first[:len(first) - len(first.lstrip())]
+    comment = (LINE_COMMENTS.get((language or "").lower()) or ("#",))[0]
+    prefix = "".join(before) + _instruction_comment(instruction, original.rstrip("\n"), indent, comment)
+    return prefix, "".join(after), original
+
+
+def splice(source, start, end, middle):
+    """Replace lines start..end of source with middle"""
+    lines = source.splitlines(keepends=True)
+    if middle and not middle.endswith("\n") and lines[end - 1].endswith("\n"):
+        middle += "\n"
+    return "".join(lines[:start - 1]) + middle + "".join(lines[end:])
+
+
+def edit_num_predict(original):
+    """Decode budget for rewriting a region, proportional to its size"""
+    return estimate_tokens(original) * EDIT_NUM_PREDICT_FACTOR + EDIT_NUM_PREDICT_EXTRA
+
+
+def edit_file(generator, path, instruction="", lines=None, symbol=None, timeout=60, options=None):
+    """
+    Rewrite part of a file with fill-in-the-middle generation
+
+    Only the code around the region is sent (as prompt and suffix), so the
+    model decodes just the replacement, not the whole file.
+
+    Args:
+        generator (CodeGenerator): Generator used for the request
+        path (str): File to edit
+        instruction (str): What to change
+        lines (tuple, optional): 1-based inclusive (start, end) to rewrite
+        symbol (str, optional): Function or class to rewrite instead of a line range
+        timeout (int): Request timeout in seconds
+        options (dict, optional): Ollama options
+
+    Returns:
+        tuple: (new file contents, unified diff)
+
+    Raises:
+        ValueError: If the region cannot be found, or the model returned nothing
+            or stopped at the num_predict budget (the file is left unchanged)
+        OllamaError: If the request fails
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    language = detect_language(path)
+    start, end = lines if lines else find_symbol(source, symbol, language)
+    prefix, suffix, original = build_fim_parts(source, start, end, instruction, language)
+
+    num_predict = edit_num_predict(original)
+    middle, done_reason = generator.fill_in_middle(prefix, suffix, timeout=timeout, options=options,
+                                                   num_predict=num_predict)
+    if done_reason == "length":
+        budget = (options or {}).get("num_predict", num_predict)
+        raise ValueError(f"the replacement was cut off at the num_predict budget ({budget} tokens); "
+                         f"raise it with -O num_predict=N or edit a smaller region")
+    if middle.lstrip().startswith("```"):
+        middle = extract_code(middle.lstrip())
+    if not middle.strip():
+        raise ValueError("the model returned no code for the region")
+    updated = splice(source, start, end, middle)
+    name = os.path.basename(path)
+    diff = "".join(difflib.unified_diff(source.splitlines(keepends=True), updated.splitlines(keepends=True),
+                                        f"a/{name}", f"b/{name}"))
+    return updated, diff
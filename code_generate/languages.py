@@ -0,0 +1,17 @@
+# File extension used when a spec does not name its output file
+LANGUAGE_EXTENSIONS = {
+    'python': '.py',
+    'javascript': '.js',
+    'typescript': '.ts',
+    'java': '.java',
+    'c': '.c',
+    'c++': '.cpp',
+    'cpp': '.cpp',
+    'c#': '.cs',
+    'go': '.go',
+    'rust': '.rs',
+    'ruby': '.rb',
+    'php': '.php',
+    'swift': '.swift',
+    'kotlin': '.kt',
+}
@@ -1,28 +1,148 @@
 import sys
 import os
 import argparse
+import logging
 from pathlib import Path
 
-# Add project root directory to Python path
-sys.path.append(str(Path(__file__).resolve().parent.parent))
+if __name__ == "__main__":
+    # Add the project root to the Python path when run as a script (not needed for the installed engineer-generate)
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
 
+from code_generate.batch import generate_batch, load_specs
+from code_generate.code_extractor import BlockFileWriter, FenceParser
 from code_generate.code_generator import CodeGenerator
+from code_generate.editor import edit_file, parse_line_range
+from code_generate.templates import TEMPLATES
+from common.ollama_client import OllamaError
+from common.options import parse_option_overrides
+from common.response_cache import ResponseCache
+from config import CACHE_DIR, DEFAULT_MODEL, GENERATE_WORKERS, OLLAMA_BASE_URL
+
+TEMPLATE_KINDS = sorted({kind for _, kind in TEMPLATES})
+
+def run_batch(generator, args):
+    """Generate code for every spec in a JSONL file or directory, resuming from a checkpoint"""
+    try:
+        specs = load_specs(args.batch, args.language)
+    except (OSError, ValueError) as e:
+        print(f"Error while reading specs: {str(e)}")
+        return 1
+
+    checkpoint = args.checkpoint or args.batch.rstrip("/\\") + ".checkpoint.jsonl"
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    print(f"Generating {len(specs)} specs with {args.workers} workers (checkpoint: {checkpoint})...")
+    summary = generate_batch(
+        generator, specs,
+        output_dir=args.output_dir,
+        checkpoint_path=checkpoint,
+        max_workers=args.workers,
+        best_of=args.best_of,
+    )
+    print(f"Done: {summary['done']}, skipped (already completed): {summary['skipped']}, failed: {len(summary['failed'])}")
+    if summary['failed']:
+        print("Failed specs: " + ", ".join(summary['failed']))
+        return 1
+    return 0
+
+def run_edit(generator, args):
+    """Rewrite a line range or symbol of a file in place, or print the diff with --dry-run"""
+    instruction = args.instruction or ""
+    try:
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                instruction = f.read()
+        lines = parse_line_range(args.lines) if args.lines else None
+        print(f"Editing {args.edit} ({'lines ' + args.lines if lines else args.symbol})...", file=sys.stderr)
+        updated, diff = edit_file(generator, args.edit, instruction, lines=lines, symbol=args.symbol)
+    except (OSError, ValueError, OllamaError) as e:
+        print(f"Error: {str(e)}")
+        return 1
+
+    if not diff:
+        print("No changes.")
+        return 0
+    print(diff, end="")
+    if args.dry_run:
+        return 0
+    output = args.output or args.edit
+    tmp_path = output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(updated)
+    os.replace(tmp_path, output)
+    print(f"\nSaved to: '{output}'", file=sys.stderr)
+    return 0
+
+def make_block_writer(output, language=None):
+    """Write to a single file, or to a directory when output is one or ends with a separator"""
+    if os.path.isdir(output) or output.endswith(("/", os.sep)):
+        return BlockFileWriter(output_dir=output, language=language)
+    return BlockFileWriter(output_path=output, language=language)
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description="Code Generation Tool")
     parser.add_argument("--file", "-f", help="Path to the requirements file")
-    parser.add_argument("--output", "-o", help="Path to save the generated code")
+    parser.add_argument("--output", "-o",
+                        help="File to save the generated code to (extra code blocks are saved next to it), "
+                             "or a directory to save every block into")
     parser.add_argument("--language", "-l", help="Programming language to generate (e.g., python, javascript)")
-    parser.add_argument("--model", "-m", default="qwen2.5-coder", help="Model name to use (default: qwen2.5-coder)")
-    parser.add_argument("--url", default="http://localhost:11434", help="Ollama API URL (default: http://localhost:11434)")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL, help=f"Model name to use (default: {DEFAULT_MODEL})")
+    parser.add_argument("--url", default=OLLAMA_BASE_URL, help=f"Ollama API URL, comma-separated to balance across several hosts (default: {OLLAMA_BASE_URL})")
+    parser.add_argument("--batch", "-b", help="JSONL file or directory of requirement specs to generate in one run")
+    parser.add_argument("--output-dir", default=".", help="Base directory for batch outputs (default: current directory)")
+    parser.add_argument("--workers", "-j", type=int, default=GENERATE_WORKERS,
+                        help=f"Concurrent requests in batch mode (default: {GENERATE_WORKERS})")
+    parser.add_argument("--best-of", "-n", type=int, default=1,
+                        help="Generate this many candidates concurrently and keep the first whose code parses "
+                             "(Python, and JavaScript when node is installed; default: 1)")
+    parser.add_argument("--template", "-t", default="auto", choices=["auto", "none"] + TEMPLATE_KINDS,
+                        help="Skeleton to start from; 'auto' uses one only when the requirements ask for a template, "
+                             "boilerplate or skeleton, and a template-only "
+                             "request such as 'python unittest boilerplate' is answered without the model (default: auto)")
+    parser.add_argument("--edit", "-e", metavar="PATH",
+                        help="Rewrite part of an existing file; only the new code for --lines/--symbol is generated, "
+                             "with the rest of the file sent as context (fill-in-the-middle)")
+    parser.add_argument("--lines", help="Line range to rewrite with --edit, e.g. 10-20")
+    parser.add_argument("--symbol", help="Function or class to rewrite with --edit, e.g. parse or Parser.parse")
+    parser.add_argument("--instruction", "-i", help="What to change with --edit (or put it in --file)")
+    parser.add_argument("--dry-run", action="store_true", help="With --edit, print the diff without writing the file")
+    parser.add_argument("--checkpoint", help="Checkpoint file for batch mode (default: <batch>.checkpoint.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and regenerate every spec")
+    parser.add_argument("--no-session", action="store_true",
+                        help="In interactive mode, send every request independently instead of reusing the conversation")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache and always call the model")
+    parser.add_argument("--clear-cache", action="store_true", help="Clear the response cache before running")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Response cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--option", "-O", action="append", metavar="KEY=VALUE",
+                        help="Ollama runtime option, repeatable (e.g. -O num_ctx=8192 -O keep_alive=30m)")
     
     args = parser.parse_args()
+    if args.edit and bool(args.lines) == bool(args.symbol):
+        parser.error("--edit needs exactly one of --lines or --symbol")
     
     model_name = args.model
     ollama_url = args.url
     language = args.language
+    try:
+        options = parse_option_overrides(args.option)
+    except ValueError as e:
+        parser.error(str(e))
     
-    generator = CodeGenerator(model_name=model_name, ollama_base_url=ollama_url)
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    if args.clear_cache:
+        removed = (cache or ResponseCache(args.cache_dir)).clear()
+        print(f"Cleared {removed} cached responses.")
+        if not args.file and not args.edit and not args.batch:
+            return 0
+
+    generator = CodeGenerator(model_name=model_name, ollama_base_url=ollama_url, cache=cache, options=options)
+
+    if args.batch:
+        return run_batch(generator, args)
+    if args.edit:
+        return run_edit(generator, args)
     
     # If reading requirements from a file
     if args.file:
@@ -33,34 +153,41 @@ def main():
             print(f"Read requirements from file: {args.file}")
             print("\nGenerating code...\n")
             
-            generated_code = generator.generate_code(prompt, language)
-            
+            # Blocks are written (and closed) as soon as their closing fence streams in
+            writer = None
+            fence_parser = None
+            if args.output:
+                writer = make_block_writer(args.output, language)
+                fence_parser = FenceParser(writer.open, on_block_closed=lambda index, f: print(
+                    f"\n[saved {f.name}]", file=sys.stderr, flush=True))
+
             print("\n" + "="*50 + "\n")
-            print(generated_code)
+            template = None if args.template == "none" else args.template
+            if args.best_of > 1:
+                tokens = [generator.generate_best_of(prompt, language, n=args.best_of, task="file", template=template)]
+            else:
+                tokens = generator.stream_code(prompt, language, template=template)
+            for token in tokens:
+                print(token, end="", flush=True)
+                if fence_parser is not None:
+                    fence_parser.feed(token)
             print("\n" + "="*50)
-            
-            # Save result to file
-            if args.output:
-                try:
-                    with open(args.output, 'w', encoding='utf-8') as f:
-                        code_content = generated_code
-                        if "```" in generated_code:
-                            code_blocks = generated_code.split("```")
-                            if len(code_blocks) >= 3:
-                                code_content = code_blocks[1]
-                                if code_content.startswith(language or ""):
-                                    code_content = code_content.split("\n", 1)[1] if "\n" in code_content else ""
-                        
-                        f.write(code_content)
-                    print(f"\nGenerated code saved to '{args.output}'.")
-                except Exception as e:
-                    print(f"Error while saving file: {str(e)}")
+
+            if fence_parser is not None:
+                fence_parser.close()
+                if writer.written:
+                    print("\nGenerated code saved to: " + ", ".join(f"'{path}'" for path in writer.written))
+                else:
+                    print("\nNo code block found in the response; nothing was saved.")
                 
         except Exception as e:
             print(f"Error: {str(e)}")
             return 1
     else:
         print("Starting code generation tool. Type 'exit' or 'quit' to exit.")
+
+        # Follow-up requests reuse the conversation (and the warm KV cache) unless disabled
+        session = None if args.no_session else generator.start_session()
         
         while True:
             print("\nEnter your requirements (end input with an empty line, or type 'exit' or 'quit' to exit):")
@@ -95,7 +222,13 @@ def main():
                     language = None
                     
             print("\nGenerating code...\n")
-            generated_code = generator.generate_code(prompt, language)
+            if session is not None:
+                try:
+                    generated_code = session.send(generator.build_session_message(prompt, language))
+                except OllamaError as e:
+                    generated_code = f"An error occurred during code generation: {str(e)}"
+            else:
+                generated_code = generator.generate_code(prompt, language)
             
             print("\n" + "="*50 + "\n")
             print(generated_code)
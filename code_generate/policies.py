@@ -0,0 +1,84 @@
+from collections import namedtuple
+
+from config import GENERATION_LANGUAGE_POLICIES, GENERATION_POLICY, GENERATION_TASK_POLICIES
+
+# num_predict: decode token budget sent to Ollama (None for no limit)
+# stop: Ollama stop sequences
+# max_blocks: abort the stream once this many code blocks have closed (None for no limit)
+# trailing_lines: non-empty text lines allowed after the last closed block before aborting (None for no limit)
+GenerationPolicy = namedtuple('GenerationPolicy', ['num_predict', 'stop', 'max_blocks', 'trailing_lines'])
+
+
+def resolve_policy(language=None, task="generate"):
+    """
+    Build the generation policy for a language and task from config
+
+    Settings are merged in order: GENERATION_POLICY, the language's entry in
+    GENERATION_LANGUAGE_POLICIES, then the task's entry in GENERATION_TASK_POLICIES.
+
+    Args:
+        language (str, optional): Target language (e.g. "python")
+        task (str): "generate", "batch", "file" or "interactive"
+
+    Returns:
+        GenerationPolicy: Merged policy
+    """
+    settings = dict(GENERATION_POLICY)
+    settings.update(GENERATION_LANGUAGE_POLICIES.get((language or "").lower(), {}))
+    settings.update(GENERATION_TASK_POLICIES.get(task, {}))
+    return GenerationPolicy(**{field: settings.get(field) for field in GenerationPolicy._fields})
+
+
+def policy_options(policy, options=None):
+    """Merge a policy's server-side limits into Ollama options; explicit options win"""
+    merged = {}
+    if policy.num_predict:
+        merged["num_predict"] = policy.num_predict
+    if policy.stop:
+        merged["stop"] = list(policy.stop)
+    merged.update(options or {})
+    return merged or None
+
+
+class BlockWatcher:
+    """
+    Watches streamed text and says when the code the policy asks for is complete
+
+    Only the current partial line is buffered. A line that is just a fence
+    closes an open block, matching FenceParser.
+    """
+
+    def __init__(self, policy):
+        self.max_blocks = policy.max_blocks
+        self.trailing_lines = policy.trailing_lines
+        self.closed_blocks = 0
+        self._in_block = False
+        self._text_lines = 0
+        self._buffer = ""
+
+    @property
+    def active(self):
+        return self.max_blocks is not None or self.trailing_lines is not None
+
+    def feed(self, text):
+        """Consume streamed text; returns True once the stream can be aborted"""
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            if self._line(line.strip()):
+                return True
+        return False
+
+    def _line(self, stripped):
+        if self._in_block:
+            if stripped.startswith("```") and not stripped.strip("`"):
+                self._in_block = False
+                self.closed_blocks += 1
+                self._text_lines = 0
+                return self.max_blocks is not None and self.closed_blocks >= self.max_blocks
+        elif stripped.startswith("```"):
+            self._in_block = True
+        elif stripped and self.closed_blocks:
+            self._text_lines += 1
+            return self.trailing_lines is not None and self._text_lines > self.trailing_lines
+        return False
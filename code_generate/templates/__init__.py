@@ -1,13 +1,96 @@
 # templates/__init__.py
-from .python_templates import *
-from .javascript_templates import *
-
-__all__ = [
-    # Python templates
-    'BASIC_SCRIPT', 'CLASS_TEMPLATE', 'UNITTEST_TEMPLATE',
-
-    # JavaScript templates
-    'BASIC_SCRIPT', 'CLASS_TEMPLATE', 'REACT_FUNCTIONAL_COMPONENT',
-    'REACT_CLASS_COMPONENT', 'NODE_MODULE', 'JEST_TEST_TEMPLATE',
-    'ASYNC_FUNCTION'
-]
\ No newline at end of file
+import re
+
+from . import javascript_templates, python_templates
+
+# (language, kind) -> skeleton
+TEMPLATES = {
+    ("python", "script"): python_templates.BASIC_SCRIPT,
+    ("python", "class"): python_templates.CLASS_TEMPLATE,
+    ("python", "test"): python_templates.UNITTEST_TEMPLATE,
+    ("javascript", "script"): javascript_templates.BASIC_SCRIPT,
+    ("javascript", "class"): javascript_templates.CLASS_TEMPLATE,
+    ("javascript", "react-component"): javascript_templates.REACT_FUNCTIONAL_COMPONENT,
+    ("javascript", "react-class-component"): javascript_templates.REACT_CLASS_COMPONENT,
+    ("javascript", "module"): javascript_templates.NODE_MODULE,
+    ("javascript", "test"): javascript_templates.JEST_TEST_TEMPLATE,
+    ("javascript", "async-function"): javascript_templates.ASYNC_FUNCTION,
+}
+
+LANGUAGE_ALIASES = {"py": "python", "js": "javascript", "node": "javascript", "jsx": "javascript"}
+
+# Tried in order, so more specific kinds come first
+_KIND_PATTERNS = [
+    ("react-class-component", r"react\s+class\s+component|class\s+component"),
+    ("react-component", r"react(\s+functional)?(\s+component)?|functional\s+component|component|컴포넌트"),
+    ("test", r"unit\s*tests?|unittest|jest|test\s+(suite|cases?|file)|tests\s+for|테스트(\s*코드)?"),
+    ("async-function", r"async(\s+function)?|비동기(\s*함수)?"),
+    ("module", r"node(\.js)?\s+module|module|모듈"),
+    ("class", r"class|클래스"),
+    ("script", r"script|main\s+function|entry\s+point|스크립트"),
+]
+_SCAFFOLD = r"templates?|boilerplate|skeleton|scaffold(ing)?|stub|템플릿|뼈대|보일러플레이트"
+_LANGUAGE_WORDS = r"python|javascript|js|node(\.js)?|py|파이썬|자바스크립트"
+_FILLER = {
+    "a", "an", "the", "for", "me", "give", "make", "create", "generate", "write", "basic", "simple", "new",
+    "empty", "please", "with", "of", "in", "file", "code", "just", "some", "standard", "default", "만들어줘",
+    "작성해줘", "기본", "파일", "코드",
+}
+
+
+def normalize_language(language):
+    """Map a language name or alias to its registry key"""
+    language = (language or "").lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def get_template(language, kind):
+    """Return the skeleton for a language and kind, or None"""
+    return TEMPLATES.get((normalize_language(language), kind))
+
+
+def list_templates(language=None):
+    """Return the registered (language, kind) pairs, optionally for one language"""
+    language = normalize_language(language) if language else None
+    return sorted(key for key in TEMPLATES if language is None or key[0] == language)
+
+
+def _search(pattern, text):
+    return re.search(rf"(?<![\w가-힣])({pattern})(?![\w가-힣])", text)
+
+
+def match_template(prompt, language):
+    """
+    Find the skeleton a request asks for
+
+    Only requests that ask for a template/boilerplate/skeleton match, so an
+    ordinary request that merely mentions a class or a component is left
+    alone. The kind is taken from keywords in the prompt ("unit test",
+    "class", "react component", ...). A request is pure scaffolding when it
+    says nothing beyond the language and kind, e.g. "python unittest
+    boilerplate".
+
+    Args:
+        prompt (str): Requirements text
+        language (str): Target language
+
+    Returns:
+        tuple: (kind, skeleton, pure scaffolding) or (None, None, False) when nothing matches
+    """
+    language = normalize_language(language)
+    text = prompt.lower()
+    if not _search(_SCAFFOLD, text):
+        return None, None, False
+    for kind, pattern in _KIND_PATTERNS:
+        skeleton = TEMPLATES.get((language, kind))
+        if skeleton is None or not _search(pattern, text):
+            continue
+        rest = text
+        for keyword in [pattern, _SCAFFOLD, _LANGUAGE_WORDS]:
+            rest = re.sub(rf"(?<![\w가-힣])({keyword})(?![\w가-힣])", " ", rest)
+        pure = not [word for word in re.findall(r"[\w가-힣]+", rest) if word not in _FILLER]
+        return kind, skeleton, pure
+    return None, None, False
+
+
+__all__ = ['TEMPLATES', 'get_template', 'list_templates', 'match_template', 'normalize_language']
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config import SYNTAX_CHECK_TIMEOUT, SYNTAX_CHECK_WORKERS
+
+_ESM_SYNTAX = re.compile(r'^\s*(import\s[^(]|export\s)', re.MULTILINE)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _check_python(code):
+    try:
+        compile(code, "<generated>", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return False, f"{type(e).__name__}: {e}"
+    return True, None
+
+
+def _check_javascript(code):
+    node = shutil.which("node")
+    if node is None:
+        return True, None
+    # Files with import/export statements only parse as ES modules
+    suffix = ".mjs" if _ESM_SYNTAX.search(code) else ".js"
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(code)
+        try:
+            completed = subprocess.run([node, "--check", path], capture_output=True, text=True,
+                                       timeout=SYNTAX_CHECK_TIMEOUT, check=False)
+        except subprocess.TimeoutExpired:
+            return True, None
+        if completed.returncode != 0:
+            # Keep the location and message, not node's own stack frames
+            lines = [line for line in completed.stderr.replace(path, "<generated>").splitlines()
+                     if line.strip() and not line.startswith(("    at ", "Node.js"))]
+            return False, "\n".join(lines)
+        return True, None
+    finally:
+        os.remove(path)
+
+
+_CHECKERS = {
+    "python": _check_python,
+    "py": _check_python,
+    "javascript": _check_javascript,
+    "js": _check_javascript,
+    "node": _check_javascript,
+}
+
+
+def has_checker(language):
+    """Whether generated code in this language can be syntax-checked"""
+    checker = _CHECKERS.get((language or "").lower())
+    return checker is _check_python or (checker is not None and shutil.which("node") is not None)
+
+
+def check_syntax(code, language=None):
+    """
+    Check that code parses
+
+    Python is compiled with compile() (which runs ast.parse and the compiler's
+    own checks); JavaScript is checked with ``node --check`` when node is
+    installed. Code in other languages always passes.
+
+    Returns:
+        tuple: (True, None) if the code parses, otherwise (False, error message)
+    """
+    checker = _CHECKERS.get((language or "").lower())
+    if checker is None:
+        return True, None
+    return checker(code)
+
+
+def get_checker_pool():
+    """
+    Return the shared process pool that runs syntax checks
+
+    Workers are started with forkserver (spawn where unavailable) rather than
+    fork, since the pool is created while streaming threads are running.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=SYNTAX_CHECK_WORKERS, mp_context=context)
+        return _pool
@@ -0,0 +1,15 @@
+# __init__.py
+from .ollama_client import (
+    AsyncOllamaClient,
+    OllamaClient,
+    OllamaError,
+    OllamaTimeoutError,
+    find_model,
+    get_client,
+)
+from .response_cache import ResponseCache, make_key
+
+__all__ = [
+    'OllamaClient', 'AsyncOllamaClient', 'OllamaError', 'OllamaTimeoutError',
+    'find_model', 'get_client', 'ResponseCache', 'make_key',
+]
@@ -0,0 +1,243 @@
+"""
+Sweep Ollama runtime options on a representative prompt set and save the fastest profile
+
+Tunes num_thread and num_batch one at a time (keeping the best value of each
+before moving to the next), scoring each candidate by the server's own
+prefill + decode time, then picks keep_alive from the measured model load time.
+num_thread is only swept when the host's thread count is known: this machine's
+for a local server, otherwise the one given with --threads.
+num_ctx is sized per prompt, the same way the tools size it for each request.
+The result is written to OPTIONS_TUNED_FILE and used by CodeExplainer and
+CodeGenerator from then on.
+
+    python -m common.autotune --task explain --prompt src/app.py --prompt src/util.py
+    python -m common.autotune --task generate --url http://gpu-box:11434 --threads 32 --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+if __name__ == "__main__":
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from common.metrics import build_record
+from common.ollama_client import OllamaClient, OllamaError
+from common.options import apply_profile, get_profile, parse_option_overrides
+from common.prompt_budget import fit_context
+from config import DEFAULT_MODEL, OLLAMA_BASE_URL, OPTIONS_TUNED_FILE
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_EXPLAIN_FILES = [
+    ROOT / "code_explain" / "chunker.py",
+    ROOT / "common" / "ollama_client.py",
+    ROOT / "code_generate" / "code_extractor.py",
+]
+DEFAULT_REQUIREMENTS = [
+    "Write a function that parses an ISO 8601 date string and returns a datetime, raising ValueError on bad input.",
+    "Implement an LRU cache class with get and put methods in O(1) time.",
+    "Write a command line tool that counts word frequencies in a text file and prints the top 10.",
+]
+
+NUM_BATCH_CANDIDATES = [128, 256, 512, 1024]
+
+# Cold loads slower than this are worth keeping the model resident for longer
+SLOW_LOAD_SECONDS = 2.0
+
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def thread_candidates(cpus):
+    """num_thread values to try on a host with this many CPU threads"""
+    return sorted({max(1, cpus // 4), max(1, cpus // 2), cpus})
+
+
+def is_local(url):
+    """Whether the Ollama server at url runs on this machine"""
+    return urlsplit(url).hostname in LOCAL_HOSTS
+
+
+def build_prompts(task, paths, model_name, url):
+    """Build the full prompts a task would send, from code files (explain) or requirement files (generate)"""
+    if task == "explain":
+        from code_explain.code_explainer import CodeExplainer
+        from code_explain.languages import detect_language
+
+        explainer = CodeExplainer(model_name, url)
+        sources = [Path(p) for p in paths] if paths else DEFAULT_EXPLAIN_FILES
+        return [explainer._build_prompt(p.read_text(encoding="utf-8"), detect_language(str(p))) for p in sources]
+
+    from code_generate.code_generator import CodeGenerator
+
+    generator = CodeGenerator(model_name, url)
+    requirements = [Path(p).read_text(encoding="utf-8") for p in paths] if paths else DEFAULT_REQUIREMENTS
+    return [generator._build_payload(text)["prompt"] for text in requirements]
+
+
+def measure(client, model_name, prompts, options, num_predict, repeats, timeout):
+    """
+    Run the prompt set with one set of options
+
+    The first request is a warm-up: changing num_batch/num_thread reloads the
+    model, and that load is reported separately.
+
+    Returns:
+        dict: server_s (prefill + decode), prefill_tps, decode_tps, load_s, max_prompt_tokens
+    """
+    def run(prompt):
+        payload = apply_profile({"model": model_name, "prompt": prompt}, options)
+        payload["options"] = {**payload.get("options", {}), "num_predict": num_predict}
+        fit_context(payload)
+        start = time.time()
+        final = client.generate(payload, timeout=timeout)
+        return build_record("autotune", model_name, final, time.time() - start)
+
+    warmup = run(prompts[0])
+    records = [run(prompt) for _ in range(repeats) for prompt in prompts]
+
+    prefill_s = sum(r["prefill_s"] or 0.0 for r in records)
+    decode_s = sum(r["decode_s"] or 0.0 for r in records)
+    prompt_tokens = sum(r["prompt_tokens"] or 0 for r in records)
+    completion_tokens = sum(r["completion_tokens"] or 0 for r in records)
+    return {
+        "server_s": prefill_s + decode_s,
+        "prefill_tps": prompt_tokens / prefill_s if prefill_s else None,
+        "decode_tps": completion_tokens / decode_s if decode_s else None,
+        "load_s": warmup["load_s"],
+        "max_prompt_tokens": max((r["prompt_tokens"] or 0 for r in records), default=0),
+    }
+
+
+def _format(result):
+    prefill = f"{result['prefill_tps']:.1f}" if result["prefill_tps"] else "-"
+    decode = f"{result['decode_tps']:.1f}" if result["decode_tps"] else "-"
+    return f"{result['server_s']:.2f}s server time, prefill {prefill} tok/s, decode {decode} tok/s"
+
+
+def tune(client, model_name, prompts, start, num_predict=128, repeats=1, timeout=300, log=print, threads=None):
+    """
+    Coordinate-descent sweep over num_thread and num_batch
+
+    Args:
+        client (OllamaClient): Client for the host being tuned
+        model_name (str): Model to tune
+        prompts (list): Full prompts to send
+        start (dict): Starting profile (options plus optional keep_alive)
+        num_predict (int): Decode budget per request, to keep the sweep short
+        repeats (int): Times each prompt is sent per candidate
+        timeout (float): Per-request timeout in seconds (model reloads can be slow)
+        log (callable): Progress output
+        threads (int, optional): CPU threads on the Ollama host; num_thread is not
+            swept without it
+
+    Returns:
+        tuple: (best profile, list of {"options", **measurement} for every candidate)
+    """
+    best = dict(start)
+    history = []
+
+    def evaluate(profile):
+        result = measure(client, model_name, prompts, profile, num_predict, repeats, timeout)
+        history.append({"options": dict(profile), **result})
+        log(f"  {json.dumps({k: v for k, v in profile.items() if k != 'keep_alive'})}: {_format(result)}")
+        return result
+
+    log("baseline")
+    best_result = evaluate(best)
+
+    sweeps = [("num_batch", NUM_BATCH_CANDIDATES)]
+    if threads:
+        sweeps.insert(0, ("num_thread", thread_candidates(threads)))
+    else:
+        log("skipping num_thread: the host's thread count is unknown (pass --threads)")
+    for name, candidates in sweeps:
+        log(f"sweeping {name}")
+        for value in candidates:
+            if best.get(name) == value:
+                continue
+            candidate = {**best, name: value}
+            try:
+                result = evaluate(candidate)
+            except OllamaError as e:
+                log(f"  {name}={value} failed: {e}")
+                continue
+            if result["server_s"] < best_result["server_s"]:
+                best, best_result = candidate, result
+
+    # keep_alive does not change throughput within a sweep; it decides how often
+    # the cold load measured above is paid again after idle periods
+    load_s = max((r["load_s"] or 0.0 for r in history), default=0.0)
+    best["keep_alive"] = "30m" if load_s >= SLOW_LOAD_SECONDS else "10m"
+    log(f"slowest model load {load_s:.2f}s -> keep_alive {best['keep_alive']}")
+    return best, history
+
+
+def save_profile(task, profile, meta, path=OPTIONS_TUNED_FILE):
+    """Store a tuned profile for a task, keeping the other tasks' profiles"""
+    path = os.path.expanduser(path)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault("profiles", {})[task] = profile
+    data.setdefault("meta", {})[task] = meta
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune Ollama runtime options for this machine")
+    parser.add_argument("--task", choices=["explain", "generate"], default="explain",
+                        help="Profile to tune (default: explain)")
+    parser.add_argument("--prompt", "-p", action="append",
+                        help="Code file (explain) or requirements file (generate) to use as a prompt; repeatable")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL, help=f"Model name (default: {DEFAULT_MODEL})")
+    parser.add_argument("--url", default=OLLAMA_BASE_URL, help=f"Ollama API URL (default: {OLLAMA_BASE_URL})")
+    parser.add_argument("--start", "-O", action="append", metavar="KEY=VALUE",
+                        help="Starting option, overriding the configured profile; repeatable")
+    parser.add_argument("--threads", type=int,
+                        help="CPU threads on the Ollama host, for the num_thread sweep "
+                             "(default: this machine's count for a local --url, otherwise num_thread is not tuned)")
+    parser.add_argument("--num-predict", type=int, default=128, help="Tokens decoded per request (default: 128)")
+    parser.add_argument("--repeats", type=int, default=1, help="Times each prompt is sent per candidate (default: 1)")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds (default: 300)")
+    parser.add_argument("--output", default=OPTIONS_TUNED_FILE, help=f"Where to save the profile (default: {OPTIONS_TUNED_FILE})")
+    parser.add_argument("--dry-run", action="store_true", help="Print the best profile without saving it")
+    args = parser.parse_args()
+
+    try:
+        start = get_profile(args.task, parse_option_overrides(args.start), tuned_path=None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    threads = args.threads or (os.cpu_count() if is_local(args.url) else None)
+    client = OllamaClient(args.url, timeout=args.timeout)
+    prompts = build_prompts(args.task, args.prompt, args.model, args.url)
+    print(f"Tuning '{args.task}' for {args.model} at {args.url} with {len(prompts)} prompts")
+    try:
+        best, history = tune(client, args.model, prompts, start, args.num_predict, args.repeats, args.timeout,
+                             threads=threads)
+    except OllamaError as e:
+        print(f"Autotune failed: {e}")
+        return 1
+
+    print("\nBest profile: " + json.dumps(best))
+    if args.dry_run:
+        return 0
+    meta = {"model": args.model, "url": args.url, "tuned_at": time.time(), "candidates": history}
+    save_profile(args.task, best, meta, args.output)
+    print(f"Saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
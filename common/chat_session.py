@@ -0,0 +1,94 @@
+import logging
+import time
+
+from config import SESSION_KEEP_ALIVE, SESSION_MAX_TURNS, REQUEST_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """
+    Multi-turn conversation over /api/chat with a stable system prompt
+
+    The system prompt and earlier turns form an unchanged prefix, and keep_alive
+    keeps the model (and its KV cache) loaded between turns, so each turn only
+    pays prefill for the newly added text.
+    """
+
+    def __init__(self, client, model_name, system_prompt, keep_alive=SESSION_KEEP_ALIVE,
+                 max_turns=SESSION_MAX_TURNS, metrics=None, operation="chat", options=None):
+        """
+        Args:
+            client (OllamaClient): Client used for /api/chat
+            model_name (str): Name of the Ollama model to use
+            system_prompt (str): Instructions sent once as the first message of every request
+            keep_alive (str): How long Ollama keeps the model loaded after each turn
+            max_turns (int): Number of user/assistant turns kept in the history
+            metrics (MetricsRecorder, optional): Sink for per-turn metrics
+            operation (str): Operation name used in metrics records
+            options (dict, optional): Ollama runtime options sent with every turn
+        """
+        self.client = client
+        self.model_name = model_name
+        self.system_prompt = system_prompt
+        self.keep_alive = keep_alive
+        self.max_turns = max_turns
+        self.metrics = metrics
+        self.operation = operation
+        self.options = options
+        self.history = []
+
+    def _messages(self, user_message):
+        return [{"role": "system", "content": self.system_prompt}] + self.history + [
+            {"role": "user", "content": user_message}
+        ]
+
+    def _remember(self, user_message, reply):
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": reply})
+        # Dropping old turns changes the prefix, so only trim when over the limit
+        excess = len(self.history) - 2 * self.max_turns
+        if excess > 0:
+            del self.history[:excess]
+
+    def stream(self, user_message, timeout=REQUEST_TIMEOUT):
+        """
+        Send a user message and yield reply tokens as they arrive
+
+        The turn is added to the history only after the reply completes.
+        Raises OllamaError on failure.
+        """
+        payload = {
+            "model": self.model_name,
+            "messages": self._messages(user_message),
+            "keep_alive": self.keep_alive,
+        }
+        if self.options:
+            payload["options"] = self.options
+
+        start_time = time.time()
+        first_token_time = None
+        chunks = []
+        for message in self.client.chat_stream(payload, timeout=timeout):
+            chunk = message.get("message", {}).get("content", "")
+            if chunk:
+                if first_token_time is None:
+                    first_token_time = time.time()
+                chunks.append(chunk)
+                yield chunk
+            if message.get("done"):
+                if self.metrics is not None:
+                    ttft = first_token_time - start_time if first_token_time else None
+                    self.metrics.record_call(self.operation, self.model_name, message,
+                                             time.time() - start_time, ttft)
+                break
+
+        self._remember(user_message, "".join(chunks))
+
+    def send(self, user_message, timeout=REQUEST_TIMEOUT):
+        """Send a user message and return the full reply"""
+        return "".join(self.stream(user_message, timeout))
+
+    def reset(self):
+        """Forget the conversation but keep the system prompt"""
+        self.history.clear()
@@ -0,0 +1,250 @@
+import logging
+import threading
+import time
+
+from common.ollama_client import OllamaClient, OllamaError, OllamaTimeoutError
+from config import (
+    ENDPOINT_HEALTH_INTERVAL,
+    ENDPOINT_LATENCY_SMOOTHING,
+    MODEL_CHECK_TIMEOUT,
+    OLLAMA_POOL_CONNECTIONS,
+    OLLAMA_POOL_MAXSIZE,
+    REQUEST_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_endpoints(base_url):
+    """Split a comma-separated URL string (or a list of URLs) into normalized endpoint URLs"""
+    if isinstance(base_url, str):
+        base_url = base_url.split(",")
+    return [url.strip().rstrip("/") for url in base_url if url.strip()]
+
+
+def _is_host_failure(error):
+    """Whether an OllamaError says the host is down rather than the request being bad"""
+    import requests
+
+    cause = error.__cause__
+    if isinstance(cause, requests.exceptions.ConnectionError):
+        return True
+    if isinstance(cause, requests.exceptions.HTTPError) and cause.response is not None:
+        return cause.response.status_code >= 500
+    return False
+
+
+class Endpoint:
+    """One Ollama host with its routing state"""
+
+    def __init__(self, client):
+        self.client = client
+        self.url = client.base_url
+        self.outstanding = 0
+        self.latency = None  # Smoothed seconds to the first response byte
+        self.healthy = True
+        self.failures = 0
+
+    def score(self):
+        # Expected wait: requests ahead of us times how long each one takes
+        return (self.outstanding + 1) * (self.latency or 1.0)
+
+
+class LoadBalancedClient:
+    """
+    OllamaClient over several Ollama hosts
+
+    Each request goes to the healthy endpoint with the lowest
+    (outstanding requests + 1) x smoothed latency. A host that refuses
+    connections or answers 5xx is ejected, and the request is retried on
+    another host; a background thread probes /api/tags and readmits hosts
+    once they answer again. Streams are only retried if they fail before
+    the first message, so callers never see duplicated tokens. Timeouts are
+    not retried, since a slow generation would just be repeated.
+    """
+
+    def __init__(self, base_urls, timeout=REQUEST_TIMEOUT, pool_connections=OLLAMA_POOL_CONNECTIONS,
+                 pool_maxsize=OLLAMA_POOL_MAXSIZE, health_interval=ENDPOINT_HEALTH_INTERVAL):
+        """
+        Args:
+            base_urls (list): Ollama API server URLs
+            timeout (float): Default request timeout in seconds
+            pool_connections (int): Number of host pools to keep per endpoint
+            pool_maxsize (int): Maximum connections kept alive per endpoint
+            health_interval (float): Seconds between background health checks
+        """
+        self.endpoints = [
+            Endpoint(OllamaClient(url, timeout, pool_connections, pool_maxsize))
+            for url in parse_endpoints(base_urls)
+        ]
+        if not self.endpoints:
+            raise ValueError("no Ollama endpoints given")
+        self.base_url = ",".join(endpoint.url for endpoint in self.endpoints)
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._next = 0
+        self._closed = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    def url(self, path):
+        """Build the full URL for an API path on the first endpoint"""
+        return self.endpoints[0].client.url(path)
+
+    def _acquire(self, exclude=()):
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+            if not candidates:
+                # Everything is ejected: try the hosts anyway rather than failing outright
+                candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None
+            # Rotate the starting point so ties are spread across hosts
+            self._next = (self._next + 1) % len(candidates)
+            candidates = candidates[self._next:] + candidates[:self._next]
+            endpoint = min(candidates, key=Endpoint.score)
+            endpoint.outstanding += 1
+            return endpoint
+
+    @staticmethod
+    def _smooth(endpoint, latency):
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += ENDPOINT_LATENCY_SMOOTHING * (latency - endpoint.latency)
+
+    def _release(self, endpoint, latency=None, error=None):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if latency is not None:
+                self._smooth(endpoint, latency)
+            if error is None:
+                endpoint.failures = 0
+            elif _is_host_failure(error):
+                endpoint.failures += 1
+                if endpoint.healthy:
+                    logger.warning(f"Ejecting Ollama endpoint {endpoint.url}: {error}")
+                endpoint.healthy = False
+
+    def _call(self, method, *args, timeout=None):
+        """Run a non-streaming client method, retrying host failures on other endpoints"""
+        tried = []
+        last_error = None
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            start = time.time()
+            try:
+                result = getattr(endpoint.client, method)(*args, timeout=timeout)
+            except OllamaTimeoutError as e:
+                self._release(endpoint, time.time() - start, e)
+                raise
+            except OllamaError as e:
+                self._release(endpoint, error=e)
+                if not _is_host_failure(e):
+                    raise
+                last_error = e
+                continue
+            self._release(endpoint, time.time() - start)
+            return result
+
+    def _call_stream(self, method, *args, timeout=None):
+        """Run a streaming client method; failures before the first message are retried elsewhere"""
+        tried = []
+        last_error = None
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            start = time.time()
+            started = False
+            error = None
+            try:
+                for message in getattr(endpoint.client, method)(*args, timeout=timeout):
+                    if not started:
+                        started = True
+                        self._record_latency(endpoint, time.time() - start)
+                    yield message
+                return
+            except OllamaError as e:
+                error = e
+                if started or isinstance(e, OllamaTimeoutError) or not _is_host_failure(e):
+                    raise
+                last_error = e
+            finally:
+                self._release(endpoint, None if started else time.time() - start, error)
+
+    def _record_latency(self, endpoint, latency):
+        with self._lock:
+            self._smooth(endpoint, latency)
+
+    def _health_loop(self):
+        while not self._closed.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                try:
+                    endpoint.client.get("/api/tags", timeout=MODEL_CHECK_TIMEOUT)
+                except OllamaError as e:
+                    with self._lock:
+                        if endpoint.healthy:
+                            logger.warning(f"Ejecting Ollama endpoint {endpoint.url}: {e}")
+                        endpoint.healthy = False
+                    continue
+                with self._lock:
+                    if not endpoint.healthy:
+                        logger.info(f"Ollama endpoint {endpoint.url} is healthy again")
+                    endpoint.healthy = True
+                    endpoint.failures = 0
+
+    def status(self):
+        """Return a snapshot of each endpoint's routing state"""
+        with self._lock:
+            return [
+                {"url": e.url, "healthy": e.healthy, "outstanding": e.outstanding,
+                 "latency_s": e.latency, "failures": e.failures}
+                for e in self.endpoints
+            ]
+
+    def get(self, path, timeout=None):
+        """GET an API path and return the decoded JSON body"""
+        return self._call("get", path, timeout=timeout)
+
+    def post(self, path, payload, timeout=None):
+        """POST a JSON payload and return the decoded JSON body"""
+        return self._call("post", path, payload, timeout=timeout)
+
+    def stream(self, path, payload, timeout=None):
+        """POST a JSON payload and yield each NDJSON message as it arrives"""
+        return self._call_stream("stream", path, payload, timeout=timeout)
+
+    def list_models(self, timeout=None):
+        """Return the locally available models reported by /api/tags"""
+        return self.get("/api/tags", timeout).get("models", [])
+
+    def generate(self, payload, timeout=None):
+        """Run a non-streaming /api/generate request"""
+        return self.post("/api/generate", {**payload, "stream": False}, timeout)
+
+    def generate_stream(self, payload, timeout=None):
+        """Run a streaming /api/generate request, yielding each message"""
+        return self.stream("/api/generate", {**payload, "stream": True}, timeout)
+
+    def chat(self, payload, timeout=None):
+        """Run a non-streaming /api/chat request"""
+        return self.post("/api/chat", {**payload, "stream": False}, timeout)
+
+    def chat_stream(self, payload, timeout=None):
+        """Run a streaming /api/chat request, yielding each message"""
+        return self.stream("/api/chat", {**payload, "stream": True}, timeout)
+
+    def embed(self, payload, timeout=None):
+        """Run an /api/embed request; the response holds one vector per input"""
+        return self.post("/api/embed", payload, timeout)
+
+    def close(self):
+        self._closed.set()
+        for endpoint in self.endpoints:
+            endpoint.client.close()
@@ -0,0 +1,198 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+if __name__ == "__main__":
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import METRICS_ENABLED, METRICS_FILE
+
+logger = logging.getLogger(__name__)
+
+NS_PER_S = 1_000_000_000
+
+# Fields summarized by the `summary` command
+SUMMARY_FIELDS = [
+    "wall_s", "ttft_s", "load_s", "prefill_s", "decode_s",
+    "prompt_tokens", "completion_tokens", "prefill_tps", "decode_tps",
+]
+
+
+def _seconds(final, key):
+    value = final.get(key)
+    return value / NS_PER_S if value is not None else None
+
+
+def _rate(tokens, seconds):
+    return tokens / seconds if tokens and seconds else None
+
+
+def build_record(operation, model, final, wall_s, ttft_s=None, cached=False):
+    """
+    Turn the final /api/generate message into a metrics record
+
+    Args:
+        operation (str): What the call was for (e.g. "explain", "generate")
+        model (str): Model name
+        final (dict): Last message from Ollama with the *_count/*_duration fields
+        wall_s (float): Client-side wall-clock time of the call
+        ttft_s (float, optional): Client-measured time to first token (streaming only)
+        cached (bool): Whether the response came from the local cache
+
+    Returns:
+        dict: JSON-serializable metrics record
+    """
+    load_s = _seconds(final, "load_duration")
+    prefill_s = _seconds(final, "prompt_eval_duration")
+    decode_s = _seconds(final, "eval_duration")
+    prompt_tokens = final.get("prompt_eval_count")
+    completion_tokens = final.get("eval_count")
+    if ttft_s is None and not cached and prefill_s is not None:
+        # Non-streaming calls: approximate from the server timings
+        ttft_s = (load_s or 0.0) + prefill_s
+    return {
+        "timestamp": time.time(),
+        "operation": operation,
+        "model": model,
+        "cached": cached,
+        "wall_s": wall_s,
+        "ttft_s": ttft_s,
+        "total_s": _seconds(final, "total_duration"),
+        "load_s": load_s,
+        "prefill_s": prefill_s,
+        "decode_s": decode_s,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "prefill_tps": _rate(prompt_tokens, prefill_s),
+        "decode_tps": _rate(completion_tokens, decode_s),
+    }
+
+
+class MetricsRecorder:
+    """Append-only JSONL sink for metrics records, safe to share between threads"""
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics: {e}")
+
+    def record_call(self, operation, model, final, wall_s, ttft_s=None, cached=False):
+        """Build a record from the final Ollama message and append it"""
+        record = build_record(operation, model, final or {}, wall_s, ttft_s, cached)
+        self.record(record)
+        return record
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Return the shared MetricsRecorder, or None when METRICS_ENABLED is off"""
+    global _recorder
+    if not METRICS_ENABLED:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = MetricsRecorder()
+        return _recorder
+
+
+def load_records(path=METRICS_FILE):
+    records = []
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def summarize(records, percentiles=(50, 90, 99)):
+    """
+    Compute per-operation percentiles over metrics records
+
+    Returns:
+        dict: operation -> {"count": n, "cached": n, field -> {"p50": .., ...}}
+    """
+    summary = {}
+    by_operation = {}
+    for record in records:
+        by_operation.setdefault(record.get("operation", "?"), []).append(record)
+
+    for operation, group in sorted(by_operation.items()):
+        # Cache hits have no server timings and would skew the percentiles
+        served = [r for r in group if not r.get("cached")]
+        stats = {"count": len(group), "cached": len(group) - len(served)}
+        for field in SUMMARY_FIELDS:
+            values = [r[field] for r in served if r.get(field) is not None]
+            if values:
+                stats[field] = {f"p{p}": percentile(values, p) for p in percentiles}
+        summary[operation] = stats
+    return summary
+
+
+def format_summary(summary, percentiles=(50, 90, 99)):
+    lines = []
+    for operation, stats in summary.items():
+        lines.append(f"{operation}: {stats['count']} calls ({stats['cached']} cached)")
+        header = "  " + "field".ljust(18) + "".join(f"p{p}".rjust(12) for p in percentiles)
+        lines.append(header)
+        for field in SUMMARY_FIELDS:
+            if field in stats:
+                row = "".join(f"{stats[field][f'p{p}']:12.3f}" for p in percentiles)
+                lines.append("  " + field.ljust(18) + row)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama call metrics")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="Report latency and throughput percentiles")
+    summary_parser.add_argument("--file", "-f", default=METRICS_FILE, help=f"Metrics JSONL file (default: {METRICS_FILE})")
+    summary_parser.add_argument("--operation", help="Only include this operation (e.g. explain, generate)")
+    summary_parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.file)
+    except OSError as e:
+        print(f"Cannot read metrics file: {e}")
+        return 1
+    if args.operation:
+        records = [r for r in records if r.get("operation") == args.operation]
+    if not records:
+        print("No metrics recorded.")
+        return 0
+
+    summary = summarize(records)
+    print(json.dumps(summary, indent=2) if args.json else format_summary(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
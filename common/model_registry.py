@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from common.ollama_client import OllamaError, find_model, get_client
+from config import (
+    MODEL_CHECK_TIMEOUT,
+    MODEL_REGISTRY_CACHE,
+    MODEL_REGISTRY_TTL,
+    OLLAMA_BASE_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Cached view of the models an Ollama server has pulled (/api/tags)
+
+    The tag list is fetched at most once per TTL, in a background thread, and is
+    shared by every CodeExplainer/CodeGenerator in the process. It is also kept
+    on disk so short-lived CLI invocations can skip the round trip entirely.
+    """
+
+    def __init__(self, client, ttl=MODEL_REGISTRY_TTL, timeout=MODEL_CHECK_TIMEOUT, cache_path=MODEL_REGISTRY_CACHE):
+        """
+        Args:
+            client (OllamaClient): Client used to query /api/tags
+            ttl (float): Seconds before the tag list is refreshed
+            timeout (float): Timeout for the /api/tags request and for waiting on it
+            cache_path (str, optional): JSON file shared between processes, None to disable
+        """
+        self.client = client
+        self.ttl = ttl
+        self.timeout = timeout
+        self.cache_path = os.path.expanduser(cache_path) if cache_path else None
+        self._lock = threading.Lock()
+        self._models = None
+        self._fetched_at = 0.0
+        self._refresh_thread = None
+        self._pending_checks = set()
+        self._load_disk()
+
+    def _is_fresh(self):
+        return self._models is not None and time.time() - self._fetched_at < self.ttl
+
+    def _load_disk(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f).get(self.client.base_url)
+        except (OSError, ValueError, AttributeError):
+            return
+        if entry:
+            self._models = entry.get("models", [])
+            self._fetched_at = entry.get("fetched_at", 0.0)
+
+    def _save_disk(self):
+        if not self.cache_path:
+            return
+        try:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            data[self.client.base_url] = {"fetched_at": self._fetched_at, "models": self._models}
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.debug(f"Could not save model registry cache: {e}")
+
+    def _refresh(self):
+        try:
+            models = self.client.list_models(timeout=self.timeout)
+        except OllamaError as e:
+            logger.warning(f"Error checking model availability: {str(e)}")
+            logger.warning("Make sure Ollama server is running at: " + self.client.base_url)
+            models = None
+
+        with self._lock:
+            if models is not None:
+                self._models = models
+                self._fetched_at = time.time()
+            pending, self._pending_checks = self._pending_checks, set()
+            self._refresh_thread = None
+        if models is not None:
+            self._save_disk()
+            for model_name in pending:
+                self._warn_if_missing(model_name)
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running; returns the thread"""
+        with self._lock:
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(target=self._refresh, name="ollama-model-registry", daemon=True)
+                self._refresh_thread.start()
+            return self._refresh_thread
+
+    def models(self, wait=True):
+        """
+        Return the cached tag list, refreshing it if stale
+
+        Args:
+            wait (bool): Block up to ``timeout`` seconds for a refresh instead of returning stale data
+
+        Returns:
+            list: Model entries, possibly empty if the server could not be reached
+        """
+        if not self._is_fresh():
+            thread = self.refresh_async()
+            if wait:
+                thread.join(self.timeout)
+        return self._models or []
+
+    def find(self, model_name, wait=True):
+        """Return the /api/tags entry for a model, or None"""
+        return find_model(self.models(wait), model_name)
+
+    def digest(self, model_name, wait=True):
+        """Return the digest of a local model, or None if unknown"""
+        model = self.find(model_name, wait)
+        return model.get("digest") if model else None
+
+    def _warn_if_missing(self, model_name):
+        if find_model(self._models or [], model_name) is None:
+            logger.warning(f"Model {model_name} is not available locally. It will be downloaded on first use.")
+        else:
+            logger.info(f"Model {model_name} is available locally.")
+
+    def check_model(self, model_name):
+        """Warn if a model is missing without blocking the caller"""
+        if self._is_fresh():
+            self._warn_if_missing(model_name)
+            return
+        with self._lock:
+            self._pending_checks.add(model_name)
+        self.refresh_async()
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(base_url=OLLAMA_BASE_URL, client=None):
+    """Return the process-wide shared ModelRegistry for a base URL"""
+    client = client or get_client(base_url)
+    with _registries_lock:
+        registry = _registries.get(client.base_url)
+        if registry is None:
+            registry = _registries[client.base_url] = ModelRegistry(client)
+        return registry
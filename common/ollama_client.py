@@ -0,0 +1,268 @@
+import json
+import logging
+import threading
+
+from config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_POOL_CONNECTIONS,
+    OLLAMA_POOL_MAXSIZE,
+    REQUEST_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaError(Exception):
+    """Raised when a request to the Ollama server fails"""
+
+
+class OllamaTimeoutError(OllamaError):
+    """Raised when a request to the Ollama server times out"""
+
+
+def find_model(models, model_name):
+    """Find a model entry from /api/tags by name, treating 'name' as 'name:latest'"""
+    candidates = {model_name}
+    if ":" not in model_name:
+        candidates.add(f"{model_name}:latest")
+    for model in models:
+        if model.get("name") in candidates or model.get("model") in candidates:
+            return model
+    return None
+
+
+def _parse_lines(lines):
+    """Parse NDJSON lines from a streaming response into dicts"""
+    for line in lines:
+        if not line:
+            continue
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.warning(f"JSON 파싱 오류: {e}, 라인: {line[:100]}")
+            continue
+        if "error" in data:
+            raise OllamaError(data["error"])
+        yield data
+
+
+class OllamaClient:
+    """Synchronous Ollama API client backed by a pooled keep-alive session"""
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, timeout=REQUEST_TIMEOUT,
+                 pool_connections=OLLAMA_POOL_CONNECTIONS, pool_maxsize=OLLAMA_POOL_MAXSIZE):
+        """
+        Args:
+            base_url (str): Ollama API server URL
+            timeout (float): Default request timeout in seconds
+            pool_connections (int): Number of host pools to keep
+            pool_maxsize (int): Maximum connections kept alive per host
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Pooled keep-alive session, created on first use so requests is only imported when needed"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def url(self, path):
+        """Build the full URL for an API path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _request(self, method, path, timeout=None, **kwargs):
+        import requests
+
+        try:
+            response = self.session.request(
+                method, self.url(path),
+                timeout=self.timeout if timeout is None else timeout,
+                **kwargs
+            )
+            response.raise_for_status()
+            return response
+        except requests.exceptions.Timeout as e:
+            raise OllamaTimeoutError(str(e)) from e
+        except requests.exceptions.RequestException as e:
+            raise OllamaError(str(e)) from e
+
+    def get(self, path, timeout=None):
+        """GET an API path and return the decoded JSON body"""
+        return self._request("GET", path, timeout).json()
+
+    def post(self, path, payload, timeout=None):
+        """POST a JSON payload and return the decoded JSON body"""
+        return self._request("POST", path, timeout, json=payload).json()
+
+    def stream(self, path, payload, timeout=None):
+        """POST a JSON payload and yield each NDJSON message as it arrives"""
+        import requests
+
+        response = self._request("POST", path, timeout, json=payload, stream=True)
+        with response:
+            try:
+                yield from _parse_lines(response.iter_lines())
+            except requests.exceptions.Timeout as e:
+                raise OllamaTimeoutError(str(e)) from e
+            except requests.exceptions.RequestException as e:
+                raise OllamaError(str(e)) from e
+
+    def list_models(self, timeout=None):
+        """Return the locally available models reported by /api/tags"""
+        return self.get("/api/tags", timeout).get("models", [])
+
+    def generate(self, payload, timeout=None):
+        """Run a non-streaming /api/generate request"""
+        return self.post("/api/generate", {**payload, "stream": False}, timeout)
+
+    def generate_stream(self, payload, timeout=None):
+        """Run a streaming /api/generate request, yielding each message"""
+        return self.stream("/api/generate", {**payload, "stream": True}, timeout)
+
+    def chat(self, payload, timeout=None):
+        """Run a non-streaming /api/chat request"""
+        return self.post("/api/chat", {**payload, "stream": False}, timeout)
+
+    def chat_stream(self, payload, timeout=None):
+        """Run a streaming /api/chat request, yielding each message"""
+        return self.stream("/api/chat", {**payload, "stream": True}, timeout)
+
+    def embed(self, payload, timeout=None):
+        """Run an /api/embed request; the response holds one vector per input"""
+        return self.post("/api/embed", payload, timeout)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncOllamaClient:
+    """Asynchronous Ollama API client backed by a pooled httpx.AsyncClient"""
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, timeout=REQUEST_TIMEOUT,
+                 pool_connections=OLLAMA_POOL_CONNECTIONS, pool_maxsize=OLLAMA_POOL_MAXSIZE):
+        import httpx
+
+        self._httpx = httpx
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_connections,
+            ),
+        )
+
+    def url(self, path):
+        """Build the full URL for an API path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is None else timeout
+
+    async def get(self, path, timeout=None):
+        """GET an API path and return the decoded JSON body"""
+        try:
+            response = await self.client.get(self.url(path), timeout=self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+        except self._httpx.TimeoutException as e:
+            raise OllamaTimeoutError(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise OllamaError(str(e)) from e
+
+    async def post(self, path, payload, timeout=None):
+        """POST a JSON payload and return the decoded JSON body"""
+        try:
+            response = await self.client.post(self.url(path), json=payload, timeout=self._timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+        except self._httpx.TimeoutException as e:
+            raise OllamaTimeoutError(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise OllamaError(str(e)) from e
+
+    async def stream(self, path, payload, timeout=None):
+        """POST a JSON payload and yield each NDJSON message as it arrives"""
+        try:
+            async with self.client.stream("POST", self.url(path), json=payload,
+                                          timeout=self._timeout(timeout)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    for data in _parse_lines([line]):
+                        yield data
+        except self._httpx.TimeoutException as e:
+            raise OllamaTimeoutError(str(e)) from e
+        except self._httpx.HTTPError as e:
+            raise OllamaError(str(e)) from e
+
+    async def list_models(self, timeout=None):
+        """Return the locally available models reported by /api/tags"""
+        return (await self.get("/api/tags", timeout)).get("models", [])
+
+    async def generate(self, payload, timeout=None):
+        """Run a non-streaming /api/generate request"""
+        return await self.post("/api/generate", {**payload, "stream": False}, timeout)
+
+    def generate_stream(self, payload, timeout=None):
+        """Run a streaming /api/generate request, yielding each message"""
+        return self.stream("/api/generate", {**payload, "stream": True}, timeout)
+
+    async def chat(self, payload, timeout=None):
+        """Run a non-streaming /api/chat request"""
+        return await self.post("/api/chat", {**payload, "stream": False}, timeout)
+
+    def chat_stream(self, payload, timeout=None):
+        """Run a streaming /api/chat request, yielding each message"""
+        return self.stream("/api/chat", {**payload, "stream": True}, timeout)
+
+    async def embed(self, payload, timeout=None):
+        """Run an /api/embed request; the response holds one vector per input"""
+        return await self.post("/api/embed", payload, timeout)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url=OLLAMA_BASE_URL):
+    """
+    Return the process-wide shared client for a base URL
+
+    Several comma-separated URLs (or a list) give a LoadBalancedClient that
+    spreads requests across those hosts.
+    """
+    from common.load_balancer import LoadBalancedClient, parse_endpoints
+
+    endpoints = parse_endpoints(base_url)
+    key = ",".join(endpoints)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if len(endpoints) > 1:
+                client = LoadBalancedClient(endpoints)
+            else:
+                client = OllamaClient(key)
+            _clients[key] = client
+        return client
@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+
+from config import OPTION_PROFILES, OPTIONS_TUNED_FILE
+
+logger = logging.getLogger(__name__)
+
+# Options that change speed or memory use but not the generated text
+RUNTIME_OPTIONS = ("num_thread", "num_batch", "num_gpu", "main_gpu", "use_mmap", "use_mlock", "low_vram", "numa")
+
+
+def load_tuned(path=OPTIONS_TUNED_FILE):
+    """Return the profiles written by the autotune command, keyed by task"""
+    try:
+        with open(os.path.expanduser(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable tuned options file {path}: {e}")
+        return {}
+    return data.get("profiles", {})
+
+
+def get_profile(task, overrides=None, tuned_path=OPTIONS_TUNED_FILE):
+    """
+    Build the runtime profile for a task
+
+    Later sources win: OPTION_PROFILES["default"], OPTION_PROFILES[task],
+    the autotuned profile for the task, then overrides (e.g. from the CLI).
+
+    Args:
+        task (str): "explain" or "generate"
+        overrides (dict, optional): Options that take precedence over everything else
+        tuned_path (str, optional): Autotune output file, None to ignore it
+
+    Returns:
+        dict: Ollama options, plus "keep_alive" if one is set
+    """
+    profile = dict(OPTION_PROFILES.get("default", {}))
+    profile.update(OPTION_PROFILES.get(task, {}))
+    if tuned_path:
+        profile.update(load_tuned(tuned_path).get(task, {}))
+    profile.update(overrides or {})
+    return profile
+
+
+def apply_profile(payload, profile):
+    """
+    Add a profile's options and keep_alive to a request payload
+
+    Options already in the payload take precedence over the profile.
+
+    Returns:
+        dict: The payload, modified in place
+    """
+    options = {k: v for k, v in profile.items() if k != "keep_alive"}
+    if options:
+        payload["options"] = {**options, **payload.get("options", {})}
+    if profile.get("keep_alive") is not None and "keep_alive" not in payload:
+        payload["keep_alive"] = profile["keep_alive"]
+    return payload
+
+
+def parse_option_overrides(values):
+    """
+    Parse repeated KEY=VALUE command line options
+
+    Values are read as JSON when possible (so numbers and booleans keep their
+    type) and as plain strings otherwise.
+
+    Args:
+        values (list): Strings like "num_ctx=8192" or "keep_alive=30m"
+
+    Returns:
+        dict: Parsed options
+    """
+    options = {}
+    for value in values or []:
+        key, sep, raw = value.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"expected KEY=VALUE, got {value!r}")
+        try:
+            options[key.strip()] = json.loads(raw)
+        except ValueError:
+            options[key.strip()] = raw
+    return options
@@ -0,0 +1,140 @@
+import io
+import math
+import re
+import textwrap
+import tokenize
+
+from config import PROMPT_CTX_SIZES, PROMPT_OUTPUT_RESERVE, PROMPT_TOKEN_MARGIN
+
+# Line comment prefixes by language; doc comments ("///", "//!") are kept
+LINE_COMMENTS = {
+    "python": ("#",),
+    "ruby": ("#",),
+    "php": ("//", "#"),
+    "javascript": ("//",),
+    "typescript": ("//",),
+    "java": ("//",),
+    "c": ("//",),
+    "c++": ("//",),
+    "c#": ("//",),
+    "go": ("//",),
+    "rust": ("//",),
+    "swift": ("//",),
+    "kotlin": ("//",),
+}
+_KEPT_COMMENTS = re.compile(r"^(#!|#\s*-\*-|///|//!|#\s*(type|noqa|pragma)\b|//\s*(eslint|@ts-))")
+
+# Roughly one BPE token per short word piece, punctuation mark or run of indentation
+_TOKEN_PIECES = re.compile(r"\w{1,4}|[^\w\s]|\s{2,}")
+
+
+def compact_text(text):
+    """Dedent, strip trailing whitespace and collapse runs of blank lines"""
+    lines = [line.rstrip() for line in textwrap.dedent(text).splitlines()]
+    compacted = []
+    for line in lines:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted).strip("\n")
+
+
+def join_prompt(*sections):
+    """Compact each prompt section and join the non-empty ones with a blank line"""
+    return "\n\n".join(part for part in (compact_text(section) for section in sections if section) if part)
+
+
+def code_block(code, language=None):
+    """Wrap code in a markdown fence"""
+    return f"```{language or ''}\n{code.strip(chr(10))}\n```"
+
+
+def _python_comment_lines(code):
+    """Line numbers (1-based) that hold nothing but a comment, found with tokenize so strings are left alone"""
+    lines = set()
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            if token.type == tokenize.COMMENT and not token.line[:token.start[1]].strip():
+                lines.add(token.start[0])
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    return lines
+
+
+def strip_code(code, language=None):
+    """
+    Remove what costs prompt tokens without telling the model anything about the code
+
+    Drops trailing whitespace, runs of blank lines and, for known languages,
+    lines that only hold a line comment (shebangs, encoding lines, doc comments
+    and tool pragmas are kept). Code and inline comments are not changed.
+
+    Args:
+        code (str): Source code
+        language (str, optional): Language name as returned by detect_language
+
+    Returns:
+        str: Compacted code
+    """
+    language = (language or "").lower()
+    prefixes = LINE_COMMENTS.get(language)
+    comment_lines = None
+    if language == "python":
+        comment_lines = _python_comment_lines(code)
+        if comment_lines is None:
+            prefixes = None  # Not valid Python; only whitespace is touched
+
+    kept = []
+    for number, line in enumerate(code.splitlines(), 1):
+        stripped = line.strip()
+        if prefixes and stripped and not _KEPT_COMMENTS.match(stripped):
+            if comment_lines is not None:
+                is_comment = number in comment_lines
+            else:
+                is_comment = stripped.startswith(prefixes)
+            if is_comment:
+                continue
+        if stripped or (kept and kept[-1]):
+            kept.append(line.rstrip())
+    return "\n".join(kept).strip("\n")
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens a model's tokenizer turns text into
+
+    Counts word pieces of up to four characters, punctuation marks and
+    indentation runs, which slightly overestimates code and English prose
+    for typical BPE vocabularies. Good enough to size num_ctx, not to bill by.
+    """
+    return len(_TOKEN_PIECES.findall(text))
+
+
+def fit_context(payload, output_tokens=None, sizes=PROMPT_CTX_SIZES):
+    """
+    Set options.num_ctx to the smallest configured size that holds the prompt and the reply
+
+    A num_ctx already in the payload (from -O or a tuned profile) is kept.
+    Sizes come from a short fixed list because Ollama reloads the model
+    whenever num_ctx changes between requests.
+
+    Args:
+        payload (dict): /api/generate payload, modified in place; a FIM suffix counts as prompt
+        output_tokens (int, optional): Tokens to reserve for the reply
+            (default: the payload's num_predict, or PROMPT_OUTPUT_RESERVE)
+        sizes (list): Allowed num_ctx values
+
+    Returns:
+        tuple: (estimated prompt tokens, num_ctx, True if the prompt and reply fit)
+    """
+    options = payload.setdefault("options", {})
+    if output_tokens is None:
+        num_predict = options.get("num_predict")
+        output_tokens = num_predict if num_predict and num_predict > 0 else PROMPT_OUTPUT_RESERVE
+    prompt_tokens = estimate_tokens(payload.get("system", "") + payload.get("prompt", "") + payload.get("suffix", ""))
+    needed = math.ceil(prompt_tokens * PROMPT_TOKEN_MARGIN) + output_tokens
+
+    if options.get("num_ctx"):
+        return prompt_tokens, options["num_ctx"], needed <= options["num_ctx"]
+    num_ctx = next((size for size in sorted(sizes) if size >= needed), max(sizes))
+    options["num_ctx"] = num_ctx
+    return prompt_tokens, num_ctx, needed <= num_ctx
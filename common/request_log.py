@@ -0,0 +1,179 @@
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+from config import (
+    REQUEST_LOG_BACKUPS,
+    REQUEST_LOG_DIR,
+    REQUEST_LOG_ENABLED,
+    REQUEST_LOG_MAX_BYTES,
+    REQUEST_LOG_SAMPLE_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = "requests.jsonl.gz"
+
+# Records waiting for the writer; beyond this, new records are dropped rather than blocking a request
+QUEUE_SIZE = 1000
+
+# Seconds of inactivity after which buffered records are flushed to disk
+FLUSH_INTERVAL = 1.0
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class RequestLog:
+    """
+    Append-only, gzip-compressed JSONL log of prompts and responses
+
+    Requests only put a record on a queue; a daemon thread does the
+    serialization, compression and disk I/O. The log rotates by compressed
+    size into requests.1.jsonl.gz ... requests.<backups>.jsonl.gz. Read it
+    with ``zcat`` or ``gzip.open``.
+    """
+
+    def __init__(self, directory=REQUEST_LOG_DIR, max_bytes=REQUEST_LOG_MAX_BYTES,
+                 backups=REQUEST_LOG_BACKUPS, sample_rate=REQUEST_LOG_SAMPLE_RATE):
+        """
+        Args:
+            directory (str): Directory holding the log files
+            max_bytes (int): Compressed size at which the current file is rotated
+            backups (int): Number of rotated files kept
+            sample_rate (float): Fraction of requests that are logged (0.0 - 1.0)
+        """
+        self.directory = os.path.expanduser(directory)
+        self.path = os.path.join(self.directory, LOG_NAME)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._raw = None
+        self._gzip = None
+        self._thread = threading.Thread(target=self._run, name="request-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def sampled(self):
+        """Decide up front whether a request is logged, so unlogged requests skip collecting the response"""
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def log(self, operation, model, prompt, response, request_id=None, **extra):
+        """
+        Queue one request/response record without blocking
+
+        Args:
+            operation (str): What the call was for (e.g. "explain", "generate")
+            model (str): Model name
+            prompt (str): Full prompt sent to the model
+            response (str): Full response text
+            request_id (str, optional): Id to correlate with other logs (default: random)
+            **extra: Additional JSON-serializable fields (e.g. cached=True)
+        """
+        record = {
+            "request_id": request_id or uuid.uuid4().hex,
+            "timestamp": time.time(),
+            "operation": operation,
+            "model": model,
+            "prompt_sha256": prompt_hash(prompt),
+            "prompt": prompt,
+            "response": response,
+        }
+        record.update(extra)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._raw = open(self.path, "ab")
+        # Every open appends a new gzip member; gzip readers concatenate them
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="ab")
+
+    def _close_file(self):
+        if self._gzip is not None:
+            self._gzip.close()
+            self._raw.close()
+            self._gzip = self._raw = None
+
+    def _rotate(self):
+        self._close_file()
+        for index in range(self.backups - 1, 0, -1):
+            source = os.path.join(self.directory, f"requests.{index}.jsonl.gz")
+            if os.path.exists(source):
+                os.replace(source, os.path.join(self.directory, f"requests.{index + 1}.jsonl.gz"))
+        if self.backups > 0:
+            os.replace(self.path, os.path.join(self.directory, "requests.1.jsonl.gz"))
+        else:
+            os.remove(self.path)
+
+    def _write(self, record):
+        if self._gzip is None:
+            self._open()
+        self._gzip.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        # The raw offset only counts compressed bytes already handed to the file
+        if self.max_bytes and self._raw.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _flush(self):
+        if self._gzip is not None:
+            self._gzip.flush()
+            self._raw.flush()
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                try:
+                    self._flush()
+                except OSError as e:
+                    logger.warning(f"Failed to flush request log: {e}")
+                continue
+            try:
+                if record is None:
+                    self._close_file()
+                    return
+                self._write(record)
+            except OSError as e:
+                logger.warning(f"Failed to write request log: {e}")
+                self._close_file()
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout=5.0):
+        """Write out queued records and close the file"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_request_log = None
+_request_log_lock = threading.Lock()
+
+
+def get_request_log():
+    """Return the shared RequestLog, or None when REQUEST_LOG_ENABLED is off"""
+    global _request_log
+    if not REQUEST_LOG_ENABLED or REQUEST_LOG_SAMPLE_RATE <= 0:
+        return None
+    with _request_log_lock:
+        if _request_log is None:
+            _request_log = RequestLog()
+        return _request_log
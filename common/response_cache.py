@@ -0,0 +1,74 @@
+import hashlib
+import json
+import logging
+import os
+
+from common.options import RUNTIME_OPTIONS
+from config import CACHE_DIR, CACHE_SIZE_LIMIT, CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Payload fields that do not change the generated text
+_IGNORED_FIELDS = ("stream", "keep_alive")
+
+
+def make_key(payload, model_digest=None):
+    """
+    Build a content-addressed cache key for a generation request
+
+    Args:
+        payload (dict): Request body sent to Ollama (model, prompt, options, ...)
+        model_digest (str, optional): Digest of the model weights reported by /api/tags
+
+    Returns:
+        str: SHA-256 hex digest of the model name, digest, prompt and options
+    """
+    material = {k: v for k, v in payload.items() if k not in _IGNORED_FIELDS}
+    if material.get("options"):
+        material["options"] = {k: v for k, v in material["options"].items() if k not in RUNTIME_OPTIONS}
+    material["model_digest"] = model_digest or ""
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """On-disk LRU cache of model responses"""
+
+    def __init__(self, directory=CACHE_DIR, size_limit=CACHE_SIZE_LIMIT, ttl=CACHE_TTL):
+        """
+        Args:
+            directory (str): Cache directory
+            size_limit (int): Maximum size in bytes before least-recently-used entries are evicted
+            ttl (float, optional): Seconds before an entry expires, None to keep entries forever
+        """
+        import diskcache
+
+        self.directory = os.path.expanduser(directory)
+        self.ttl = ttl
+        self.cache = diskcache.Cache(
+            self.directory,
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+
+    def get(self, key):
+        """Return the cached response for a key, or None"""
+        try:
+            return self.cache.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed: {e}")
+            return None
+
+    def set(self, key, value):
+        """Store a response under a key"""
+        try:
+            self.cache.set(key, value, expire=self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    def clear(self):
+        """Remove every cached response and return the number removed"""
+        return self.cache.clear()
+
+    def close(self):
+        self.cache.close()
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import re
+import textwrap
+import threading
+
+import numpy as np
+
+from config import (
+    SEMANTIC_CACHE_DIR,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 1024
+
+
+def normalize_code(code):
+    """Drop blank lines and trailing whitespace, dedent, and collapse runs of spaces"""
+    lines = [re.sub(r"[ \t]+", " ", line.rstrip()) for line in textwrap.dedent(code).splitlines()]
+    return "\n".join(line for line in lines if line.strip())
+
+
+class SemanticCache:
+    """
+    Near-duplicate lookup of stored responses by embedding similarity
+
+    Code is normalized and embedded through Ollama's /api/embed. Unit-length
+    vectors are kept in a memory-mapped float32 matrix (vectors.f32), so a
+    lookup is a single matrix-vector product. Row i corresponds to line i of
+    entries.jsonl, which holds the namespace (model and language) and the
+    stored response. Other processes' additions are picked up on the next
+    lookup; writers take a file lock.
+    """
+
+    def __init__(self, client, directory=SEMANTIC_CACHE_DIR, model=SEMANTIC_CACHE_MODEL,
+                 threshold=SEMANTIC_CACHE_THRESHOLD):
+        """
+        Args:
+            client (OllamaClient): Client used for /api/embed
+            directory (str): Directory holding the vectors and entries
+            model (str): Ollama embedding model
+            threshold (float): Minimum cosine similarity for a hit (0.0 - 1.0)
+        """
+        self.client = client
+        self.directory = os.path.expanduser(directory)
+        self.model = model
+        self.threshold = threshold
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.entries_path = os.path.join(self.directory, "entries.jsonl")
+        self._lock = threading.Lock()
+        self._dim = None
+        self._capacity = 0
+        self._vectors = None
+        self._namespaces = []
+        self._offsets = []
+        self._entries_size = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_meta()
+
+    def _load_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("model") != self.model:
+            # Vectors from another embedding model are not comparable
+            logger.info(f"Semantic cache was built with {meta.get('model')}, starting over with {self.model}")
+            self.clear()
+            return
+        self._dim = meta["dim"]
+        self._capacity = meta["capacity"]
+
+    def _save_meta(self):
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model, "dim": self._dim, "capacity": self._capacity}, f)
+
+    def _refresh(self):
+        """Read entries appended since the last call (possibly by another process)"""
+        try:
+            size = os.path.getsize(self.entries_path)
+        except OSError:
+            return
+        if size == self._entries_size:
+            return
+        if size < self._entries_size:
+            # Cleared by another process
+            self._namespaces, self._offsets, self._entries_size = [], [], 0
+        self._load_meta()
+        with open(self.entries_path, 'rb') as f:
+            f.seek(self._entries_size)
+            offset = self._entries_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Still being written
+                try:
+                    self._namespaces.append(json.loads(line)["namespace"])
+                    self._offsets.append(offset)
+                except (ValueError, KeyError):
+                    self._namespaces.append(None)
+                    self._offsets.append(offset)
+                offset += len(line)
+            self._entries_size = offset
+        self._vectors = None
+
+    def _matrix(self, writable=False):
+        if self._dim is None:
+            return None
+        if self._vectors is None or writable:
+            mode = "r+" if writable else "r"
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode=mode,
+                                      shape=(self._capacity, self._dim))
+        return self._vectors
+
+    def embed(self, code):
+        """
+        Return the unit-length embedding of normalized code
+
+        Raises:
+            OllamaError: If the request fails, including when the code is longer
+                than the embedding model's context (it is not silently truncated,
+                which would make files with the same header look identical)
+        """
+        result = self.client.embed({"model": self.model, "input": normalize_code(code), "truncate": False})
+        vector = np.asarray(result["embeddings"][0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, namespace):
+        """
+        Find the most similar stored response in a namespace
+
+        Returns:
+            tuple: (response, similarity); response is None below the threshold
+        """
+        with self._lock:
+            self._refresh()
+            count = len(self._namespaces)
+            matrix = self._matrix()
+            if not count or matrix is None or len(vector) != self._dim:
+                return None, 0.0
+            similarities = matrix[:count] @ vector
+            mask = np.fromiter((ns == namespace for ns in self._namespaces), dtype=bool, count=count)
+            similarities = np.where(mask, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None, similarity
+            with open(self.entries_path, 'rb') as f:
+                f.seek(self._offsets[best])
+                return json.loads(f.readline())["response"], similarity
+
+    def _grow(self, needed):
+        capacity = max(INITIAL_CAPACITY, self._capacity)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        old = self._matrix() if self._capacity else None
+        tmp_path = self.vectors_path + ".tmp"
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self._dim))
+        if old is not None:
+            grown[:self._capacity] = old
+        grown.flush()
+        del grown
+        self._vectors = None
+        os.replace(tmp_path, self.vectors_path)
+        self._capacity = capacity
+        self._save_meta()
+
+    def add(self, vector, response, namespace):
+        """Store a response under its embedding"""
+        with self._lock, open(os.path.join(self.directory, ".lock"), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            if self._dim is None:
+                self._dim = len(vector)
+            elif len(vector) != self._dim:
+                logger.warning(f"Embedding size {len(vector)} does not match the cache ({self._dim}); not stored")
+                return
+            row = len(self._namespaces)
+            self._grow(row + 1)
+            matrix = self._matrix(writable=True)
+            matrix[row] = vector
+            matrix.flush()
+            self._vectors = None
+
+            line = (json.dumps({"namespace": namespace, "response": response}, ensure_ascii=False) + "\n").encode("utf-8")
+            with open(self.entries_path, 'ab') as f:
+                f.write(line)
+            self._namespaces.append(namespace)
+            self._offsets.append(self._entries_size)
+            self._entries_size += len(line)
+
+    def clear(self):
+        """Remove every stored vector and response"""
+        for path in (self.meta_path, self.vectors_path, self.entries_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._dim, self._capacity, self._vectors = None, 0, None
+        self._namespaces, self._offsets, self._entries_size = [], [], 0
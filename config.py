@@ -6,8 +6,125 @@
 OLLAMA_BASE_URL = "http://localhost:11434"
 DEFAULT_MODEL = "qwen2.5-coder"  # 기본 모델 설정
 
+# 여러 Ollama 호스트 부하 분산 설정 (--url에 쉼표로 구분된 URL을 지정하면 사용)
+ENDPOINT_HEALTH_INTERVAL = 10     # 호스트 상태 확인 주기 (초), 실패한 호스트는 응답하면 다시 사용
+ENDPOINT_LATENCY_SMOOTHING = 0.3  # 응답 지연 이동평균 가중치 (0~1, 클수록 최근 요청 반영이 큼)
+
+# 작업별 Ollama 런타임 옵션 프로필 (options 객체로 전송, keep_alive는 요청 필드로 전송)
+# 기본값 → 작업별 → autotune 결과 → CLI --option 순서로 덮어씀
+# num_ctx는 요청마다 프롬프트 크기에 맞춰 정하므로 (PROMPT_CTX_SIZES) 여기에 지정하면 고정값으로 사용
+OPTION_PROFILES = {
+    "default": {},
+    "explain": {},
+    "generate": {},
+}
+OPTIONS_TUNED_FILE = "~/.cache/engineer/options.json"  # python -m common.autotune 이 기록하는 프로필
+
+# 프롬프트 토큰 예산 설정
+PROMPT_STRIP_COMMENTS = True    # 설명 요청 시 주석만 있는 줄과 연속된 빈 줄을 제거해 프롬프트를 줄임
+PROMPT_CTX_SIZES = [2048, 4096, 8192, 16384, 32768]  # 요청마다 고르는 num_ctx 후보 (값이 바뀌면 모델을 다시 올리므로 단계를 적게 유지)
+PROMPT_OUTPUT_RESERVE = 2048    # num_predict가 없을 때 응답용으로 남겨둘 토큰 수
+PROMPT_TOKEN_MARGIN = 1.1       # 프롬프트 토큰 추정 오차를 감안한 여유 배율
+
 # 요청 설정
 REQUEST_TIMEOUT = 60  # 초 단위
 
+# 모델 목록(/api/tags) 캐시 설정
+MODEL_REGISTRY_TTL = 300                          # 모델 목록을 다시 조회하기까지의 시간 (초)
+MODEL_REGISTRY_CACHE = "~/.cache/engineer/models.json"  # 프로세스 간 공유되는 모델 목록 캐시
+MODEL_CHECK_TIMEOUT = 5                           # 모델 목록 조회 타임아웃 (초)
+
+# 커넥션 풀 설정 (호스트별 keep-alive 연결 수)
+OLLAMA_POOL_CONNECTIONS = 4   # 캐시할 호스트 풀 개수
+OLLAMA_POOL_MAXSIZE = 16      # 호스트당 최대 연결 수
+
+# 일괄 코드 생성 시 동시 요청 수
+GENERATE_WORKERS = 4
+
+# 코드 생성 출력 정책 (디코딩 토큰 절약)
+# 기본값 → 언어별 → 작업별(generate, batch, file, interactive) 순서로 덮어씀
+GENERATION_POLICY = {
+    "num_predict": 2048,   # 최대 생성 토큰 수 (None이면 제한 없음)
+    "stop": [],            # Ollama stop 시퀀스
+    "max_blocks": 1,       # 이 수만큼 코드 블록이 닫히면 스트림을 끊어 생성 중단 (None이면 제한 없음)
+    "trailing_lines": 2,   # 코드 블록 뒤에 허용할 설명 줄 수, 넘으면 생성 중단 (None이면 제한 없음)
+}
+GENERATION_LANGUAGE_POLICIES = {
+    "java": {"num_predict": 3072},
+    "c++": {"num_predict": 3072},
+    "cpp": {"num_predict": 3072},
+    "c#": {"num_predict": 3072},
+}
+GENERATION_TASK_POLICIES = {
+    "file": {"max_blocks": None, "trailing_lines": 3},  # 여러 파일 출력을 위해 블록 수는 제한하지 않음
+    "interactive": {"max_blocks": None, "trailing_lines": None},
+}
+
+# 코드 템플릿 사용 설정 (code_generate/templates)
+# "python unittest boilerplate"처럼 템플릿만 요청하면 모델 호출 없이 바로 반환
+TEMPLATE_PREFILL = True  # 템플릿/보일러플레이트를 요청하면서 추가 요구사항도 있으면 뼈대를 프롬프트에 넣어 본문만 채우게 함
+
+# 여러 후보를 동시에 생성해 문법 검사를 먼저 통과한 코드를 사용 (--best-of)
+BEST_OF_TEMPERATURES = [0.2, 0.5, 0.8]  # 후보별 temperature (후보가 더 많으면 반복), seed는 후보 번호
+SYNTAX_CHECK_WORKERS = 2                # 문법 검사 프로세스 수
+SYNTAX_CHECK_TIMEOUT = 10               # node --check 최대 실행 시간 (초), 넘으면 통과로 간주
+
+# 파일 일부 수정 (--edit): 앞뒤 코드를 prompt/suffix로 보내 바뀔 부분만 생성 (FIM)
+EDIT_CONTEXT_LINES = 300        # 수정 범위 앞뒤로 보낼 최대 줄 수 (None이면 파일 전체)
+EDIT_NUM_PREDICT_FACTOR = 2     # 생성 토큰 상한 = 원래 코드 토큰 수 x 배수 + 여유분
+EDIT_NUM_PREDICT_EXTRA = 256
+
+# 대화형(REPL) 세션 설정
+SESSION_KEEP_ALIVE = "30m"  # 턴 사이에 모델과 KV 캐시를 메모리에 유지하는 시간
+SESSION_MAX_TURNS = 20      # 컨텍스트에 유지할 최대 대화 턴 수 (오래된 턴부터 제거)
+SESSION_NUM_CTX = 8192      # 대화가 길어지므로 세션에는 고정된 num_ctx를 사용 (프로필에 num_ctx가 없을 때)
+
+# 디렉토리 단위 설명 시 동시 요청 수 (Ollama의 OLLAMA_NUM_PARALLEL에 맞춰 조정)
+EXPLAIN_WORKERS = 4
+
+# 대용량 파일 분할 설명 설정
+CHUNK_THRESHOLD_LINES = 400  # 이 줄 수를 넘는 파일은 함수/클래스 단위로 나누어 설명
+CHUNK_MAX_LINES = 150        # 한 번의 요청에 담을 최대 줄 수
+
+# 저장소 단위(--repo) 설명 시 프롬프트에 넣는 의존 모듈 요약의 최대 글자 수
+DEPENDENCY_SUMMARY_CHARS = 400
+
+# 변경 내용 설명(--diff) 설정: 바뀐 부분만 함수/클래스 단위로 묶어 설명
+DIFF_CONTEXT_LINES = 3       # 변경된 줄 앞뒤로 함께 보여줄 줄 수
+DIFF_FULL_UNIT_LINES = 60    # 이 줄 수 이하의 함수/클래스는 변경 부분만이 아니라 전체를 보여줌
+
+# 증분 설명 / 감시 모드 설정
+EXPLANATION_DIR = ".explanations"  # --incremental/--watch에서 출력 디렉토리를 지정하지 않았을 때 사용
+WATCH_DEBOUNCE_SECONDS = 1.0       # 마지막 저장 후 이 시간 동안 변경이 없으면 갱신
+WATCH_RESCAN_SECONDS = 10.0        # 새 파일을 찾기 위해 감시 대상 목록을 다시 만드는 간격 (그 사이에는 stat만 확인)
+
+# 응답 캐시 설정 (diskcache)
+CACHE_DIR = "~/.cache/engineer/responses"  # 캐시 디렉토리
+CACHE_SIZE_LIMIT = 1024 ** 3                # 최대 캐시 크기 (바이트), 초과 시 LRU 제거
+CACHE_TTL = None                            # 항목 만료 시간 (초), None이면 만료 없음
+
+# 유사 코드 캐시 설정 (임베딩 코사인 유사도로 거의 같은 코드의 설명을 재사용, 선택 사항)
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_DIR = "~/.cache/engineer/semantic"
+SEMANTIC_CACHE_MODEL = "nomic-embed-text"  # Ollama 임베딩 모델
+SEMANTIC_CACHE_THRESHOLD = 0.97            # 이 유사도 이상이면 저장된 설명을 반환
+
+# 메트릭 설정 (호출마다 서버 토큰/시간 정보를 JSONL로 기록)
+METRICS_ENABLED = True
+METRICS_FILE = "~/.cache/engineer/metrics.jsonl"
+
+# 요청/응답 로그 설정 (디버깅용, 백그라운드 스레드가 gzip으로 압축해 기록)
+REQUEST_LOG_ENABLED = True
+REQUEST_LOG_DIR = "~/.cache/engineer/requests"  # 로그 디렉토리
+REQUEST_LOG_SAMPLE_RATE = 1.0                   # 기록할 요청 비율 (0.0 ~ 1.0)
+REQUEST_LOG_MAX_BYTES = 10 * 1024 ** 2          # 이 크기(압축 후)를 넘으면 새 파일로 교체
+REQUEST_LOG_BACKUPS = 5                         # 보관할 이전 로그 파일 수
+
+# HTTP 서비스 모드 설정 (python service/main.py)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKERS = 4      # 동시에 실행할 모델 호출 수
+SERVICE_QUEUE_SIZE = 64  # 대기열 최대 길이, 가득 차면 429로 거절
+
 # 로깅 설정
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL 중 선택
@@ -0,0 +1,4 @@
+# __init__.py
+from .server import ModelService
+
+__all__ = ['ModelService']
@@ -0,0 +1,71 @@
+import sys
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+if __name__ == "__main__":
+    # Add the project root to the Python path when run as a script (not needed for the installed engineer-serve)
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from code_explain.code_explainer import CodeExplainer
+from code_generate.code_generator import CodeGenerator
+from common.options import parse_option_overrides
+from common.response_cache import ResponseCache
+from config import (
+    CACHE_DIR,
+    DEFAULT_MODEL,
+    OLLAMA_BASE_URL,
+    SERVICE_HOST,
+    SERVICE_PORT,
+    SERVICE_QUEUE_SIZE,
+    SERVICE_WORKERS,
+)
+from service.server import ModelService
+
+async def serve(args, options):
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    explainer = CodeExplainer(model_name=args.model, ollama_base_url=args.url, cache=cache, options=options)
+    generator = CodeGenerator(model_name=args.model, ollama_base_url=args.url, cache=cache, options=options)
+
+    service = ModelService(explainer, generator, workers=args.workers, queue_size=args.queue_size)
+    server = await service.start(args.host, args.port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Serving on http://{host}:{port} ({args.workers} workers, queue size {args.queue_size})", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local HTTP service for code explanation and generation")
+    parser.add_argument("--host", default=SERVICE_HOST, help=f"Interface to listen on (default: {SERVICE_HOST})")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help=f"Port to listen on (default: {SERVICE_PORT})")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL, help=f"Model name to use (default: {DEFAULT_MODEL})")
+    parser.add_argument("--url", default=OLLAMA_BASE_URL,
+                        help=f"Ollama API URL, comma-separated to balance across several hosts (default: {OLLAMA_BASE_URL})")
+    parser.add_argument("--workers", "-j", type=int, default=SERVICE_WORKERS,
+                        help=f"Concurrent model calls (default: {SERVICE_WORKERS})")
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE,
+                        help=f"Queued requests before new ones are rejected with 429 (default: {SERVICE_QUEUE_SIZE})")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache and always call the model")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help=f"Response cache directory (default: {CACHE_DIR})")
+    parser.add_argument("--option", "-O", action="append", metavar="KEY=VALUE",
+                        help="Ollama runtime option, repeatable (e.g. -O num_ctx=8192)")
+
+    args = parser.parse_args()
+    try:
+        options = parse_option_overrides(args.option)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        asyncio.run(serve(args, options))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
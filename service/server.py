@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SERVICE_QUEUE_SIZE, SERVICE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY = 5
+MAX_BODY_BYTES = 16 * 1024 ** 2
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """
+    One model call shared by every client that asked for the same thing
+
+    Chunks are kept so clients that join while the job is running get the
+    whole response, not just what arrives after they joined.
+    """
+
+    def __init__(self, key, kind, params, priority):
+        self.key = key
+        self.kind = kind
+        self.params = params
+        self.priority = priority
+        self.chunks = []
+        self.done = False
+        self.cancelled = False
+        self.subscribers = set()
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        for chunk in self.chunks:
+            queue.put_nowait(chunk)
+        if self.done:
+            queue.put_nowait(None)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and not self.done:
+            # Nobody is listening any more: stop the model call (or skip it if still queued)
+            self.cancelled = True
+
+    def publish(self, chunk):
+        self.chunks.append(chunk)
+        for queue in self.subscribers:
+            queue.put_nowait(chunk)
+
+    def finish(self):
+        self.done = True
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+
+def request_key(kind, params):
+    material = json.dumps([kind, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ModelService:
+    """
+    asyncio HTTP front end for a warm CodeExplainer and CodeGenerator
+
+    Requests go through a bounded priority queue (lower number first) and at
+    most ``workers`` model calls run at once; when the queue is full new
+    requests get 429 instead of piling up. Identical requests that arrive
+    while one is queued or running share its model call. Responses stream
+    back as NDJSON.
+
+    Endpoints:
+        POST /explain   {"code", "language"?, "chunked"?, "priority"?, "stream"?}
+        POST /generate  {"prompt", "language"?, "options"?, "priority"?, "stream"?}
+        GET  /health
+    """
+
+    def __init__(self, explainer, generator, workers=SERVICE_WORKERS, queue_size=SERVICE_QUEUE_SIZE):
+        """
+        Args:
+            explainer (CodeExplainer): Explainer shared by all requests
+            generator (CodeGenerator): Generator shared by all requests
+            workers (int): Maximum number of concurrent model calls
+            queue_size (int): Maximum number of queued (not yet running) requests
+        """
+        self.explainer = explainer
+        self.generator = generator
+        self.workers = max(1, workers)
+        self.queue = asyncio.PriorityQueue(maxsize=queue_size)
+        self.inflight = {}
+        self.running = 0
+        self.stats = {"requests": 0, "shared": 0, "rejected": 0}
+        self._order = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="model-call")
+        self._worker_tasks = []
+        self._loop = None
+
+    async def start(self, host, port):
+        """Start the workers and the HTTP listener; returns the asyncio server"""
+        self._loop = asyncio.get_running_loop()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def _tokens(self, job):
+        if job.kind == "explain":
+            return self.explainer.stream_explanation(
+                job.params["code"], job.params.get("language"), chunked=job.params.get("chunked"),
+            )
+        return self.generator.stream_code(
+            job.params["prompt"], job.params.get("language"), options=job.params.get("options"),
+        )
+
+    def _run(self, job):
+        """Drive a blocking token generator in a worker thread, handing chunks to the event loop"""
+        tokens = self._tokens(job)
+        try:
+            for chunk in tokens:
+                self._loop.call_soon_threadsafe(job.publish, chunk)
+                if job.cancelled:
+                    break
+        finally:
+            # Closing the generator closes the Ollama stream, which stops decoding
+            tokens.close()
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self.queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                self.running += 1
+                try:
+                    await self._loop.run_in_executor(self._executor, self._run, job)
+                except Exception as e:
+                    logger.error(f"{job.kind} request failed: {e}")
+                    job.publish(f"\nError: {e}")
+                finally:
+                    self.running -= 1
+            finally:
+                job.finish()
+                # A cancelled job may already have been replaced by a fresh request
+                if self.inflight.get(job.key) is job:
+                    del self.inflight[job.key]
+                self.queue.task_done()
+
+    def submit(self, kind, params, priority=DEFAULT_PRIORITY):
+        """
+        Queue a request, or join the identical one already queued or running
+
+        Returns:
+            tuple: (job, shared) where shared is True if an existing job was joined
+
+        Raises:
+            HttpError: 429 when the queue is full
+        """
+        key = request_key(kind, params)
+        self.stats["requests"] += 1
+        job = self.inflight.get(key)
+        if job is not None and not job.cancelled:
+            self.stats["shared"] += 1
+            return job, True
+
+        job = Job(key, kind, params, priority)
+        try:
+            self.queue.put_nowait((priority, next(self._order), job))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise HttpError(429, "queue is full, retry later")
+        self.inflight[key] = job
+        return job, False
+
+    def health(self):
+        return {
+            "status": "ok",
+            "queued": self.queue.qsize(),
+            "running": self.running,
+            "inflight": len(self.inflight),
+            **self.stats,
+        }
+
+    @staticmethod
+    def _parse(path, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HttpError(400, f"invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "expected a JSON object")
+
+        if path == "/explain":
+            if not isinstance(data.get("code"), str):
+                raise HttpError(400, "'code' is required")
+            params = {"code": data["code"], "language": data.get("language"), "chunked": data.get("chunked")}
+        else:
+            if not isinstance(data.get("prompt"), str):
+                raise HttpError(400, "'prompt' is required")
+            params = {"prompt": data["prompt"], "language": data.get("language"), "options": data.get("options")}
+        try:
+            priority = int(data.get("priority", DEFAULT_PRIORITY))
+        except (TypeError, ValueError):
+            raise HttpError(400, "'priority' must be an integer")
+        return params, priority, data.get("stream", True)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            if path == "/health":
+                if method != "GET":
+                    raise HttpError(405, "use GET")
+                await self._send_json(writer, 200, self.health())
+            elif path in ("/explain", "/generate"):
+                if method != "POST":
+                    raise HttpError(405, "use POST")
+                params, priority, stream = self._parse(path, body)
+                job, shared = self.submit(path.lstrip("/"), params, priority)
+                await self._respond(writer, job, shared, stream)
+            else:
+                raise HttpError(404, f"unknown path {path}")
+        except HttpError as e:
+            await self._send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.exception(f"Unexpected error handling request: {e}")
+            try:
+                await self._send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, "malformed request line")
+        method, path = parts[0].upper(), parts[1].split("?", 1)[0]
+        length = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    raise HttpError(400, "bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    @staticmethod
+    def _head(status, content_type, extra=""):
+        return (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nConnection: close\r\n{extra}\r\n").encode("latin-1")
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        extra = f"Content-Length: {len(body)}\r\n"
+        if status == 429:
+            extra += "Retry-After: 1\r\n"
+        writer.write(self._head(status, "application/json", extra) + body)
+        await writer.drain()
+
+    async def _respond(self, writer, job, shared, stream):
+        queue = job.subscribe()
+        try:
+            if not stream:
+                chunks = []
+                while (chunk := await queue.get()) is not None:
+                    chunks.append(chunk)
+                await self._send_json(writer, 200, {"response": "".join(chunks), "done": True, "shared": shared})
+                return
+
+            writer.write(self._head(200, "application/x-ndjson", "Transfer-Encoding: chunked\r\n"))
+            while (chunk := await queue.get()) is not None:
+                await self._write_chunk(writer, {"response": chunk, "done": False})
+            await self._write_chunk(writer, {"response": "", "done": True, "shared": shared})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.unsubscribe(queue)
+
+    @staticmethod
+    async def _write_chunk(writer, message):
+        data = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    def close(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,74 @@
+import unittest
+
+from code_explain.chunker import split_units
+
+PYTHON = """\
+import os
+
+
+def a():
+    return 1
+
+
+class B:
+    def m(self):
+        return 2
+
+    def n(self):
+        return 3
+"""
+
+
+def spans(units):
+    return [(unit.name, unit.kind, unit.start, unit.end) for unit in units]
+
+
+class SplitUnitsTest(unittest.TestCase):
+    def test_python_top_level_units(self):
+        self.assertEqual(spans(split_units(PYTHON, "Python", pack=False)), [
+            ("<module>", "module", 1, 1),
+            ("a", "function", 4, 5),
+            ("B", "class", 8, 13),
+        ])
+
+    def test_large_python_class_is_split_per_method(self):
+        self.assertEqual(spans(split_units(PYTHON, "Python", max_lines=4, pack=False))[2:], [
+            ("B", "class", 8, 8),
+            ("B.m", "method", 9, 10),
+            ("B.n", "method", 12, 13),
+        ])
+
+    def test_small_units_are_packed(self):
+        [unit] = split_units(PYTHON, "Python")
+        self.assertEqual((unit.kind, unit.start, unit.end), ("group", 1, 13))
+        self.assertIn("def a():", unit.source)
+        self.assertIn("def n(self):", unit.source)
+
+    def test_brace_language_functions(self):
+        code = "function f() {\n  return 1;\n}\n\nfunction g() {\n  return 2;\n}\n"
+        self.assertEqual(spans(split_units(code, "JavaScript", pack=False)), [
+            ("f", "function", 1, 3),
+            ("g", "function", 5, 7),
+        ])
+
+    def test_large_brace_class_is_split_per_member(self):
+        methods = "".join(f"    void m{i}() {{\n        int x = {i};\n    }}\n" for i in range(3))
+        code = "class A {\n" + methods + "}\n"
+        units = split_units(code, "Java", max_lines=5, pack=False)
+        self.assertEqual(spans(units), [
+            ("A", "class", 1, 1),
+            ("A.m0", "method", 2, 4),
+            ("A.m1", "method", 5, 7),
+            ("A.m2", "method", 8, 11),
+        ])
+        # Units cover the class without gaps, so nothing is lost from the explanation
+        self.assertEqual("\n".join(unit.source for unit in units), code.rstrip("\n"))
+
+    def test_syntax_error_falls_back_to_heuristics(self):
+        units = split_units("def broken(:\n    pass\n\ndef ok():\n    pass\n", "Python", pack=False)
+        self.assertTrue(units)
+        self.assertEqual(units[-1].end, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from code_generate.code_extractor import BlockFileWriter, FenceParser
+
+
+class MemoryFile(io.StringIO):
+    """StringIO that keeps its contents after close"""
+
+    def close(self):
+        self.contents = self.getvalue()
+        super().close()
+
+
+def parse(chunks):
+    """Feed chunks to a FenceParser; returns [(language, hint, contents)] per block"""
+    blocks = []
+
+    def open_block(index, language, hint):
+        blocks.append((language, hint, MemoryFile()))
+        return blocks[-1][2]
+
+    parser = FenceParser(open_block)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return [(language, hint, f.contents) for language, hint, f in blocks]
+
+
+class FenceParserTest(unittest.TestCase):
+    def test_fence_split_across_tokens(self):
+        text = "Here:\n```python\nprint('hi')\n```\nDone.\n"
+        for size in (1, 2, 3, 7):
+            with self.subTest(size=size):
+                chunks = [text[i:i + size] for i in range(0, len(text), size)]
+                self.assertEqual(parse(chunks), [("python", None, "print('hi')\n")])
+
+    def test_filename_hints(self):
+        cases = {
+            "```python app.py\nx = 1\n```\n": "app.py",
+            '```python title="src/app.py"\nx = 1\n```\n': "src/app.py",
+            "**app.py**\n```python\nx = 1\n```\n": "app.py",
+            "```python\n# app.py\nx = 1\n```\n": "app.py",
+        }
+        for text, hint in cases.items():
+            with self.subTest(text=text):
+                [(language, found, _)] = parse([text])
+                self.assertEqual(language, "python")
+                self.assertEqual(found, hint)
+
+    def test_text_hint_only_names_the_next_block(self):
+        blocks = parse(["**app.py**\n```python\na = 1\n```\n```python\nb = 2\n```\n"])
+        self.assertEqual([hint for _, hint, _ in blocks], ["app.py", None])
+
+    def test_unclosed_final_block(self):
+        blocks = parse(["```python\na = 1\n```\n```js\nlet b = 2;\nlet c"])
+        self.assertEqual(blocks, [("python", None, "a = 1\n"), ("js", None, "let b = 2;\nlet c")])
+
+    def test_inline_backticks_do_not_close_a_block(self):
+        blocks = parse(["```markdown\nUse ```python``` fences.\n```\n"])
+        self.assertEqual(blocks, [("markdown", None, "Use ```python``` fences.\n")])
+
+
+class BlockFileWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, "gen.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, writer, index, language, hint, text):
+        with writer.open(index, language, hint) as f:
+            f.write(text)
+
+    def read(self, name):
+        with open(self.path(name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_hint_names_later_blocks(self):
+        writer = BlockFileWriter(output_path=self.output)
+        self.write(writer, 0, "python", None, "main")
+        self.write(writer, 1, "python", "util.py", "util")
+        self.write(writer, 2, "javascript", None, "js")
+        self.assertEqual(writer.written, [self.output, self.path("util.py"), self.path("gen_3.js")])
+
+    def test_existing_file_is_not_overwritten(self):
+        with open(self.path("requirements.txt"), "w", encoding="utf-8") as f:
+            f.write("ORIGINAL")
+        writer = BlockFileWriter(output_path=self.output)
+        self.write(writer, 0, "python", None, "main")
+        self.write(writer, 1, None, "requirements.txt", "flask")
+        self.assertEqual(self.read("requirements.txt"), "ORIGINAL")
+        # The hint's extension is kept for the numbered fallback
+        self.assertEqual(self.read("gen_2.txt"), "flask")
+
+    def test_numbered_fallback_skips_existing_files(self):
+        with open(self.path("gen_2.py"), "w", encoding="utf-8") as f:
+            f.write("ORIGINAL")
+        writer = BlockFileWriter(output_path=self.output)
+        self.write(writer, 0, "python", None, "main")
+        self.write(writer, 1, "python", None, "second")
+        self.assertEqual(self.read("gen_2.py"), "ORIGINAL")
+        self.assertEqual(self.read("gen_3.py"), "second")
+
+    def test_repeated_hint_reuses_the_file_from_this_run(self):
+        writer = BlockFileWriter(output_dir=self.directory)
+        self.write(writer, 0, "python", "app.py", "first")
+        self.write(writer, 1, "python", "app.py", "second")
+        self.assertEqual(self.read("app.py"), "second")
+        self.assertEqual(writer.written, [self.path("app.py")])
+
+    def test_hint_outside_the_output_directory_is_ignored(self):
+        writer = BlockFileWriter(output_dir=self.directory)
+        self.write(writer, 0, "python", "../escape.py", "x")
+        self.assertEqual(writer.written, [self.path("block_1.py")])
+
+
+if __name__ == "__main__":
+    unittest.main()
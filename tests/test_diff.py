@@ -0,0 +1,115 @@
+import unittest
+
+from code_explain.chunker import CodeUnit
+from code_explain.diff import FileDiff, Hunk, group_hunks, parse_diff, render_group
+
+DIFF = """\
+diff --git a/added.py b/added.py
+new file mode 100644
+index 0000000..8ba3a16
+--- /dev/null
++++ b/added.py
+@@ -0,0 +1,2 @@
++a = 1
++b = 2
+diff --git a/gone.py b/gone.py
+deleted file mode 100644
+index 587be6b..0000000
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-x = 1
+diff --git a/old.py b/new.py
+similarity index 87%
+rename from old.py
+rename to new.py
+index 71ac1b5..8921ce4 100644
+--- a/old.py
++++ b/new.py
+@@ -3 +3 @@ def f():
+-    return 1
++    return 2
+diff --git a/moved.py b/pkg/moved.py
+similarity index 100%
+rename from moved.py
+rename to pkg/moved.py
+diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -10,2 +9,0 @@ def g():
+-    a()
+-    b()
+@@ -20,0 +19,3 @@ def h():
++    c()
++    d()
++    e()
+"""
+
+LINES = ["def a():", "    x = 1", "    y = 2", "    return x", "", "def b():", "    pass"]
+UNIT_A = CodeUnit("a", "function", 1, 4, "")
+
+
+class ParseDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.files = {file_diff.path: file_diff for file_diff in parse_diff(DIFF)}
+
+    def test_paths_and_statuses(self):
+        self.assertEqual({path: f.status for path, f in self.files.items()}, {
+            "added.py": "added",
+            "gone.py": "deleted",
+            "new.py": "renamed",
+            "pkg/moved.py": "renamed",
+            "app.py": "modified",
+        })
+
+    def test_added_and_deleted_files(self):
+        self.assertEqual(self.files["added.py"].hunks, [Hunk(0, 0, 1, 2, [])])
+        self.assertEqual(self.files["gone.py"].hunks, [Hunk(1, 1, 0, 0, ["x = 1"])])
+
+    def test_hunk_without_counts(self):
+        self.assertEqual(self.files["new.py"].hunks, [Hunk(3, 1, 3, 1, ["    return 1"])])
+
+    def test_pure_rename_has_no_hunks(self):
+        self.assertEqual(self.files["pkg/moved.py"], FileDiff("pkg/moved.py", "renamed", []))
+
+    def test_deletion_and_insertion_hunks(self):
+        self.assertEqual(self.files["app.py"].hunks, [
+            Hunk(10, 2, 9, 0, ["    a()", "    b()"]),
+            Hunk(20, 0, 19, 3, []),
+        ])
+
+
+class RenderGroupTest(unittest.TestCase):
+    def test_pure_deletion_is_shown_where_the_lines_were(self):
+        text = render_group(LINES, UNIT_A, [Hunk(3, 1, 2, 0, ["    z = 0"])])
+        self.assertEqual(text.splitlines(), [
+            "@@ line 1 @@", " def a():", "     x = 1", "-    z = 0", "     y = 2", "     return x",
+        ])
+
+    def test_lines_removed_at_the_end_of_a_unit(self):
+        text = render_group(LINES, UNIT_A, [Hunk(5, 1, 4, 0, ["    extra()"])])
+        self.assertEqual(text.splitlines()[-2:], ["     return x", "-    extra()"])
+        self.assertNotIn("def b", text)
+
+    def test_large_unit_shows_context_and_signature(self):
+        text = render_group(LINES, UNIT_A, [Hunk(4, 1, 4, 1, ["    return y"])], context=0, full_unit_lines=1)
+        self.assertEqual(text.splitlines(), [
+            "@@ line 1 @@", " def a():", "@@ line 4 @@", "-    return y", "+    return x",
+        ])
+
+    def test_top_level_change(self):
+        source = "\n".join(LINES) + "\n"
+        [(unit, hunks)] = group_hunks(source, [Hunk(5, 0, 5, 1, [])], "Python")
+        self.assertEqual((unit.name, unit.kind, unit.start, unit.end), ("<top level>", "module", 5, 5))
+        text = render_group(LINES, unit, hunks, context=1)
+        self.assertEqual(text.splitlines(), ["@@ line 4 @@", "     return x", "+", " def b():"])
+
+    def test_hunks_are_grouped_by_enclosing_unit(self):
+        source = "\n".join(LINES) + "\n"
+        groups = group_hunks(source, [Hunk(7, 1, 7, 1, ["    return"]), Hunk(2, 1, 2, 1, ["    x = 0"])], "Python")
+        self.assertEqual([unit.name for unit, _ in groups], ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from code_generate.editor import edit_file
+
+SOURCE = "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+
+
+class FakeGenerator:
+    """Stands in for CodeGenerator.fill_in_middle with a fixed reply"""
+
+    def __init__(self, middle, done_reason="stop"):
+        self.middle = middle
+        self.done_reason = done_reason
+
+    def fill_in_middle(self, prefix, suffix, timeout=60, options=None, num_predict=None):
+        return self.middle, self.done_reason
+
+
+class EditFileTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".py")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(SOURCE)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_replaces_symbol(self):
+        updated, diff = edit_file(FakeGenerator("def a():\n    return 10\n"), self.path, symbol="a")
+        self.assertEqual(updated, SOURCE.replace("return 1\n", "return 10\n"))
+        self.assertIn("+    return 10", diff)
+
+    def test_empty_completion_is_rejected(self):
+        for middle in ("", "  \n\n", "```python\n```"):
+            with self.subTest(middle=middle):
+                with self.assertRaises(ValueError):
+                    edit_file(FakeGenerator(middle), self.path, symbol="a")
+
+    def test_truncated_completion_is_rejected(self):
+        with self.assertRaises(ValueError):
+            edit_file(FakeGenerator("def a():\n    return", "length"), self.path, lines=(1, 2))
+
+    def test_file_is_left_unchanged(self):
+        with self.assertRaises(ValueError):
+            edit_file(FakeGenerator(""), self.path, symbol="a")
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), SOURCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
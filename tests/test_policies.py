@@ -0,0 +1,51 @@
+import unittest
+
+from code_generate.policies import BlockWatcher, GenerationPolicy
+
+
+def watcher(max_blocks=None, trailing_lines=None):
+    return BlockWatcher(GenerationPolicy(None, None, max_blocks, trailing_lines))
+
+
+def feed_all(block_watcher, chunks):
+    """Feed chunks until the watcher says stop; returns how many chunks were consumed"""
+    for count, chunk in enumerate(chunks, 1):
+        if block_watcher.feed(chunk):
+            return count
+    return None
+
+
+class BlockWatcherTest(unittest.TestCase):
+    def test_inactive_without_limits(self):
+        block_watcher = watcher()
+        self.assertFalse(block_watcher.active)
+        self.assertIsNone(feed_all(block_watcher, ["```python\nx = 1\n```\n", "more\n" * 10]))
+
+    def test_stops_when_max_blocks_close(self):
+        chunks = ["Intro\n```python\n", "a = 1\n", "``", "`\n", "```python\nb = 2\n```\n"]
+        self.assertEqual(feed_all(watcher(max_blocks=1), chunks), 4)
+        self.assertEqual(feed_all(watcher(max_blocks=2), chunks), 5)
+
+    def test_closing_fence_needs_a_full_line(self):
+        block_watcher = watcher(max_blocks=1)
+        self.assertFalse(block_watcher.feed("```python\ncode = '```'\n"))
+        self.assertFalse(block_watcher.feed("```"))
+        self.assertTrue(block_watcher.feed("\n"))
+        self.assertEqual(block_watcher.closed_blocks, 1)
+
+    def test_trailing_lines_after_the_last_block(self):
+        chunks = ["```python\nx = 1\n```\n", "\n", "First note.\n", "Second note.\n", "Third note.\n"]
+        self.assertEqual(feed_all(watcher(trailing_lines=2), chunks), 5)
+        self.assertIsNone(feed_all(watcher(trailing_lines=3), chunks))
+
+    def test_text_before_the_first_block_is_not_trailing(self):
+        chunks = ["One.\n", "Two.\n", "Three.\n", "```python\nx = 1\n```\n"]
+        self.assertIsNone(feed_all(watcher(trailing_lines=1), chunks))
+
+    def test_new_block_resets_trailing_count(self):
+        chunks = ["```\na\n```\n", "Note.\n", "```\nb\n```\n", "Note.\n"]
+        self.assertIsNone(feed_all(watcher(trailing_lines=1), chunks))
+
+
+if __name__ == "__main__":
+    unittest.main()